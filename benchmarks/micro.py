@@ -0,0 +1,446 @@
+"""
+Микро-бенчмарки горячих helper'ов utils: WebDriver round trips и wall time на вызов.
+
+    python -m benchmarks.micro                         # fake driver, сравнение с baselines/micro_fake.json
+    python -m benchmarks.micro --driver chrome         # локальный браузер против utils/demo_site
+    python -m benchmarks.micro --only detect_popups --repeat 200
+    python -m benchmarks.micro --time-gate             # плюс сравнение времени (нормированного)
+    python -m benchmarks.micro --update-baseline       # записать текущие цифры как baseline
+
+Для каждого случая подготовка (открыть страницу, модалку, alert) не измеряется;
+измеряется только вызов helper'а: число команд WebDriver (через profile_driver)
+и время. Выход с кодом 1, если helper делает больше round trips, чем в baseline:
+число команд детерминировано и от машины не зависит.
+
+Время в отчёте (min/p50/p95 из --repeat вызовов) — для информации; в сравнение
+оно входит только с --time-gate. После каждого замера прогоняется калибровочная
+чисто-Python нагрузка (calibrate); normalized случая — медиана отношений времени
+вызова к соседней калибровке, так что скорость машины и её замедления во время
+прогона из него почти уходят. Регрессия — рост normalized больше чем на --threshold
+и не меньше чем на --min-ms (в миллисекундах текущей машины). С fake driver время в основном меряет сам
+FakeDriver, так что осмысленнее всего --time-gate с --driver chrome/firefox.
+
+Переменные окружения:
+    DDT_BENCH_TIME_GATE — 1 = то же, что --time-gate
+    DDT_BENCH_THRESHOLD — допустимый рост нормированного времени, доля (по умолчанию 0.25)
+    DDT_BENCH_MIN_MS    — рост меньше этого (мс) не считается регрессией (по умолчанию 0.5)
+    DDT_BENCH_WARMUP    — минимальная длительность прогрева каждого случая, с (по умолчанию 0.2)
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from selenium.webdriver.common.by import By
+
+from config.site_config import home_url, set_base_url
+from utils import actions, excel_reader, screenshots
+from utils.actions import (
+    ClickStrategyCache,
+    click_with_fallback,
+    fill_form,
+    prepare_clean_session,
+    reset_session,
+    save_screenshot,
+    wait_alert,
+    wait_until_modal_shown,
+    wait_visible,
+)
+from utils.data_source import read_testdata, write_testdata
+from utils.driver_factory import create_local_driver
+from utils.popups import detect_popups
+from utils.profiler import percentile, profile_driver
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+TIME_GATE = os.getenv("DDT_BENCH_TIME_GATE", "0") == "1"
+DEFAULT_THRESHOLD = float(os.getenv("DDT_BENCH_THRESHOLD", "0.25"))
+MIN_REGRESSION_MS = float(os.getenv("DDT_BENCH_MIN_MS", "0.5"))
+WARMUP_SECONDS = float(os.getenv("DDT_BENCH_WARMUP", "0.2"))
+DRIVERS = ("fake", "chrome", "firefox")
+
+LOGIN_SUBMIT = (By.XPATH, "//div[@id='logInModal']//button[text()='Log in']")
+LOGIN_FIELDS = {(By.ID, "loginusername"): "bench_user", (By.ID, "loginpassword"): "bench_password"}
+TESTDATA_COLUMNS = ("test_id", "username", "password", "expected_result")
+
+
+@dataclass(frozen=True)
+class Case:
+    """Один измеряемый вызов: setup(ctx) готовит страницу, call(ctx) — сам helper"""
+    name: str
+    call: Callable
+    setup: Optional[Callable] = None
+    repeat_scale: float = 1.0  # медленные случаи (чтение xlsx) гоняются реже
+
+
+class _RoundTrips:
+    """Минимальный «профайлер» для profile_driver: только имена команд, без разбора стека"""
+
+    def __init__(self):
+        self.commands = []
+
+    def record(self, command, duration, ok=True, locator=None, step=None):
+        self.commands.append(command)
+
+
+class BenchContext:
+    def __init__(self, driver, workdir, rows):
+        self.driver = driver
+        self.workdir = workdir
+        self.rows = rows
+        self.state = {}
+
+
+# --- подготовка страниц ----------------------------------------------------
+
+def _home(ctx):
+    try:
+        ctx.driver.switch_to.alert.dismiss()  # alert, оставшийся от прошлого вызова
+    except Exception:
+        pass
+    ctx.driver.get(home_url())
+
+
+def _login_modal(ctx):
+    _home(ctx)
+    ctx.driver.find_element(By.ID, "login2").click()
+    wait_until_modal_shown(ctx.driver, (By.ID, "logInModal"))
+
+
+def _login_alert(ctx):
+    # пустые поля -> нативный alert "Please fill out Username and Password."
+    _login_modal(ctx)
+    ctx.driver.find_element(*LOGIN_SUBMIT).click()
+    wait_alert(ctx.driver)
+
+
+def _login_button(ctx):
+    _home(ctx)
+    ctx.state["element"] = wait_visible(ctx.driver, By.ID, "login2")
+
+
+def _hidden_modal(ctx):
+    # модалка уже закрыта: alert принят, страница чистая
+    _home(ctx)
+
+
+# --- данные для read_testdata ----------------------------------------------
+
+def _testdata_rows(n):
+    for i in range(n):
+        yield {"test_id": f"B{i + 1}", "username": f"user{i}", "password": f"pw{i}",
+               "expected_result": "PASS" if i % 2 else "FAIL"}
+
+
+def _xlsx_path(ctx):
+    path = ctx.state.get("xlsx")
+    if path is None:
+        path = os.path.join(ctx.workdir, "bench.xlsx")
+        write_testdata(path, "login", _testdata_rows(ctx.rows), columns=TESTDATA_COLUMNS)
+        ctx.state["xlsx"] = path
+    return path
+
+
+def _jsonl_dir(ctx):
+    path = ctx.state.get("jsonl")
+    if path is None:
+        path = os.path.join(ctx.workdir, "jsonl")
+        os.makedirs(path, exist_ok=True)
+        write_testdata(path, "login", _testdata_rows(ctx.rows), columns=TESTDATA_COLUMNS)
+        ctx.state["jsonl"] = path
+    return path
+
+
+def _cold_xlsx(ctx):
+    _xlsx_path(ctx)
+    excel_reader._memory_cache.clear()
+
+
+def _warm_xlsx(ctx):
+    read_testdata(_xlsx_path(ctx), "login")
+
+
+# --- случаи ------------------------------------------------------------------
+
+CASES = (
+    Case("prepare_clean_session", lambda ctx: prepare_clean_session(ctx.driver), _home),
+    Case("reset_session", lambda ctx: reset_session(ctx.driver, home_url()), _login_modal),
+    Case("click_with_fallback", lambda ctx: click_with_fallback(ctx.driver, ctx.state["element"], None, "bench_login2"),
+         _login_button),
+    Case("wait_until_modal_shown", lambda ctx: wait_until_modal_shown(ctx.driver, (By.ID, "logInModal")),
+         _login_modal),
+    Case("fill_form[fast]", lambda ctx: fill_form(ctx.driver, LOGIN_FIELDS, mode="fast"), _login_modal),
+    Case("detect_popups[native_alert]", lambda ctx: detect_popups(ctx.driver, timeout=2), _login_alert),
+    Case("detect_popups[modal,js]", lambda ctx: detect_popups(ctx.driver, timeout=2, probe="js"), _login_modal),
+    Case("detect_popups[modal,webdriver]", lambda ctx: detect_popups(ctx.driver, timeout=2, probe="webdriver"),
+         _login_modal),
+    Case("detect_popups[none,observer]",
+         lambda ctx: detect_popups(ctx.driver, timeout=2, probe="observer", settle=0.1), _hidden_modal),
+    Case("save_screenshot[always]", lambda ctx: save_screenshot(ctx.driver, "bench_always"), _home),
+    Case("save_screenshot[on-failure]", lambda ctx: save_screenshot(ctx.driver, "bench_buffered"), _home),
+    Case("read_testdata[xlsx,cold]", lambda ctx: read_testdata(_xlsx_path(ctx), "login"), _cold_xlsx, 0.4),
+    Case("read_testdata[xlsx,warm]", lambda ctx: read_testdata(_xlsx_path(ctx), "login"), _warm_xlsx),
+    Case("read_testdata[jsonl]", lambda ctx: read_testdata(_jsonl_dir(ctx), "login"), _jsonl_dir),
+)
+
+
+def _screenshot_policy_for(case: Case):
+    if case.name.startswith("save_screenshot["):
+        return case.name[len("save_screenshot["):-1]
+    return None
+
+
+def _measure(ctx: BenchContext, case: Case, counter: _RoundTrips) -> float:
+    if case.setup:
+        case.setup(ctx)
+    del counter.commands[:]
+    gc.disable()  # как timeit: сборка мусора не попадает в замер
+    try:
+        started = time.perf_counter()
+        case.call(ctx)
+        return time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def _calibration_workload():
+    # интерпретатор, мелкие dict/str и json — то же, из чего состоят helper'ы,
+    # чтение данных и FakeDriver
+    rows = [{"test_id": f"C{i}", "username": f"user{i}", "expected_result": "PASS" if i % 2 else "FAIL"}
+            for i in range(2000)]
+    counts = {}
+    for row in json.loads(json.dumps(rows)):
+        counts[row["expected_result"]] = counts.get(row["expected_result"], 0) + len(row["username"])
+    sorted(rows, key=lambda r: r["username"])
+
+
+def calibrate(rounds: int = 20) -> float:
+    """Лучшее время (мс) эталонной нагрузки из rounds прогонов: масштаб скорости машины"""
+    best = None
+    for _ in range(rounds):
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            _calibration_workload()
+            elapsed = time.perf_counter() - started
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 3)
+
+
+def run_case(ctx: BenchContext, case: Case, repeat: int, warmup: int, counter: _RoundTrips) -> dict:
+    """
+    Гоняет случай: warmup вызовов (и не меньше WARMUP_SECONDS), затем repeat замеров,
+    после каждого — замер калибровочной нагрузки. Возвращает round trips (максимум
+    за вызов), время в мс (min, p50, p95) и normalized — медиану отношений времени
+    вызова к соседнему замеру калибровки (по нему идёт --time-gate: от скорости
+    машины и её замедлений во время прогона оно почти не зависит).
+    """
+    policy = _screenshot_policy_for(case)
+    previous_policy = screenshots.screenshot_policy()
+    if policy:
+        screenshots.set_screenshot_policy(policy)
+        screenshots.begin_test(f"bench-{policy}")
+    times, trips, calibration, commands = [], [], [], None
+    try:
+        # без прогрева первые замеры короткого прогона заметно медленнее (частота CPU, кэши)
+        warm_until = time.perf_counter() + WARMUP_SECONDS
+        done = 0
+        while done < warmup or time.perf_counter() < warm_until:
+            _measure(ctx, case, counter)
+            done += 1
+        for _ in range(max(1, int(repeat * case.repeat_scale))):
+            elapsed = _measure(ctx, case, counter)
+            times.append(elapsed * 1000)
+            trips.append(len(counter.commands))
+            # калибровка вперемешку с замерами: замедление машины на время случая
+            # (соседние процессы, частота CPU) попадает и в неё
+            calibration.append(calibrate(1))
+            if commands is None:
+                commands = list(counter.commands)
+    finally:
+        if policy:
+            screenshots.finish_test(f"bench-{policy}", "PASSED")
+            screenshots.flush_screenshots()
+            screenshots.set_screenshot_policy(previous_policy)
+    return {
+        "calls": len(times),
+        "round_trips": max(trips),
+        "min_ms": round(min(times), 3),
+        "p50_ms": round(percentile(times, 0.5), 3),
+        "p95_ms": round(percentile(times, 0.95), 3),
+        "calibration_ms": round(min(calibration), 3),
+        "normalized": round(percentile([t / c for t, c in zip(times, calibration)], 0.5), 4),
+        "commands": commands,
+    }
+
+
+def run_benchmarks(driver_name="fake", repeat=50, warmup=3, rows=1000, only=None) -> dict:
+    """
+    Запускает случаи CASES (или только те, чьё имя начинается с одного из only)
+    в изолированном окружении: временные каталоги для скриншотов, click cache и
+    данных, без дискового кэша excel_reader. Реальные браузеры ходят на utils/demo_site.
+    """
+    cases = [c for c in CASES if not only or any(c.name.startswith(o) for o in only)]
+    workdir = tempfile.mkdtemp(prefix="ddt-bench-")
+    saved = (actions.SCREENSHOT_DIR, actions.click_cache, excel_reader.DATA_CACHE_ENABLED)
+    actions.SCREENSHOT_DIR = os.path.join(workdir, "screenshots")
+    os.makedirs(actions.SCREENSHOT_DIR)
+    actions.click_cache = ClickStrategyCache(path=os.path.join(workdir, "click_strategies.json"))
+    excel_reader.DATA_CACHE_ENABLED = False
+
+    site = driver = None
+    try:
+        if driver_name != "fake":
+            from utils.demo_site import start_demo_site
+            site = start_demo_site()
+            set_base_url(site.url)
+        driver = create_local_driver(driver_name)
+        counter = _RoundTrips()
+        profile_driver(driver, counter)
+        ctx = BenchContext(driver, workdir, rows)
+
+        results = {}
+        for case in cases:
+            results[case.name] = run_case(ctx, case, repeat, warmup, counter)
+        return {
+            "driver": driver_name,
+            "repeat": repeat,
+            "rows": rows,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cases": results,
+        }
+    finally:
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if site is not None:
+            site.stop()
+        actions.SCREENSHOT_DIR, actions.click_cache, excel_reader.DATA_CACHE_ENABLED = saved
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def baseline_path(driver_name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"micro_{driver_name}.json")
+
+
+def load_baseline(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(report: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def compare(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            min_ms: float = MIN_REGRESSION_MS, time_gate: bool = TIME_GATE) -> list:
+    """
+    Сравнивает отчёт с baseline; возвращает список регрессий (строки).
+    Рост round trips — регрессия всегда. С time_gate ещё и время: рост normalized
+    больше threshold, если в миллисекундах текущей машины он не меньше min_ms.
+    """
+    regressions = []
+    base_cases = (baseline or {}).get("cases", {})
+    for name, cur in report["cases"].items():
+        base = base_cases.get(name)
+        if base is None:
+            continue
+        if cur["round_trips"] > base["round_trips"]:
+            regressions.append(f"{name}: round trips {base['round_trips']} -> {cur['round_trips']}")
+        if not time_gate or "normalized" not in base:
+            continue
+        grown_ms = (cur["normalized"] - base["normalized"]) * cur["calibration_ms"]
+        if cur["normalized"] > base["normalized"] * (1 + threshold) and grown_ms >= min_ms:
+            regressions.append(f"{name}: normalized time {base['normalized']} -> {cur['normalized']} "
+                               f"(+{grown_ms:.3f}ms here, limit +{threshold * 100:.0f}%)")
+    return regressions
+
+
+def format_table(report: dict, baseline: dict = None) -> str:
+    base_cases = (baseline or {}).get("cases", {})
+    lines = [f"{'case':<34} {'calls':>5} {'trips':>9} {'min ms':>10} {'p50 ms':>10} {'p95 ms':>10} "
+             f"{'norm':>8} {'base norm':>10}"]
+    for name, cur in report["cases"].items():
+        base = base_cases.get(name)
+        trips = str(cur["round_trips"])
+        if base and base["round_trips"] != cur["round_trips"]:
+            trips = f"{base['round_trips']}->{trips}"
+        base_norm = f"{base['normalized']:.4f}" if base and "normalized" in base else "-"
+        lines.append(f"{name:<34} {cur['calls']:>5} {trips:>9} {cur['min_ms']:>10.3f} "
+                     f"{cur['p50_ms']:>10.3f} {cur['p95_ms']:>10.3f} {cur['normalized']:>8.4f} {base_norm:>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for utils helpers (round trips and wall time per call)")
+    parser.add_argument("--driver", choices=DRIVERS, default="fake",
+                        help="fake = in-memory driver; chrome/firefox run against a local utils/demo_site")
+    parser.add_argument("--repeat", type=int, default=50, help="Measured calls per case")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured calls per case before measuring")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows in the generated read_testdata sheet")
+    parser.add_argument("--only", action="append", default=None, metavar="PREFIX",
+                        help="Run only cases whose name starts with PREFIX; repeatable")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON (default benchmarks/baselines/micro_<driver>.json)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--time-gate", action="store_true", default=TIME_GATE,
+                        help="Also fail on call time growth (normalized by a calibration loop); "
+                             "by default only round trips are gated")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="With --time-gate: allowed growth of the normalized call time "
+                             "as a fraction (0.25 = +25%%)")
+    parser.add_argument("--min-ms", type=float, default=MIN_REGRESSION_MS,
+                        help="Ignore time growth smaller than this many ms")
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.driver, args.repeat, args.warmup, args.rows, args.only)
+    path = args.baseline or baseline_path(args.driver)
+    baseline = load_baseline(path)
+    print(format_table(report, baseline))
+
+    if args.json:
+        save_baseline(report, args.json)
+    if args.update_baseline:
+        if baseline and args.only:
+            # частичный прогон обновляет только свои случаи
+            baseline["cases"].update(report["cases"])
+            report = dict(report, cases=baseline["cases"])
+        save_baseline(report, path)
+        print(f"Baseline written: {path}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {path}; run with --update-baseline to create one")
+        return 0
+
+    regressions = compare(report, baseline, args.threshold, args.min_ms, args.time_gate)
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    if not regressions:
+        print(f"OK: no regressions against {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
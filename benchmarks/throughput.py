@@ -0,0 +1,348 @@
+"""
+E2E-бенчмарк пропускной способности: все пять flow на сгенерированном листе из N строк
+против локальной цели, в трёх режимах выполнения runner'а:
+
+    sequential — один поток, новый браузер на каждую строку (--max-uses 1)
+    pooled     — один поток, сессия переиспользуется (DriverPool, --max-uses 50)
+    parallel   — --workers потоков, у каждого своя сессия из пула
+
+    python -m benchmarks.throughput --driver fake --rows 200
+    python -m benchmarks.throughput --driver chrome --rows 30 --workers 4 --sheet login --sheet purchase
+    python -m benchmarks.throughput --driver fake --compare logs/throughput_<old>.json
+
+Каждая пара (flow, режим) запускается в отдельном процессе python, чтобы peak RSS
+не смешивался между режимами; реальный браузер ходит на utils/demo_site, запущенный
+в родительском процессе. Дочерние процессы работают во временном каталоге: их
+logs/, скриншоты и .cache/ (click cache, журналы) не попадают в checkout и удаляются
+после прогона; кэш путей к chromedriver/geckodriver общий с обычными запусками.
+Результат — JSON (по умолчанию logs/throughput_<ts>.json)
+с git-коммитом в meta: rows/min, p50/p95 длительности строки, доля времени на запуск
+браузера, round trips на строку, peak RSS python и браузерных процессов.
+--compare печатает дельты относительно прошлого артефакта.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LOG_DIR = os.path.join(os.getcwd(), "logs")
+SHEETS = ("login", "signup", "contact", "add_to_cart", "purchase")
+CONFIGS = ("sequential", "pooled", "parallel")
+DRIVERS = ("fake", "chrome", "firefox")
+RSS_SAMPLE_SECONDS = 0.25
+
+
+# --- данные ------------------------------------------------------------------
+
+def write_sheets(dest: str, sheets, n: int, seed: int = 0):
+    """Листы по n строк из utils.testdata_gen (негативные строки завершаются alert'ом — без таймаутов)"""
+    from utils.testdata_gen import generate
+    generate(dest, n, fmt="jsonl", sheets=list(sheets), seed=seed)
+
+
+# --- замер одного режима (дочерний процесс) ------------------------------------
+
+class _LaunchRecorder:
+    """Профайлер для iter_results: время запусков браузера и число остальных команд"""
+
+    def __init__(self):
+        self.launches = []
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    def begin_test(self, test_id, flow=None):
+        pass
+
+    def record(self, command, duration, ok=True, locator=None, step=None):
+        with self._lock:
+            if step == "driver_launch":
+                self.launches.append(duration)
+            else:
+                self.commands += 1
+
+
+def _descendants_rss(pid: int) -> int:
+    """Суммарный RSS (байты) всех потомков процесса: chromedriver, браузер, его renderer'ы"""
+    if PSUTIL_AVAILABLE:
+        total = 0
+        for child in psutil.Process(pid).children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    if not os.path.isdir("/proc"):
+        return 0
+    parents = {}
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            try:
+                with open(f"/proc/{name}/stat") as f:
+                    # после "(comm)" идут state и ppid; comm может содержать пробелы
+                    parents[int(name)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                pass
+    tree, frontier = set(), {pid}
+    while frontier:
+        frontier = {p for p, ppid in parents.items() if ppid in frontier} - tree
+        tree |= frontier
+    total = 0
+    for p in tree:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except (OSError, ValueError):
+            pass
+    return total
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        pid = os.getpid()
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, _descendants_rss(pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def _peak_rss_self() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux: КБ, macOS: байты
+
+
+def measure(driver: str, sheet: str, config: str, data_path: str, workers: int, max_uses: int,
+            screenshots: str) -> dict:
+    """Прогоняет лист через tests.runner.iter_results в одном режиме и возвращает метрики"""
+    from tests.runner import iter_results, load_rows
+    from utils.profiler import percentile
+    from utils.screenshots import set_screenshot_policy
+
+    set_screenshot_policy(screenshots)
+    mode, browser = ("fake", "fake") if driver == "fake" else ("local", driver)
+    if config == "sequential":
+        workers, max_uses = 1, 1
+    elif config == "pooled":
+        workers = 1
+
+    rows = load_rows(data_path, sheet)
+    recorder = _LaunchRecorder()
+    sampler = _RssSampler()
+    sampler.start()
+    durations, statuses = [], Counter()
+    started = time.perf_counter()
+    try:
+        for res in iter_results(mode, browser, None, rows, sheet, workers=workers, max_uses=max_uses,
+                                profiler=recorder):
+            durations.append(res.duration or 0.0)
+            statuses[res.status] += 1
+    finally:
+        wall = time.perf_counter() - started
+        browser_peak = sampler.stop()
+
+    row_time = sum(durations)
+    return {
+        "rows": len(durations),
+        "workers": workers,
+        "max_uses": max_uses,
+        "wall_s": round(wall, 3),
+        "rows_per_min": round(len(durations) / wall * 60, 1) if wall else 0.0,
+        "row_p50_s": round(percentile(durations, 0.5), 4),
+        "row_p95_s": round(percentile(durations, 0.95), 4),
+        "launches": len(recorder.launches),
+        "launch_s": round(sum(recorder.launches), 3),
+        "launch_share": round(sum(recorder.launches) / row_time, 4) if row_time else 0.0,
+        "round_trips_per_row": round(recorder.commands / len(durations), 1) if durations else 0.0,
+        "statuses": dict(statuses),
+        "peak_rss_python_mb": round(_peak_rss_self() / 2 ** 20, 1),
+        "peak_rss_browser_mb": round(browser_peak / 2 ** 20, 1),
+    }
+
+
+# --- оркестрация (родительский процесс) -----------------------------------------
+
+def _run_child(args, sheet, config, data_dir, base_url, workdir) -> dict:
+    """
+    Запускает measure() в отдельном процессе с cwd в своём подкаталоге workdir:
+    logs/ и .cache/ ребёнка (пути от cwd) остаются там и не смешиваются между режимами.
+    """
+    from utils.driver_factory import DRIVER_MANIFEST
+    cwd = os.path.join(workdir, f"{sheet}-{config}")
+    os.makedirs(cwd)
+    out = os.path.join(cwd, "metrics.json")
+    cmd = [sys.executable, "-m", "benchmarks.throughput", "--child", out,
+           "--driver", args.driver, "--sheet", sheet, "--config", config, "--data-dir", data_dir,
+           "--workers", str(args.workers), "--max-uses", str(args.max_uses), "--screenshots", args.screenshots]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(PROJECT_ROOT), env.get("PYTHONPATH")) if p)
+    # драйверы не перерешиваются в каждом ребёнке: manifest тот же, что у обычного запуска
+    env.setdefault("DDT_DRIVER_MANIFEST", DRIVER_MANIFEST)
+    if base_url:
+        env["DDT_BASE_URL"] = base_url
+    proc = subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-15:])
+        raise RuntimeError(f"{sheet}/{config} failed with exit code {proc.returncode}:\n{tail}")
+    with open(out, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(PROJECT_ROOT),
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=str(PROJECT_ROOT),
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+        return commit + ("-dirty" if dirty else "") if commit else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_throughput(args) -> dict:
+    sheets = args.sheet or list(SHEETS)
+    configs = args.config or list(CONFIGS)
+    workdir = tempfile.mkdtemp(prefix="ddt-throughput-")
+    data_dir = os.path.join(workdir, "data")
+    os.makedirs(data_dir)
+    site = None
+    try:
+        write_sheets(data_dir, sheets, args.rows, args.seed)
+        base_url = None
+        if args.driver != "fake":
+            from utils.demo_site import start_demo_site
+            site = start_demo_site()
+            base_url = site.url
+        results = {}
+        for sheet in sheets:
+            for config in configs:
+                metrics = _run_child(args, sheet, config, data_dir, base_url, workdir)
+                results.setdefault(sheet, {})[config] = metrics
+                print(f"{sheet:<12} {config:<10} {metrics['rows_per_min']:>9.1f} rows/min  "
+                      f"p50 {metrics['row_p50_s']:.3f}s  p95 {metrics['row_p95_s']:.3f}s  "
+                      f"launch {metrics['launch_share'] * 100:.1f}%  "
+                      f"rss py {metrics['peak_rss_python_mb']}MB / browser {metrics['peak_rss_browser_mb']}MB  "
+                      f"{metrics['statuses']}", flush=True)
+    finally:
+        if site is not None:
+            site.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "driver": args.driver,
+            "rows": args.rows,
+            "seed": args.seed,
+            "workers": args.workers,
+            "max_uses": args.max_uses,
+            "screenshots": args.screenshots,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "rss_source": "psutil" if PSUTIL_AVAILABLE else "/proc",
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, old: dict) -> str:
+    """Таблица дельт rows/min и p95 относительно прошлого артефакта"""
+    lines = [f"{'flow':<12} {'config':<10} {'rows/min':>20} {'p95 s':>22}  (vs {old['meta'].get('commit')})"]
+    for sheet, configs in report["results"].items():
+        for config, cur in configs.items():
+            base = old.get("results", {}).get(sheet, {}).get(config)
+            if not base:
+                continue
+            rpm = _delta(base["rows_per_min"], cur["rows_per_min"])
+            p95 = _delta(base["row_p95_s"], cur["row_p95_s"])
+            lines.append(f"{sheet:<12} {config:<10} {rpm:>20} {p95:>22}")
+    return "\n".join(lines)
+
+
+def _delta(old, new) -> str:
+    pct = f"{(new / old - 1) * 100:+.1f}%" if old else "n/a"
+    return f"{old:g} -> {new:g} ({pct})"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark: rows/min per flow and execution mode")
+    parser.add_argument("--driver", choices=DRIVERS, default="fake",
+                        help="fake = in-memory driver; chrome/firefox run against a local utils/demo_site")
+    parser.add_argument("--rows", type=int, default=100, help="Rows in each generated sheet")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated sheets (utils.testdata_gen)")
+    parser.add_argument("--sheet", action="append", choices=SHEETS, default=None,
+                        help="Flow to benchmark (default: all five); repeatable")
+    parser.add_argument("--config", action="append", choices=CONFIGS, default=None,
+                        help="Execution mode to benchmark (default: all three); repeatable")
+    parser.add_argument("--workers", type=int, default=4, help="Workers for the parallel mode")
+    parser.add_argument("--max-uses", type=int, default=50, help="Session reuse limit for pooled/parallel modes")
+    parser.add_argument("--screenshots", choices=("always", "on-failure", "off"), default="on-failure",
+                        help="Screenshot policy during the runs")
+    parser.add_argument("--out", default=None, help="JSON artifact (default: logs/throughput_<ts>.json)")
+    parser.add_argument("--compare", default=None, metavar="OLD_JSON", help="Print deltas against a previous artifact")
+    # внутренний режим: один замер в дочернем процессе
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        metrics = measure(args.driver, args.sheet[0], args.config[0], args.data_dir, args.workers,
+                          args.max_uses, args.screenshots)
+        with open(args.child, "w", encoding="utf-8") as f:
+            json.dump(metrics, f)
+        return 0
+
+    report = run_throughput(args)
+    out = args.out or os.path.join(LOG_DIR, f"throughput_{datetime.now().strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"Throughput report: {out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(report, json.load(f)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import os
+
+DEMOBLAZE_URL = "https://www.demoblaze.com"
+
+# Базовый URL тестируемого сайта — один для всех flow и для DriverPool.
+# DDT_BASE_URL или --base-url (runner/pytest); --local-site подставляет URL
+# локального стенда utils/demo_site.
+BASE_URL = (os.getenv("DDT_BASE_URL") or DEMOBLAZE_URL).rstrip("/")
+
+
+def set_base_url(url: str):
+    global BASE_URL
+    BASE_URL = (url or DEMOBLAZE_URL).rstrip("/")
+
+
+def home_url() -> str:
+    return BASE_URL
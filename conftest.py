@@ -17,9 +17,19 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+from config.site_config import home_url, set_base_url
 from utils.logger import get_logger
-from utils.driver_factory import create_local_driver
-from utils.actions import prepare_clean_session
+from utils.actions import ANIMATIONS_DISABLED, click_cache, set_animations_disabled
+from utils.driver_factory import DriverPool, create_local_driver
+from utils.profiler import CommandProfiler
+from utils.result_cache import RESULT_CACHE_TTL, ResultCache, result_cache_enabled
+from utils.screenshots import (
+    SCREENSHOT_POLICIES,
+    finish_test,
+    flush_screenshots,
+    screenshot_policy,
+    set_screenshot_policy,
+)
 
 logger = get_logger("pytest_runner")
 
@@ -32,7 +42,7 @@ def pytest_addoption(parser):
         "--data-file",
         action="store",
         default="sample_test_data.xlsx",
-        help="Path to Excel test data file"
+        help="Test data: .xlsx, .db/.sqlite, directory with <sheet>.csv/.jsonl or path with {sheet}"
     )
     parser.addoption(
         "--sheet",
@@ -44,30 +54,142 @@ def pytest_addoption(parser):
         "--browser",
         action="store",
         default="chrome",
-        help="Browser to use (chrome, firefox, edge)"
+        help="Browser to use (chrome, firefox, edge; fake = in-memory driver without a browser)"
+    )
+    parser.addoption(
+        "--max-uses",
+        action="store",
+        type=int,
+        default=50,
+        help="Recycle a browser session after this many tests (1 = fresh browser per test)"
+    )
+    parser.addoption(
+        "--screenshots",
+        action="store",
+        choices=SCREENSHOT_POLICIES,
+        default=screenshot_policy(),
+        help="Screenshot policy: always, on-failure (write only for failed tests) or off"
+    )
+    parser.addoption(
+        "--screenshot-buffer",
+        action="store",
+        type=int,
+        default=None,
+        help="Frames kept in memory per test (attached to the HTML report)"
+    )
+    parser.addoption(
+        "--profile",
+        action="store",
+        nargs="?",
+        const="",
+        default=None,
+        help="Record every WebDriver command and write a latency report (optional report path)"
+    )
+    parser.addoption(
+        "--no-animations",
+        action="store_true",
+        default=ANIMATIONS_DISABLED,
+        help="Inject CSS disabling transitions/animations on every page"
+    )
+    parser.addoption(
+        "--cache",
+        action="store_true",
+        default=False,
+        help="Reuse the last PASSED result of unchanged rows (also DDT_RESULT_CACHE=1)"
+    )
+    parser.addoption(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Run every test even if the result cache is enabled"
+    )
+    parser.addoption(
+        "--cache-ttl",
+        action="store",
+        type=float,
+        default=RESULT_CACHE_TTL,
+        help="Seconds a cached PASSED result stays valid (0 = no expiry)"
+    )
+    parser.addoption(
+        "--base-url",
+        action="store",
+        default=None,
+        help="Site under test for all flows (default: DDT_BASE_URL or https://www.demoblaze.com)"
+    )
+    parser.addoption(
+        "--local-site",
+        action="store_true",
+        default=False,
+        help="Start the bundled demoblaze stand-in (utils/demo_site) and run against it"
+    )
+    parser.addoption(
+        "--app-version",
+        action="store",
+        default=None,
+        help="Application version/build token; changing it invalidates cached results"
     )
 
 # ============================================================================
 # FIXTURES
 # ============================================================================
-@pytest.fixture(scope="function")
-def browser(request):
-    """Fixture для создания браузера"""
+@pytest.fixture(scope="session")
+def driver_pool(request):
+    """Пул браузерных сессий, общий для всех тестов (один на xdist worker)"""
     browser_name = request.config.getoption("--browser")
-    logger.info(f"Creating browser: {browser_name}")
-    driver = create_local_driver(browser_name)
-    prepare_clean_session(driver, logger)
-    yield driver
-    try:
-        driver.quit()
-    except Exception as e:
-        logger.warning(f"Failed to quit driver: {e}")
+    max_uses = request.config.getoption("--max-uses")
+    logger.info(f"Creating driver pool: {browser_name}, max_uses={max_uses}")
+    profiler = request.config.ddt_profiler
+    pool = DriverPool(lambda: create_local_driver(browser_name, profiler=profiler), max_uses=max_uses, logger=logger)
+    yield pool
+    pool.close()
+
+@pytest.fixture(scope="function")
+def browser(driver_pool, request):
+    """Fixture выдаёт очищенную сессию из пула и возвращает её после теста"""
+    profiler = request.config.ddt_profiler
+    if profiler and hasattr(request.node, "callspec"):
+        sheet_name, row = request.node.callspec.params.get("test_case", (None, None))
+        profiler.begin_test(row.test_id if row else None, sheet_name)
+    with driver_pool.session() as driver:
+        yield driver
+
+def pytest_sessionfinish(session, exitstatus):
+    """Дописываем все скриншоты из очереди и статистику click-стратегий"""
+    flush_screenshots()
+    click_cache.report(logger)
+    profiler = getattr(session.config, "ddt_profiler", None)
+    if profiler:
+        profiler.write_report(session.config.getoption("--profile") or None, logger)
+    result_cache = getattr(session.config, "ddt_result_cache", None)
+    if result_cache:
+        result_cache.report(logger)
+        result_cache.close()
+    demo_site = getattr(session.config, "ddt_demo_site", None)
+    if demo_site:
+        demo_site.stop()
 
 # ============================================================================
 # HTML REPORT CUSTOMIZATION (только если pytest-html установлен)
 # ============================================================================
 def pytest_configure(config):
-    """Настройки для pytest-html"""
+    """Политика скриншотов, анимации и настройки для pytest-html"""
+    set_screenshot_policy(config.getoption("--screenshots"), config.getoption("--screenshot-buffer"))
+    set_animations_disabled(config.getoption("--no-animations"))
+    config.ddt_profiler = CommandProfiler() if config.getoption("--profile") is not None else None
+    # стенд запускается в каждом процессе (в том числе в каждом xdist worker) на свободном порту
+    config.ddt_demo_site = None
+    if config.getoption("--local-site"):
+        from utils.demo_site import start_demo_site
+        config.ddt_demo_site = start_demo_site()
+        set_base_url(config.ddt_demo_site.url)
+    elif config.getoption("--base-url"):
+        set_base_url(config.getoption("--base-url"))
+    config.ddt_result_cache = None
+    # PASSED фейкового driver'а не должен подменять результат настоящего браузера
+    if (result_cache_enabled(config.getoption("--cache"), config.getoption("--no-cache"))
+            and config.getoption("--browser") != "fake"):
+        config.ddt_result_cache = ResultCache(ttl=config.getoption("--cache-ttl"),
+                                              app_version=config.getoption("--app-version"), logger=logger)
     if PYTEST_HTML_AVAILABLE:
         config._metadata = {
             'Project': 'SQA Assignment 6 - Data-Driven Testing',
@@ -75,6 +197,7 @@ def pytest_configure(config):
             'Environment': 'Local/Chrome',
             'Python': '3.x',
             'Framework': 'Selenium + Pytest',
+            'Site': home_url(),
             'Test Data': config.getoption("--data-file", default="sample_test_data.xlsx")
         }
 
@@ -131,36 +254,38 @@ def pytest_runtest_makereport(item, call):
     outcome = yield
     report = outcome.get_result()
 
-    if not PYTEST_HTML_AVAILABLE or report.when != "call":
+    if report.when != "call":
         return
 
-    extra = getattr(report, 'extra', [])
-
-    # Пытаемся получить test_case из funcargs
+    # Закрываем буфер скриншотов теста (в on-failure режиме пишет кадры упавших тестов)
     test_case = item.funcargs.get('test_case')
+    frames = []
     if test_case:
         sheet_name, row = test_case
-        test_id = row.get('test_id', 'UNKNOWN')
+        result = getattr(item, 'test_result', None)
+        status = result.status if result else ("ERROR" if report.failed else "PASSED")
+        frames = finish_test(row.test_id, status, logger)
+
+    if not PYTEST_HTML_AVAILABLE:
+        return
+
+    extra = getattr(report, 'extra', [])
 
+    if test_case:
         # Сохраняем expected и actual для таблицы
-        report.expected = row.get('expected_result', 'N/A')
-
-        # Добавляем скриншоты
-        screenshots_dir = Path("logs/screenshots")
-        if screenshots_dir.exists():
-            screenshots = sorted(list(screenshots_dir.glob(f"{test_id}*.png")))
-            for screenshot in screenshots[-3:]:  # Последние 3 скриншота
-                try:
-                    # Конвертируем путь в относительный для HTML
-                    rel_path = screenshot.relative_to(Path.cwd())
-                    extra.append(extras.image(str(rel_path)))
-                except Exception as e:
-                    logger.warning(f"Failed to add screenshot {screenshot}: {e}")
+        report.expected = row.expected_result or 'N/A'
+
+        # Добавляем последние 3 скриншота прямо из памяти
+        for path, b64_png in frames[-3:]:
+            try:
+                extra.append(extras.image(b64_png, name=Path(path).name, mime_type='image/png', extension='png'))
+            except Exception as e:
+                logger.warning(f"Failed to add screenshot {path}: {e}")
 
         # Добавляем детали результата
         if hasattr(item, 'test_result'):
             result = item.test_result
-            details = result.get('details', '')
+            details = result.details or ''
             if details:
                 # Экранируем HTML символы
                 details_escaped = details.replace('<', '&lt;').replace('>', '&gt;')
@@ -173,6 +298,6 @@ def pytest_runtest_makereport(item, call):
                 extra.append(extras.html(details_html))
 
             # Сохраняем actual для таблицы
-            report.actual = result.get('actual', 'N/A')
+            report.actual = result.actual or 'N/A'
 
-    report.extra = extra
\ No newline at end of file
+    report.extra = extra
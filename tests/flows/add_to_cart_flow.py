@@ -1,27 +1,29 @@
 from selenium.webdriver.common.by import By
 from utils.actions import wait_visible, click_with_fallback, save_screenshot
 from selenium.common.exceptions import NoSuchElementException
+from config.site_config import home_url
+from utils.records import TestResult
 
-HOME_URL = "https://www.demoblaze.com"
 
 def run(driver, data, logger):
-    test_id = data.get("test_id", "A-UNKNOWN")
+    test_id = data.test_id
     logger.info(f"[{test_id}] add_to_cart_flow start")
+    result = TestResult.for_row(data)
     try:
-        driver.get(HOME_URL)
-        products = [p.strip() for p in str(data.get("product","")).split(";") if p.strip()]
+        driver.get(home_url())
+        products = data.products
         added = []
         for prod in products:
             logger.info(f"[{test_id}] add product: {prod}")
             prod_link = wait_visible(driver, By.LINK_TEXT, prod, timeout=10)
-            if not click_with_fallback(driver, prod_link, logger, f"prod_link_{prod}"):
+            if not click_with_fallback(driver, prod_link, logger, "prod_link"):
                 save_screenshot(driver, f"{test_id}_prod_click_failed_{prod}", logger)
-                return {"id": test_id, "status":"ERROR", "error":"product_click_failed"}
+                return result.fail_error("product_click_failed")
 
             add_btn = wait_visible(driver, By.XPATH, "//a[text()='Add to cart']", timeout=8)
-            if not click_with_fallback(driver, add_btn, logger, f"add_to_cart_{prod}"):
+            if not click_with_fallback(driver, add_btn, logger, "add_to_cart"):
                 save_screenshot(driver, f"{test_id}_add_click_failed_{prod}", logger)
-                return {"id": test_id, "status":"ERROR", "error":"add_click_failed"}
+                return result.fail_error("add_click_failed")
             # alert accept
             try:
                 alert = driver.switch_to.alert
@@ -49,8 +51,8 @@ def run(driver, data, logger):
         if missing:
             logger.warning(f"[{test_id}] missing in cart: {missing}")
         save_screenshot(driver, f"{test_id}_cart_{actual}", logger)
-        return {"id": test_id, "expected": data.get("expected_result"), "actual": actual, "status": "PASSED" if actual==str(data.get("expected_result")).upper() else "FAILED"}
+        return result.verdict(actual)
     except Exception as e:
         logger.exception("Exception in add_to_cart_flow")
         save_screenshot(driver, f"{test_id}_cart_exception", logger)
-        return {"id": test_id, "status":"ERROR", "error": str(e)}
+        return result.fail_error(str(e))
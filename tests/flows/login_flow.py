@@ -1,3 +1,5 @@
+import time
+
 from selenium.webdriver.common.by import By
 from utils.actions import (
     wait_visible,
@@ -5,17 +7,38 @@ from utils.actions import (
     wait_until_modal_shown,
     click_with_fallback,
     save_screenshot,
-    debug_element_state,
+    wait_first,
+    fill_form,
 )
+from selenium.webdriver.support import expected_conditions as EC
 # detect_popups должен лежать в utils/popups.py
 from utils.popups import detect_popups
+from config.site_config import home_url
+from utils.records import TestResult
+
+LOGIN_RESULT_TIMEOUT = 8  # максимум ожидания alert'а или #logout2 после submit
+LOGIN_NO_CHANGE_SECONDS = 1.5  # модалка открыта без alert'а и #logout2 столько секунд — исход "без изменений"
+
+
+def modal_still_open(locator, after: float):
+    """
+    Условие для wait_first: через after секунд модалка всё ещё видна (submit ничего
+    не изменил). До этого — без round trip'ов. Закрывшаяся модалка — вход идёт,
+    условие не срабатывает и ожидание #logout2 продолжается.
+    """
+    deadline = time.monotonic() + after
+
+    def condition(driver):
+        if time.monotonic() < deadline:
+            return False
+        return driver.find_element(*locator).is_displayed()
+    return condition
 
-HOME_URL = "https://www.demoblaze.com"
 
 def run(driver, data, logger):
-    test_id = data.get("test_id", "L-UNKNOWN")
+    test_id = data.test_id
     logger.info(f"[{test_id}] login_flow start")
-    result = {"id": test_id, "expected": data.get("expected_result"), "actual": None, "status": "NOT_RUN"}
+    result = TestResult.for_row(data)
 
     try:
         # Optional: try to clear session if helper exists (keeps this flow robust)
@@ -30,54 +53,57 @@ def run(driver, data, logger):
             # helper not present — ok to continue
             pass
 
-        driver.get(HOME_URL)
+        driver.get(home_url())
 
         # open login modal (safe click)
         login_button = wait_visible(driver, By.ID, "login2", timeout=10)
         if not click_with_fallback(driver, login_button, logger, "login2"):
             logger.error(f"[{test_id}] Could not click login2 button")
             save_screenshot(driver, f"{test_id}_login_open_failed", logger)
-            result.update({"actual":"ERROR","status":"ERROR","error":"click_failed"})
-            return result
+            return result.fail_error("click_failed")
 
         # wait until modal fully shown/interactive
         wait_until_modal_shown(driver, (By.ID, "logInModal"), timeout=10)
 
-        # locate inputs (re-query after modal shown)
-        username = wait_visible(driver, By.ID, "loginusername", timeout=8)
-        password = wait_visible(driver, By.ID, "loginpassword", timeout=8)
-
-        # debug state & enter credentials
-        debug_element_state(username, f"{test_id}_loginusername", logger)
-        username.clear(); username.send_keys(str(data.get("username","")))
-        password.clear(); password.send_keys(str(data.get("password","")))
+        # enter credentials (one command in fast mode)
+        fill_form(driver, {
+            (By.ID, "loginusername"): data.username,
+            (By.ID, "loginpassword"): data.password,
+        }, logger=logger)
         logger.debug(f"[{test_id}] Credentials filled")
 
         submit = wait_visible(driver, By.XPATH, "//div[@id='logInModal']//button[text()='Log in']", timeout=8)
         if not click_with_fallback(driver, submit, logger, "login_submit"):
             logger.error(f"[{test_id}] Failed to click login submit")
             save_screenshot(driver, f"{test_id}_login_submit_failed", logger)
-            result.update({"actual":"ERROR","status":"ERROR","error":"submit_click_failed"})
-            return result
+            return result.fail_error("submit_click_failed")
 
         # КРИТИЧНО: Проверяем результат (alert/success) СРАЗУ после submit
         # НЕ ждём закрытия модалки, т.к. alert может заблокировать её!
         logger.debug(f"[{test_id}] Checking for result popup (alert or success)...")
 
-        # Даём небольшую паузу для появления alert'а или закрытия модалки
-        import time
-        time.sleep(1.5)
+        # Ждём одновременно alert (ошибка), #logout2 (успех) и "без изменений" (модалка
+        # всё ещё открыта через LOGIN_NO_CHANGE_SECONDS) — что наступит раньше
+        outcome = wait_first(driver, {
+            "alert": EC.alert_is_present(),
+            "logout": EC.visibility_of_element_located((By.ID, "logout2")),
+            "modal_open": modal_still_open((By.ID, "logInModal"), LOGIN_NO_CHANGE_SECONDS),
+        }, timeout=LOGIN_RESULT_TIMEOUT, logger=logger)
+        logger.debug(f"[{test_id}] Outcome: {outcome['name'] or 'none'} after {outcome['elapsed']}s")
 
-        # Сначала проверяем ТОЛЬКО alert (приоритет!)
         alert_text = None
-        try:
-            alert = driver.switch_to.alert
-            alert_text = alert.text
+        if outcome["name"] == "alert":
+            alert = outcome["value"]
+            try:
+                alert_text = alert.text or "(empty alert)"
+            except Exception:
+                alert_text = "(unreadable alert)"
             logger.info(f"[{test_id}] Native alert found: {alert_text}")
-            alert.accept()
-            logger.debug(f"[{test_id}] Alert accepted")
-        except:
-            pass  # No alert
+            try:
+                alert.accept()
+                logger.debug(f"[{test_id}] Alert accepted")
+            except Exception:
+                pass
 
         # Decide actual result based on alert or logout presence
         actual = None
@@ -97,18 +123,16 @@ def run(driver, data, logger):
             except:
                 pass
         else:
-            # No alert — check logout presence as success indicator
+            # No alert — logout presence is the success indicator
             try:
-                logout_nodes = driver.find_elements(By.ID, "logout2")
-                if logout_nodes and logout_nodes[0].is_displayed():
+                if outcome["name"] == "logout":
                     actual = "PASS"
                     details = "logout2 present"
                     logger.info(f"[{test_id}] logout2 found -> PASS")
                 else:
                     # No logout - check if modal still open (might indicate error)
                     try:
-                        modal = driver.find_element(By.ID, "logInModal")
-                        if modal.is_displayed():
+                        if outcome["name"] == "modal_open" or driver.find_element(By.ID, "logInModal").is_displayed():
                             actual = "FAIL"
                             details = "login modal still open (no alert, no logout)"
                             logger.warning(f"[{test_id}] Modal still open -> FAIL")
@@ -128,25 +152,15 @@ def run(driver, data, logger):
                 logger.exception(f"[{test_id}] Exception while checking logout presence")
 
         # fill result and compare with expected
-        result['actual'] = actual
-        expected = str(data.get('expected_result', "")).upper()
-        result['status'] = "PASSED" if actual == expected else "FAILED"
-        if details:
-            result['details'] = details
+        result.verdict(actual, details)
 
         # Save final screenshot for records
         save_screenshot(driver, f"{test_id}_login_{actual}", logger)
 
-        logger.info(f"[{test_id}] login test finished: expected={expected}, actual={actual}, status={result['status']}")
+        logger.info(f"[{test_id}] login test finished: expected={result.expected}, actual={actual}, status={result.status}")
         return result
 
     except Exception as e:
         logger.exception(f"[{test_id}] Exception in login_flow: {e}")
         save_screenshot(driver, f"{test_id}_login_exception", logger)
-        result.update({"actual":"ERROR","status":"ERROR","error": str(e)})
-        return result
-    finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        return result.fail_error(str(e))
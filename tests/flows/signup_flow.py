@@ -1,31 +1,35 @@
 from selenium.webdriver.common.by import By
 from utils.actions import (
     wait_visible,
-    wait_invisible,
     wait_until_modal_shown,
     click_with_fallback,
     save_screenshot,
+    wait_first,
+    fill_form,
 )
+from selenium.webdriver.support import expected_conditions as EC
 from utils.popups import detect_popups
+from config.site_config import home_url
+from utils.records import TestResult
 import time
 
-HOME_URL = "https://www.demoblaze.com"
 MAX_SIGNUP_ATTEMPTS = 3  # Максимум попыток регистрации
 
 
 def run(driver, data, logger):
-    test_id = data.get("test_id", "S-UNKNOWN")
+    test_id = data.test_id
     logger.info(f"[{test_id}] signup_flow start")
-    result = {"id": test_id, "expected": data.get("expected_result"), "actual": None, "status": "NOT_RUN"}
+    result = TestResult.for_row(data)
 
     # История попыток для логирования
     attempts_history = []
 
     try:
         # Handle dynamic username generation
-        username_raw = data.get("username", "")
+        username_raw = data.username
+        generate = username_raw.startswith("GENERATE_") or username_raw.startswith("AUTO_")
         base_username = username_raw
-        if isinstance(username_raw, str) and (username_raw.startswith("GENERATE_") or username_raw.startswith("AUTO_")):
+        if generate:
             base_username = username_raw.replace("GENERATE_", "").replace("AUTO_", "")
 
         # Retry logic - до MAX_SIGNUP_ATTEMPTS попыток
@@ -33,12 +37,11 @@ def run(driver, data, logger):
             logger.info(f"[{test_id}] Attempt {attempt}/{MAX_SIGNUP_ATTEMPTS}")
 
             # Генерируем уникальное имя для каждой попытки
-            if isinstance(username_raw, str) and (
-                    username_raw.startswith("GENERATE_") or username_raw.startswith("AUTO_")):
+            if generate:
                 username = f"{base_username}_{int(time.time())}_{attempt}"
                 logger.info(f"[{test_id}] Generated unique username: {username}")
             else:
-                username = str(username_raw) if username_raw else ""
+                username = username_raw
 
             # Попытка регистрации
             attempt_result = _attempt_signup(driver, data, username, test_id, attempt, logger)
@@ -54,23 +57,21 @@ def run(driver, data, logger):
             # Если успешно - прерываем цикл
             if attempt_result['actual'] == "PASS":
                 logger.info(f"[{test_id}] Signup successful on attempt {attempt}")
-                result['actual'] = "PASS"
-                result[
-                    'details'] = f"Success on attempt {attempt}/{MAX_SIGNUP_ATTEMPTS}. {attempt_result.get('details', '')}"
+                result.actual = "PASS"
+                result.details = f"Success on attempt {attempt}/{MAX_SIGNUP_ATTEMPTS}. {attempt_result.get('details', '')}"
                 break
 
             # Если это была последняя попытка - используем её результат
             if attempt == MAX_SIGNUP_ATTEMPTS:
                 logger.warning(f"[{test_id}] All {MAX_SIGNUP_ATTEMPTS} attempts failed")
-                result['actual'] = "FAIL"
-                result[
-                    'details'] = f"Failed all {MAX_SIGNUP_ATTEMPTS} attempts. Last: {attempt_result.get('details', '')}"
+                result.actual = "FAIL"
+                result.details = f"Failed all {MAX_SIGNUP_ATTEMPTS} attempts. Last: {attempt_result.get('details', '')}"
             else:
                 # Не последняя попытка - логируем и продолжаем
                 logger.warning(
                     f"[{test_id}] Attempt {attempt} failed: {attempt_result.get('details', '')}. Retrying...")
-                # Небольшая пауза перед следующей попыткой
-                time.sleep(1)
+                # Пауза не нужна: следующая попытка начинается с driver.get(home_url()),
+                # который сам ждёт загрузки страницы, а alert уже принят
 
         # Добавляем историю всех попыток в результат
         if len(attempts_history) > 1:
@@ -78,28 +79,21 @@ def run(driver, data, logger):
                 f"  #{h['attempt']}: {h['actual']} - {h['username']} - {h['details'][:100]}"
                 for h in attempts_history
             ])
-            result['details'] = (result.get('details', '') + history_str).strip()
+            result.details = ((result.details or '') + history_str).strip()
             logger.info(f"[{test_id}] {history_str}")
 
         # Определяем финальный статус
-        expected = str(data.get('expected_result', "")).upper()
-        result['status'] = "PASSED" if result['actual'] == expected else "FAILED"
+        result.verdict(result.actual)
 
-        save_screenshot(driver, f"{test_id}_signup_final_{result['actual']}", logger)
+        save_screenshot(driver, f"{test_id}_signup_final_{result.actual}", logger)
         logger.info(
-            f"[{test_id}] signup test finished: expected={expected}, actual={result['actual']}, status={result['status']}")
+            f"[{test_id}] signup test finished: expected={result.expected}, actual={result.actual}, status={result.status}")
         return result
 
     except Exception as e:
         logger.exception(f"[{test_id}] Exception in signup_flow: {e}")
         save_screenshot(driver, f"{test_id}_signup_exception", logger)
-        result.update({"actual": "ERROR", "status": "ERROR", "error": str(e)})
-        return result
-    finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        return result.fail_error(str(e))
 
 
 def _attempt_signup(driver, data, username, test_id, attempt_num, logger):
@@ -109,7 +103,7 @@ def _attempt_signup(driver, data, username, test_id, attempt_num, logger):
                      }
 
     try:
-        driver.get(HOME_URL)
+        driver.get(home_url())
 
         # Open signup modal
         signup_btn = wait_visible(driver, By.ID, "signin2", timeout=10)
@@ -122,12 +116,10 @@ def _attempt_signup(driver, data, username, test_id, attempt_num, logger):
         wait_until_modal_shown(driver, (By.ID, "signInModal"), timeout=10)
 
         # Fill credentials
-        username_field = wait_visible(driver, By.ID, "sign-username", timeout=8)
-        password_field = wait_visible(driver, By.ID, "sign-password", timeout=8)
-        username_field.clear()
-        username_field.send_keys(username)
-        password_field.clear()
-        password_field.send_keys(str(data.get("password", "")))
+        fill_form(driver, {
+            (By.ID, "sign-username"): username,
+            (By.ID, "sign-password"): data.password,
+        }, logger=logger)
         logger.debug(f"[{test_id}] Attempt {attempt_num}: Credentials filled: username={username}")
 
         # Submit signup
@@ -138,16 +130,31 @@ def _attempt_signup(driver, data, username, test_id, attempt_num, logger):
             attempt_result['details'] = "Failed to click submit button"
             return attempt_result
 
-        # Wait for modal to close
-        try:
-            logger.debug(f"[{test_id}] Attempt {attempt_num}: Waiting for signup modal to close...")
-            wait_invisible(driver, By.ID, "signInModal", timeout=5)
-            logger.debug(f"[{test_id}] Signup modal closed successfully")
-        except Exception as e:
-            logger.warning(f"[{test_id}] Signup modal did not close: {e}")
-
-        # Detect popup/alert
-        pop = detect_popups(driver, timeout=6.0, logger=logger, modal_ids=[])
+        # Ждём одновременно alert и закрытие модалки — что наступит раньше
+        logger.debug(f"[{test_id}] Attempt {attempt_num}: Waiting for alert or signup modal to close...")
+        outcome = wait_first(driver, {
+            "alert": EC.alert_is_present(),
+            "modal_closed": EC.invisibility_of_element_located((By.ID, "signInModal")),
+        }, timeout=5, logger=logger)
+        logger.debug(f"[{test_id}] Attempt {attempt_num}: outcome={outcome['name'] or 'none'} after {outcome['elapsed']}s")
+        if outcome["name"] is None:
+            logger.warning(f"[{test_id}] Signup modal did not close and no alert appeared")
+
+        if outcome["name"] == "alert":
+            alert = outcome["value"]
+            try:
+                alert_text = alert.text or ""
+            except Exception:
+                alert_text = ""
+            try:
+                alert.accept()
+            except Exception:
+                pass
+            pop = {"type": "native_alert", "text": alert_text, "element": None, "selector": None}
+        else:
+            # Detect popup/alert
+            # observer: результат сразу при появлении popup, "none" — как только страница затихла
+            pop = detect_popups(driver, timeout=6.0, logger=logger, modal_ids=[], probe="observer")
         ptype = pop.get("type")
         ptext = (pop.get("text") or "").strip()
 
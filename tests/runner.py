@@ -1,5 +1,9 @@
 import sys
+import time
+import importlib
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -10,108 +14,304 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+from config.site_config import home_url, set_base_url
 from utils.logger import get_logger
-from utils.excel_reader import read_testdata
-from utils.actions import prepare_clean_session
+from utils.data_source import iter_testdata, read_testdata
+from utils.actions import ANIMATIONS_DISABLED, click_cache, set_animations_disabled
+from utils.journal import RunJournal, new_run_id
+from utils.profiler import CommandProfiler
+from utils.records import TestResult, parse_rows
+from utils.result_cache import RESULT_CACHE_TTL, ResultCache, result_cache_enabled
+from utils.sinks import ConsoleSink, JsonlSink, JUnitSink, ResultSummary, default_path
+from utils.screenshots import (
+    SCREENSHOT_POLICIES,
+    begin_test,
+    finish_test,
+    flush_screenshots,
+    screenshot_policy,
+    set_screenshot_policy,
+)
 from utils.driver_factory import (
+    DriverPool,
     create_local_driver,
     create_browserstack_driver,
+    set_browserstack_session_name,
 )
 
-# flows
-from tests.flows.login_flow import run as run_login
-from tests.flows.signup_flow import run as run_signup
-from tests.flows.contact_flow import run as run_contact
-from tests.flows.add_to_cart_flow import run as run_cart
-from tests.flows.purchase_flow import run as run_purchase
-
 logger = get_logger("ddt_runner")
 
+# Flow-модули импортируются лениво (get_flow) — только для запрошенного листа
 FLOW_MAP = {
-    "login": run_login,
-    "signup": run_signup,
-    "contact": run_contact,
-    "add_to_cart": run_cart,
-    "purchase": run_purchase,
+    "login": "tests.flows.login_flow",
+    "signup": "tests.flows.signup_flow",
+    "contact": "tests.flows.contact_flow",
+    "add_to_cart": "tests.flows.add_to_cart_flow",
+    "purchase": "tests.flows.purchase_flow",
 }
 
 
-def run_sheet(mode, browser, preset, data_path, sheet):
-    rows = read_testdata(data_path, sheet_name=sheet)
+def get_flow(sheet):
+    """run() flow-модуля для листа (или None для неизвестного листа)"""
+    flow = FLOW_MAP.get(sheet)
+    if isinstance(flow, str):
+        flow = importlib.import_module(flow).run
+    return flow
+
+
+def _driver_factory(mode, browser, preset, session_name, profiler=None):
+    """Фабрика driver'ов для DriverPool в зависимости от режима"""
+    if mode == "local":
+        return lambda: create_local_driver(browser, profiler=profiler)
+    if mode == "fake":
+        # in-memory driver (utils.fake_driver): без браузера, для CI
+        return lambda: create_local_driver("fake", profiler=profiler)
+    if mode == "browserstack":
+        # BrowserStack уже создаёт чистую сессию
+        return lambda: create_browserstack_driver(preset, session_name, profiler=profiler)
+
+    # неподдерживаемый режим — ERROR в каждой строке, как при любой ошибке создания driver'а
+    def unsupported():
+        raise ValueError(f"Unknown mode: {mode}")
+    return unsupported
+
+
+def run_sheet(mode, browser, preset, data_path, sheet, workers=1, max_uses=50, profiler=None):
+    """
+    Запускает все строки листа и возвращает список результатов в порядке строк.
+    Для больших листов используйте stream_sheet.
+    """
+    rows = load_rows(data_path, sheet)
+    return list(iter_results(mode, browser, preset, rows, sheet,
+                             workers=workers, max_uses=max_uses, profiler=profiler))
+
+
+def stream_sheet(mode, browser, preset, data_path, sheet, workers=1, max_uses=50, profiler=None):
+    """
+    Генератор результатов: строки читаются лениво (iter_testdata), результаты
+    отдаются по мере готовности — память не зависит от размера листа.
+    """
+    rows = load_rows(data_path, sheet, stream=True)
+    return iter_results(mode, browser, preset, rows, sheet,
+                        workers=workers, max_uses=max_uses, profiler=profiler)
+
+
+def load_rows(data_path, sheet, stream=False):
+    """
+    Типизированные строки листа: список (все строки валидируются до запуска первого
+    браузера) или, при stream=True, ленивый генератор.
+    """
+    if stream:
+        logger.info(f"Streaming rows from sheet '{sheet}'")
+        return parse_rows(sheet, iter_testdata(data_path, sheet_name=sheet))
+    rows = list(parse_rows(sheet, read_testdata(data_path, sheet_name=sheet)))
     logger.info(f"Loaded {len(rows)} rows from sheet '{sheet}'")
-    results = []
+    return rows
 
-    for row in rows:
-        test_id = row.get("test_id")
-        logger.info(f"=== Running {test_id} ({sheet}) in {mode} mode ===")
-        driver = None
 
-        try:
-            # Создаём driver в зависимости от режима
-            if mode == "local":
-                driver = create_local_driver(browser)
-                prepare_clean_session(driver, logger)
-            elif mode == "browserstack":
-                test_name = f"{sheet} - {test_id}"
-                driver = create_browserstack_driver(preset, test_name)
-                # BrowserStack уже создаёт чистую сессию
-            else:
-                raise ValueError(f"Unknown mode: {mode}")
-
-            # Выполняем flow
-            flow = FLOW_MAP.get(sheet)
-            res = flow(driver, row, logger)
-            results.append(res)
+def iter_results(mode, browser, preset, rows, sheet, workers=1, max_uses=50, profiler=None, journal=None,
+                 result_cache=None):
+    """
+    Выполняет flow для каждой строки из rows (любой iterable Row) и отдаёт TestResult
+    в порядке строк. Браузеры берутся из DriverPool: сессия переиспользуется между
+    строками и пересоздаётся после max_uses строк или после неудачной health check.
+    При workers > 1 строки идут в пуле потоков (один driver на worker), в работе
+    одновременно не больше 2 * workers строк.
+    С profiler (CommandProfiler) все WebDriver-команды пишутся в профиль.
+    С journal (RunJournal) строки, уже завершённые в этом запуске, не выполняются —
+    отдаётся записанный результат; остальные отмечаются в журнале до и после flow.
+    С result_cache (ResultCache) неизменённые строки с прошлым PASSED не выполняются.
+    """
+    flow = get_flow(sheet)
+    pool = DriverPool(_driver_factory(mode, browser, preset, f"{sheet} - DDT", profiler),
+                      max_uses=max_uses, logger=logger)
 
+    def run_row(row):
+        test_id = row.test_id
+        if journal:
+            done = journal.finished(test_id)
+            if done:
+                logger.info(f"=== Skipping {test_id} ({sheet}): finished in run {journal.run_id} ===")
+                return done
+            journal.start(test_id)
+        cached = result_cache.lookup(flow, row) if result_cache else None
+        if cached:
+            if journal:
+                journal.finish(test_id, cached)
+            return cached
+        logger.info(f"=== Running {test_id} ({sheet}) in {mode} mode ===")
+        begin_test(test_id)
+        if profiler:
+            profiler.begin_test(test_id, sheet)
+        started = time.perf_counter()
+        try:
+            with pool.session() as driver:
+                if mode == "browserstack":
+                    set_browserstack_session_name(driver, f"{sheet} - {test_id}", logger)
+                res = flow(driver, row, logger)
         except Exception as e:
             logger.exception(f"Fatal error running {test_id}: {e}")
-            results.append({"id": test_id, "status": "ERROR", "error": str(e)})
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
+            res = TestResult.for_row(row).fail_error(str(e))
+        res.duration = round(time.perf_counter() - started, 3)
+        finish_test(test_id, res.status, logger)
+        if result_cache:
+            result_cache.store(flow, row, res)
+        if journal:
+            journal.finish(test_id, res)
+        return res
 
-    return results
+    try:
+        if workers > 1:
+            logger.info(f"Running sheet '{sheet}' with {workers} workers")
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ddt-worker") as executor:
+                # ограниченное окно futures: порядок строк сохраняется, весь лист не ставится в очередь
+                pending = deque()
+                for row in rows:
+                    pending.append(executor.submit(run_row, row))
+                    if len(pending) >= 2 * workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+        else:
+            for row in rows:
+                yield run_row(row)
+    finally:
+        pool.close()
+        flush_screenshots()
+        click_cache.report(logger)
+        if result_cache:
+            result_cache.report(logger)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Data-Driven Test Runner")
-    parser.add_argument("--mode", choices=["local", "browserstack", "sauce"],
-                        default="local", help="Execution mode")
+    parser.add_argument("--mode", choices=["local", "browserstack", "sauce", "fake"],
+                        default="local", help="Execution mode (fake: in-memory driver, no browser)")
     parser.add_argument("--browser", default="chrome",
                         help="Browser for local mode")
     parser.add_argument("--preset", default="chrome_latest_win",
                         help="Preset for cloud mode (e.g., chrome_latest_win, firefox_latest_win)")
     parser.add_argument("--sheet", default="login",
-                        help="Excel sheet to test")
+                        help="Sheet (table) to test")
     parser.add_argument("--data", default="sample_test_data.xlsx",
-                        help="Path to Excel test data file")
+                        help="Test data: .xlsx, .db/.sqlite, directory with <sheet>.csv/.jsonl or path with {sheet}")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read rows lazily and stream results (flat memory for very large sheets)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of parallel workers (one browser per worker)")
+    parser.add_argument("--max-uses", type=int, default=50,
+                        help="Recycle a browser session after this many rows (1 = fresh browser per row)")
+    parser.add_argument("--screenshots", choices=SCREENSHOT_POLICIES, default=screenshot_policy(),
+                        help="Screenshot policy: always, on-failure (keep last frames in memory, "
+                             "write only for FAILED/ERROR rows) or off")
+    parser.add_argument("--screenshot-buffer", type=int, default=None,
+                        help="Frames kept per row in on-failure mode")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="REPORT_PATH",
+                        help="Record every WebDriver command and write a latency report "
+                             "(default: logs/webdriver_profile_<ts>.json)")
+    parser.add_argument("--no-animations", action="store_true", default=ANIMATIONS_DISABLED,
+                        help="Inject CSS disabling transitions/animations on every page")
+    parser.add_argument("--jsonl", nargs="?", const="", default=None, metavar="PATH",
+                        help="Append each result as a JSON line as soon as it completes "
+                             "(default: logs/results_<sheet>_<ts>.jsonl)")
+    parser.add_argument("--junit", nargs="?", const="", default=None, metavar="PATH",
+                        help="Write a JUnit XML report, streamed row by row "
+                             "(default: logs/junit_<sheet>_<ts>.xml)")
+    parser.add_argument("--no-progress", action="store_true",
+                        help="Do not print the live progress line (rows/min, ETA)")
+    parser.add_argument("--resume", default=None, metavar="RUN_ID",
+                        help="Continue an interrupted run: rows it finished (PASSED/FAILED) are not "
+                             "executed again; in-flight and ERROR rows are")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="Do not write the run journal (the run cannot be resumed)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse the last PASSED result of rows whose data, flow source, base URL "
+                             "and app version are unchanged (also DDT_RESULT_CACHE=1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Run every row even if the result cache is enabled")
+    parser.add_argument("--cache-ttl", type=float, default=RESULT_CACHE_TTL,
+                        help="Seconds a cached PASSED result stays valid (0 = no expiry)")
+    parser.add_argument("--base-url", default=None,
+                        help="Site under test for all flows (default: DDT_BASE_URL or https://www.demoblaze.com)")
+    parser.add_argument("--local-site", action="store_true",
+                        help="Start the bundled demoblaze stand-in (utils/demo_site) and run against it; "
+                             "latency/faults via DDT_DEMO_* variables")
+    parser.add_argument("--app-version", default=None,
+                        help="Application version/build token; changing it invalidates cached results "
+                             "(default: DDT_APP_VERSION)")
     args = parser.parse_args()
+    set_screenshot_policy(args.screenshots, args.screenshot_buffer)
+    set_animations_disabled(args.no_animations)
+
+    demo_site = None
+    if args.local_site and args.mode == "fake":
+        logger.warning("--local-site ignored: the fake driver does not talk to a site")
+    elif args.local_site:
+        from utils.demo_site import start_demo_site
+        demo_site = start_demo_site()
+        set_base_url(demo_site.url)
+        if args.mode != "local":
+            logger.warning("--local-site listens on 127.0.0.1: remote browsers need a tunnel to reach it")
+    elif args.base_url:
+        set_base_url(args.base_url)
+
+    logger.info(f"Starting DDT Runner: mode={args.mode}, sheet={args.sheet}, preset={args.preset}, "
+                f"workers={args.workers}, site={home_url()}")
+
+    profiler = CommandProfiler() if args.profile is not None else None
+    journal = None
+    if args.resume or not args.no_journal:
+        try:
+            journal = RunJournal(args.resume or new_run_id(args.sheet), args.data, args.sheet,
+                                 resume=bool(args.resume), logger=logger)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        logger.info(f"Run id: {journal.run_id} (resume with --resume {journal.run_id})")
 
-    logger.info(f"Starting DDT Runner: mode={args.mode}, sheet={args.sheet}, preset={args.preset}")
+    result_cache = None
+    # PASSED фейкового driver'а не должен подменять результат настоящего браузера
+    if result_cache_enabled(args.cache, args.no_cache) and args.mode != "fake":
+        result_cache = ResultCache(ttl=args.cache_ttl, app_version=args.app_version, logger=logger)
 
-    results = run_sheet(args.mode, args.browser, args.preset, args.data, args.sheet)
+    rows = load_rows(args.data, args.sheet, stream=args.stream)
+    summary = ResultSummary(total=None if args.stream else len(rows))
+    sinks = [ConsoleSink(progress=not args.no_progress)]
+    if args.jsonl is not None:
+        sinks.append(JsonlSink(args.jsonl or default_path("results", args.sheet, "jsonl")))
+    if args.junit is not None:
+        sinks.append(JUnitSink(args.junit or default_path("junit", args.sheet, "xml"), suite=args.sheet))
 
-    # Выводим результаты
+    # Результаты уходят в sinks по мере готовности; список результатов не храним,
+    # итоги считаются инкрементально
     print("\n" + "=" * 80)
     print("TEST RESULTS:")
     print("=" * 80)
-    for r in results:
-        status_symbol = "✅" if r.get("status") == "PASSED" else "❌"
-        print(
-            f"{status_symbol} {r.get('id')}: {r.get('status')} (expected: {r.get('expected')}, actual: {r.get('actual')})")
-        if r.get('details'):
-            print(f"   Details: {r['details'][:100]}...")
+    completed = False
+    try:
+        for r in iter_results(args.mode, args.browser, args.preset, rows, args.sheet,
+                              workers=args.workers, max_uses=args.max_uses, profiler=profiler,
+                              journal=journal, result_cache=result_cache):
+            summary.add(r)
+            for sink in sinks:
+                sink.write(r, summary)
+        completed = True
+    finally:
+        for sink in sinks:
+            sink.close(summary)
+        if journal:
+            journal.close(completed, logger)
+        if result_cache:
+            result_cache.close()
+        if demo_site:
+            demo_site.stop()
     print("=" * 80)
 
-    # Подсчёт статистики
-    passed = sum(1 for r in results if r.get('status') == 'PASSED')
-    failed = sum(1 for r in results if r.get('status') == 'FAILED')
-    errors = sum(1 for r in results if r.get('status') == 'ERROR')
+    if profiler:
+        profiler.write_report(args.profile or None, logger)
 
-    print(f"\nSummary: {passed} passed, {failed} failed, {errors} errors out of {len(results)} total")
+    counts = summary.counts
+    print(f"\nSummary: {counts['PASSED']} passed, {counts['FAILED']} failed, {counts['ERROR']} errors "
+          f"out of {summary.done} total")
+    print(summary.timing(args.sheet, args.no_animations))
     print("=" * 80)
 
 
@@ -11,6 +11,7 @@ Pytest-based test runner для генерации красивых HTML отч
     # С другим браузером
     pytest tests/test_runner_pytest.py --browser=firefox --html=reports/report.html --self-contained-html
 """
+import importlib
 import pytest
 import sys
 from pathlib import Path
@@ -21,36 +22,50 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from utils.logger import get_logger
-from utils.excel_reader import read_testdata
-
-# Import flows
-from tests.flows.login_flow import run as run_login
-from tests.flows.signup_flow import run as run_signup
-from tests.flows.contact_flow import run as run_contact
-from tests.flows.add_to_cart_flow import run as run_cart
-from tests.flows.purchase_flow import run as run_purchase
+from utils.data_source import read_workbook
+from utils.records import parse_rows
+from utils.screenshots import begin_test
 
 logger = get_logger("pytest_runner")
 
+# Flow-модули импортируются лениво (get_flow) — только для запрошенного листа
 FLOW_MAP = {
-    "login": run_login,
-    "signup": run_signup,
-    "contact": run_contact,
-    "add_to_cart": run_cart,
-    "purchase": run_purchase,
+    "login": "tests.flows.login_flow",
+    "signup": "tests.flows.signup_flow",
+    "contact": "tests.flows.contact_flow",
+    "add_to_cart": "tests.flows.add_to_cart_flow",
+    "purchase": "tests.flows.purchase_flow",
 }
 
-def get_test_cases(sheet_name, data_file):
-    """Загружает тест-кейсы из Excel для конкретного sheet"""
+
+def get_flow(sheet):
+    """run() flow-модуля для листа (или None для неизвестного листа)"""
+    flow = FLOW_MAP.get(sheet)
+    if isinstance(flow, str):
+        flow = importlib.import_module(flow).run
+    return flow
+
+def get_test_cases(sheet_names, data_file):
+    """Загружает тест-кейсы всех sheet'ов за одно открытие источника (xlsx — с кэшем)"""
     try:
-        rows = read_testdata(data_file, sheet_name=sheet_name)
-        return [(sheet_name, row) for row in rows]
+        sheets = read_workbook(data_file, sheet_names)
     except Exception as e:
-        logger.error(f"Failed to load {sheet_name}: {e}")
+        logger.error(f"Failed to load {data_file}: {e}")
         return []
+    cases = []
+    for sheet_name in sheet_names:
+        if sheet_name not in sheets:
+            logger.error(f"Failed to load {sheet_name}: worksheet does not exist")
+            continue
+        # строки типизируются и валидируются здесь, при сборке тестов;
+        # невалидная строка логируется и пропускается, остальные собираются
+        rows = parse_rows(sheet_name, sheets[sheet_name],
+                          on_error=lambda e: logger.error(f"Skipping {e}"))
+        cases.extend((sheet_name, row) for row in rows)
+    return cases
 
 def pytest_generate_tests(metafunc):
-    """Генерация тестов на основе данных из Excel"""
+    """Генерация тестов на основе тестовых данных"""
     if "test_case" in metafunc.fixturenames:
         # Получаем параметры из command line
         data_file = metafunc.config.getoption("--data-file", default="sample_test_data.xlsx")
@@ -62,35 +77,42 @@ def pytest_generate_tests(metafunc):
         else:
             sheets = ["login", "signup", "contact", "add_to_cart", "purchase"]
 
-        # Собираем все test cases
-        all_cases = []
-        for sheet_name in sheets:
-            cases = get_test_cases(sheet_name, data_file)
-            all_cases.extend(cases)
+        # Собираем все test cases (книга открывается один раз)
+        all_cases = get_test_cases(sheets, data_file)
 
         # Параметризация с ID для красивых имён в отчёте
         metafunc.parametrize(
             "test_case",
             all_cases,
-            ids=[f"{sheet}_{row.get('test_id', 'unknown')}" for sheet, row in all_cases]
+            ids=[f"{sheet}_{row.test_id}" for sheet, row in all_cases]
         )
 
-def test_flow(test_case, browser, request):
+def test_flow(test_case, request):
     """
-    Основная функция теста - запускает flow для каждого test case
+    Основная функция теста - запускает flow для каждого test case.
+    Браузер (fixture browser) запрашивается только если результата нет в кэше.
     """
     sheet_name, row = test_case
-    test_id = row.get("test_id", "UNKNOWN")
+    test_id = row.test_id
 
     logger.info(f"=== Running {test_id} from sheet '{sheet_name}' ===")
+    # Скриншоты этого теста попадут в его буфер (см. conftest.pytest_runtest_makereport)
+    begin_test(test_id)
 
     # Получаем нужный flow
-    flow = FLOW_MAP.get(sheet_name)
+    flow = get_flow(sheet_name)
     if not flow:
         pytest.fail(f"Unknown sheet/flow: {sheet_name}")
 
-    # Запускаем flow
-    result = flow(browser, row, logger)
+    # Неизменённая строка с прошлым PASSED — браузер не нужен
+    result_cache = request.config.ddt_result_cache
+    result = result_cache.lookup(flow, row) if result_cache else None
+    if result is None:
+        # Запускаем flow
+        browser = request.getfixturevalue("browser")
+        result = flow(browser, row, logger)
+        if result_cache:
+            result_cache.store(flow, row, result)
 
     # Сохраняем результат в item для использования в хуках
     request.node.test_result = result
@@ -99,10 +121,10 @@ def test_flow(test_case, browser, request):
     logger.info(f"[{test_id}] Result: {result}")
 
     # Проверяем статус
-    status = result.get("status")
-    actual = result.get("actual")
-    expected = result.get("expected")
-    details = result.get("details", "")
+    status = result.status
+    actual = result.actual
+    expected = result.expected
+    details = result.details or ""
 
     # Assert для pytest
     assert status == "PASSED", (
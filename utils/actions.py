@@ -1,3 +1,7 @@
+import atexit
+import json
+import re
+import threading
 import time
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
@@ -6,27 +10,77 @@ from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webdriver import WebDriver
 import os
+from utils.screenshots import writer, buffer, screenshot_extension, screenshot_policy
 
 SCREENSHOT_DIR = os.path.join(os.getcwd(), "logs", "screenshots")
 os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 
+CLEAR_STORAGE_JS = "window.localStorage.clear(); window.sessionStorage.clear();"
+
 def prepare_clean_session(driver, logger=None):
     try:
         driver.delete_all_cookies()
     except Exception as e:
         if logger: logger.warning(f"Failed to delete cookies: {e}")
     try:
-        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        driver.execute_script(CLEAR_STORAGE_JS)
     except Exception:
         if logger: logger.exception("Clear storage failed")
 
 
+RESET_STATE_JS = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+document.querySelectorAll('.modal.show').forEach(function (m) {
+    m.classList.remove('show'); m.style.display = 'none'; m.setAttribute('aria-hidden', 'true');
+});
+document.querySelectorAll('.modal-backdrop, .sweet-overlay, .sweet-alert').forEach(function (n) { n.remove(); });
+document.body.classList.remove('modal-open');
+"""
+
+def reset_session(driver, home_url: str, logger=None):
+    """
+    Fast reset of a reused browser session between rows: dismiss a pending
+    alert, go back to home_url (storage is not available on data:/about: pages),
+    drop cookies and clear storage/modals in a single script.
+    """
+    try:
+        driver.switch_to.alert.dismiss()
+        if logger: logger.debug("reset_session: dismissed pending alert")
+    except Exception:
+        pass
+    driver.get(home_url)
+    try:
+        driver.delete_all_cookies()
+    except Exception as e:
+        if logger: logger.warning(f"Failed to delete cookies: {e}")
+    try:
+        driver.execute_script(RESET_STATE_JS)
+    except Exception:
+        if logger: logger.exception("Reset storage/modals failed")
+
+
 def save_screenshot(driver: WebDriver, name: str, logger=None):
+    """
+    Capture a screenshot according to the screenshot policy (utils.screenshots):
+    "always" hands it to the background writer, "on-failure" only keeps it in the
+    current test's in-memory ring buffer (written by finish_test on FAILED/ERROR),
+    "off" skips the capture. Only the base64 capture blocks the flow.
+    """
+    policy = screenshot_policy()
+    if policy == "off":
+        return None
     safe_name = name.replace(" ", "_").replace("/", "_")
-    path = os.path.join(SCREENSHOT_DIR, f"{safe_name}.png")
+    path = os.path.join(SCREENSHOT_DIR, f"{safe_name}.{screenshot_extension()}")
     try:
-        driver.save_screenshot(path)
-        if logger: logger.info(f"Saved screenshot: {path}")
+        b64_png = driver.get_screenshot_as_base64()
+        buffer.add(path, b64_png)
+        if policy == "always":
+            writer.submit(b64_png, path, logger)
+            if logger: logger.info(f"Saved screenshot: {path}")
+        elif logger:
+            logger.debug(f"Buffered screenshot: {path}")
+        return path
     except Exception:
         if logger: logger.exception("Failed to save screenshot")
 
@@ -43,15 +97,216 @@ def wait_invisible(driver: WebDriver, by, value, timeout: int = 10):
     """Wait until element becomes invisible or is removed from DOM"""
     return WebDriverWait(driver, timeout).until(EC.invisibility_of_element_located((by, value)))
 
+def text_matches(locator: tuple, pattern: str):
+    """Expected condition: element located by `locator` is visible and its text matches regex `pattern`"""
+    rx = re.compile(pattern, re.IGNORECASE)
+
+    def _predicate(driver):
+        for el in driver.find_elements(*locator):
+            if el.is_displayed() and rx.search(el.text or ""):
+                return el
+        return False
+    return _predicate
+
+def wait_first(driver: WebDriver, conditions: dict, timeout: float = 10, poll: float = 0.1, logger=None) -> dict:
+    """
+    Race several expected conditions and return whichever fires first:
+    {"name": key of the condition or None on timeout, "value": its result, "elapsed": seconds, "polls": n}
+
+    `conditions` maps a name to an expected condition (EC.alert_is_present(),
+    EC.visibility_of_element_located(...), EC.invisibility_of_element_located(...),
+    text_matches(...)). Order is priority: within one poll earlier entries win.
+    A condition that raises (e.g. an open alert blocks DOM checks) counts as not met.
+    """
+    start = time.time()
+    state = {"polls": 0}
+
+    def _any(d):
+        state["polls"] += 1
+        for name, condition in conditions.items():
+            try:
+                value = condition(d)
+            except Exception:
+                continue
+            if value:
+                return name, value
+        return False
+
+    try:
+        name, value = WebDriverWait(driver, timeout, poll_frequency=poll).until(_any)
+    except TimeoutException:
+        name, value = None, None
+    outcome = {"name": name, "value": value, "elapsed": round(time.time() - start, 3), "polls": state["polls"]}
+    if logger: logger.debug(f"wait_first: {name or 'timeout'} after {outcome['elapsed']}s ({outcome['polls']} polls)")
+    return outcome
+
+# arguments[0]: [[by, value, text], ...]; arguments[1]: true — только найти и проверить
+# видимость, false — заполнить. Возвращает элементы (или null, если не все видимы)
+# либо индексы ненайденных полей; при заполнении — null (ничего не записано), пока
+# найденное поле скрыто/disabled или его модалка ещё не открылась до конца.
+FORM_JS = """
+var fields = arguments[0], probeOnly = arguments[1];
+function find(by, value) {
+    if (by === 'id') return document.getElementById(value);
+    if (by === 'name') return document.getElementsByName(value)[0] || null;
+    if (by === 'css selector') return document.querySelector(value);
+    if (by === 'class name') return document.getElementsByClassName(value)[0] || null;
+    if (by === 'xpath') return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return null;
+}
+function visible(el) {
+    if (!el || !el.getClientRects().length) return false;
+    var st = window.getComputedStyle(el);
+    return st.display !== 'none' && st.visibility !== 'hidden';
+}
+function settled(el) {
+    var modal = el.closest ? el.closest('.modal') : null;
+    if (!modal) return true;
+    if (!modal.classList.contains('show')) return false;
+    return !modal.getAnimations || modal.getAnimations({subtree: true}).every(function (a) {
+        return a.playState !== 'running';
+    });
+}
+if (probeOnly) {
+    var els = [];
+    for (var i = 0; i < fields.length; i++) {
+        var el = find(fields[i][0], fields[i][1]);
+        if (!visible(el)) return null;
+        els.push(el);
+    }
+    return els;
+}
+var missing = [], nodes = [];
+for (var k = 0; k < fields.length; k++) {
+    var found = find(fields[k][0], fields[k][1]);
+    if (found && (!visible(found) || found.disabled || !settled(found))) return null;
+    nodes.push(found);
+}
+for (var j = 0; j < fields.length; j++) {
+    var node = nodes[j];
+    if (!node) { missing.push(j); continue; }
+    // нативный setter value, чтобы фреймворки с перехватом value увидели изменение
+    var proto = node instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+              : node instanceof HTMLInputElement ? HTMLInputElement.prototype : null;
+    var desc = proto && Object.getOwnPropertyDescriptor(proto, 'value');
+    if (desc && desc.set) desc.set.call(node, fields[j][2]); else node.value = fields[j][2];
+    node.dispatchEvent(new Event('input', {bubbles: true}));
+    node.dispatchEvent(new Event('change', {bubbles: true}));
+}
+return missing;
+"""
+
+FORM_FILL_MODE = os.getenv("DDT_FORM_FILL", "fast")
+
+def _fill_ready(missing):
+    return None if missing is None else (missing,)
+
+def fill_form(driver: WebDriver, fields: dict, mode: str = None, timeout: float = 8, logger=None):
+    """
+    Fill several inputs at once. `fields` maps a locator tuple (By.ID, "name") to its value.
+
+    - mode="fast": all values are set and input/change events fired in a single
+      execute_script (no typing). The script writes nothing until every field it
+      finds is visible, enabled and its modal has finished opening; it is re-polled
+      up to `timeout`, so a settled form still costs one round trip. Fields the
+      script cannot resolve are filled in fidelity mode.
+    - mode="fidelity": one combined wait until every field is visible (one script
+      per poll), then clear() + send_keys() for real keystrokes.
+    Default mode comes from DDT_FORM_FILL (fast).
+    """
+    mode = mode or FORM_FILL_MODE
+    items = [(by, value, "" if text is None else str(text)) for (by, value), text in fields.items()]
+    if mode == "fast":
+        # (missing,) — кортеж, чтобы пустой список "всё заполнено" не считался falsy
+        missing, = WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: _fill_ready(d.execute_script(FORM_JS, [list(i) for i in items], False)))
+        if not missing:
+            if logger: logger.debug(f"fill_form: {len(items)} fields set via JS")
+            return
+        if logger: logger.debug(f"fill_form: {len(missing)} fields not resolved by JS; typing them")
+        items = [items[i] for i in missing]
+
+    # если хоть одно поле не найти из JS (link text и т.п.) — ждём его через WebDriver
+    if all(by in (By.ID, By.NAME, By.CSS_SELECTOR, By.CLASS_NAME, By.XPATH) for by, _, _ in items):
+        elements = WebDriverWait(driver, timeout).until(
+            lambda d: d.execute_script(FORM_JS, [list(i) for i in items], True))
+    else:
+        elements = [wait_visible(driver, by, value, timeout=timeout) for by, value, _ in items]
+    for element, (_, _, text) in zip(elements, items):
+        element.clear()
+        element.send_keys(text)
+    if logger: logger.debug(f"fill_form: {len(items)} fields typed")
+
+# Модалка "показана", когда у неё класс show и закончились CSS transitions
+# (Bootstrap: .fade -> .show на .modal и .modal-dialog). Если анимации отключены
+# (DDT_DISABLE_ANIMATIONS), тот же скрипт добавляет стиль в текущую страницу.
+MODAL_SETTLED_JS = """
+var modal = arguments[0], killAnimations = arguments[1], css = arguments[2];
+if (killAnimations && !document.getElementById('ddt-no-animations')) {
+    var st = document.createElement('style');
+    st.id = 'ddt-no-animations'; st.textContent = css;
+    (document.head || document.documentElement).appendChild(st);
+}
+if (!modal.classList.contains('show')) return false;
+if (modal.getAnimations) {
+    return modal.getAnimations({subtree: true}).every(function (a) { return a.playState !== 'running'; });
+}
+return window.getComputedStyle(modal).opacity === '1';
+"""
+
+NO_ANIMATIONS_CSS = (
+    "*, *::before, *::after { transition: none !important; transition-duration: 0s !important; "
+    "animation: none !important; animation-duration: 0s !important; scroll-behavior: auto !important; }"
+)
+NO_ANIMATIONS_JS = """
+var css = arguments[0];
+function inject() {
+    if (document.getElementById('ddt-no-animations')) return;
+    var st = document.createElement('style');
+    st.id = 'ddt-no-animations'; st.textContent = css;
+    (document.head || document.documentElement).appendChild(st);
+    if (window.jQuery && window.jQuery.fx) window.jQuery.fx.off = true;
+}
+if (document.readyState === 'loading') document.addEventListener('DOMContentLoaded', inject); else inject();
+"""
+
+ANIMATIONS_DISABLED = os.getenv("DDT_DISABLE_ANIMATIONS", "").lower() in ("1", "true", "yes")
+
+def set_animations_disabled(disabled: bool):
+    global ANIMATIONS_DISABLED
+    ANIMATIONS_DISABLED = disabled
+
+def disable_animations(driver, logger=None):
+    """
+    Inject CSS that turns off transitions/animations. On Chromium the style is
+    registered for every new document via CDP; otherwise only the current page is
+    patched (wait_until_modal_shown re-injects it on each modal).
+    """
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                               {"source": f"(function () {{ {NO_ANIMATIONS_JS} }})({json.dumps(NO_ANIMATIONS_CSS)});"})
+        if logger: logger.debug("Animations disabled for all pages (CDP)")
+    except Exception:
+        try:
+            driver.execute_script(NO_ANIMATIONS_JS, NO_ANIMATIONS_CSS)
+        except Exception:
+            if logger: logger.warning("Failed to disable animations")
+
+def apply_animation_policy(driver, logger=None):
+    """Disable animations on a new session if DDT_DISABLE_ANIMATIONS / --no-animations is on"""
+    if ANIMATIONS_DISABLED:
+        disable_animations(driver, logger)
+
 def wait_until_modal_shown(driver: WebDriver, by_value_tuple: tuple, timeout: int = 8):
+    """Wait until the modal is visible and its show transition has finished (no fixed sleep)"""
     by, val = by_value_tuple
     modal = WebDriverWait(driver, timeout).until(EC.visibility_of_element_located((by, val)))
     try:
-        WebDriverWait(driver, timeout).until(lambda d: 'show' in (modal.get_attribute('class') or '') or modal.is_displayed())
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(
+            lambda d: d.execute_script(MODAL_SETTLED_JS, modal, ANIMATIONS_DISABLED, NO_ANIMATIONS_CSS))
     except TimeoutException:
         # proceed even if 'show' class absent
         pass
-    time.sleep(0.12)
     return modal
 
 def scroll_into_view(driver: WebDriver, element):
@@ -73,26 +328,112 @@ def debug_element_state(element, label: str = None, logger=None):
         if logger:
             logger.exception("Failed to get element debug state")
 
-def click_with_fallback(driver: WebDriver, element, logger=None, name_for_logs: str = None):
-    nm = name_for_logs or (element.get_attribute('id') or element.get_attribute('class') or str(element))
-    try:
+CLICK_STRATEGIES = ("native", "actions", "js")
+CLICK_STRATEGY_LABELS = {"native": "normally", "actions": "via ActionChains", "js": "via JS"}
+# Раз в N кликов по одному имени снова пробуем порядок по умолчанию (native первым)
+CLICK_REVALIDATE_EVERY = int(os.getenv("DDT_CLICK_REVALIDATE", "20"))
+CLICK_CACHE_PATH = os.getenv("DDT_CLICK_CACHE") or os.path.join(os.getcwd(), ".cache", "click_strategies.json")
+
+class ClickStrategyCache:
+    """
+    Remembers which click strategy worked for each element name (name_for_logs),
+    within a run and across runs (JSON file), so overlay-prone elements go straight
+    to the strategy that works. Every CLICK_REVALIDATE_EVERY uses the default order
+    is tried again in case a cheaper strategy works now.
+    """
+
+    def __init__(self, path: str = CLICK_CACHE_PATH, revalidate_every: int = CLICK_REVALIDATE_EVERY):
+        self.path = path
+        self.revalidate_every = max(1, revalidate_every)
+        self._entries = None
+        self._lock = threading.Lock()
+        self.stats = {}  # name -> {"hits": n, "misses": n} за этот запуск
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def order(self, name: str) -> list:
+        with self._lock:
+            entry = self._load().get(name)
+            if not entry or entry.get("strategy") not in CLICK_STRATEGIES:
+                return list(CLICK_STRATEGIES)
+            if entry.get("uses", 0) % self.revalidate_every == self.revalidate_every - 1:
+                return list(CLICK_STRATEGIES)
+            learned = entry["strategy"]
+            return [learned] + [st for st in CLICK_STRATEGIES if st != learned]
+
+    def record(self, name: str, strategy: str, first_try: bool):
+        with self._lock:
+            entry = self._load().setdefault(name, {"uses": 0})
+            entry["strategy"] = strategy
+            entry["uses"] = entry.get("uses", 0) + 1
+            counts = self.stats.setdefault(name, {"hits": 0, "misses": 0})
+            counts["hits" if first_try else "misses"] += 1
+
+    def save(self):
+        with self._lock:
+            if not self._entries:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f, indent=2, sort_keys=True)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+    def report(self, logger=None):
+        """Log per-name hit/miss counts for this run and persist learned strategies"""
+        self.save()
+        if not logger or not self.stats:
+            return
+        hits = sum(c["hits"] for c in self.stats.values())
+        misses = sum(c["misses"] for c in self.stats.values())
+        logger.info(f"Click strategy cache: {hits} hits, {misses} misses")
+        for name, c in sorted(self.stats.items()):
+            strategy = (self._entries or {}).get(name, {}).get("strategy")
+            logger.info(f"  {name}: {strategy}, hits={c['hits']}, misses={c['misses']}")
+
+click_cache = ClickStrategyCache()
+atexit.register(click_cache.save)
+
+def _click(driver: WebDriver, element, strategy: str):
+    if strategy == "native":
         scroll_into_view(driver, element)
         element.click()
-        if logger: logger.debug(f"Clicked element normally: {nm}")
-        return True
-    except Exception as e1:
-        if logger: logger.warning(f"Normal click failed for {nm}: {e1}; trying ActionChains")
+    elif strategy == "actions":
+        ActionChains(driver).move_to_element(element).click().perform()
+    else:
+        driver.execute_script("arguments[0].click();", element)
+
+def click_with_fallback(driver: WebDriver, element, logger=None, name_for_logs: str = None):
+    """
+    Click trying native click, ActionChains and JS click in turn; the strategy that
+    worked last time for this name (click_cache) is tried first. name_for_logs is the
+    cache key, so it must be stable per locator ("prod_link", not "prod_link_<product>");
+    without it the default order is used and nothing is cached.
+    """
+    nm = name_for_logs or (element.get_attribute('id') or element.get_attribute('class') or str(element))
+    order = click_cache.order(name_for_logs) if name_for_logs else list(CLICK_STRATEGIES)
+    for i, strategy in enumerate(order):
         try:
-            ActionChains(driver).move_to_element(element).click().perform()
-            if logger: logger.debug(f"Clicked element via ActionChains: {nm}")
+            _click(driver, element, strategy)
+            if name_for_logs:
+                click_cache.record(name_for_logs, strategy, first_try=(i == 0))
+            if logger: logger.debug(f"Clicked element {CLICK_STRATEGY_LABELS[strategy]}: {nm}")
             return True
-        except Exception as e2:
-            if logger: logger.warning(f"ActionChains failed for {nm}: {e2}; trying JS click")
-            try:
-                driver.execute_script("arguments[0].click();", element)
-                if logger: logger.debug(f"Clicked element via JS: {nm}")
-                return True
-            except Exception as e3:
-                if logger: logger.exception(f"All click methods failed for {nm}: {e3}")
-                debug_element_state(element, nm, logger)
-                return False
+        except Exception as e:
+            if i + 1 < len(order):
+                if logger: logger.warning(f"Click {CLICK_STRATEGY_LABELS[strategy]} failed for {nm}: {e}; "
+                                          f"trying {CLICK_STRATEGY_LABELS[order[i + 1]]}")
+            else:
+                if logger: logger.exception(f"All click methods failed for {nm}: {e}")
+    debug_element_state(element, nm, logger)
+    return False
@@ -0,0 +1,336 @@
+"""
+Источник тестовых данных: один контракт (список/поток dict-строк с ключами
+test_id, expected_result, ...) для нескольких форматов.
+
+Формат выбирается по пути --data / --data-file:
+    data.xlsx                 — Excel, лист = sheet (utils.excel_reader)
+    data.db / .sqlite         — SQLite, таблица = sheet
+    data_dir/                 — каталог с файлами <sheet>.csv или <sheet>.jsonl
+    "data/{sheet}.jsonl"      — шаблон пути с {sheet}
+
+Пустые значения (пустая ячейка CSV, null в JSONL/SQLite) — NaN, как в Excel.
+
+Конвертер из Excel:
+    python -m utils.data_source convert sample_test_data.xlsx testdata/ --format jsonl
+    python -m utils.data_source convert sample_test_data.xlsx testdata.db --format sqlite
+
+Синтетические данные для масштабных прогонов (utils.testdata_gen):
+    python -m utils.data_source generate testdata/ --rows 1000000 --seed 42 --negative-ratio 0.25
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+
+from utils import excel_reader
+from utils.excel_reader import BLANK
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl"}
+FORMATS = ("csv", "jsonl", "sqlite", "xlsx")
+
+
+def read_testdata(path: str, sheet_name: str = 'login'):
+    """Строки листа как список dict для любого поддерживаемого формата"""
+    if _is_excel(path):
+        return excel_reader.read_testdata(path, sheet_name)
+    return list(iter_testdata(path, sheet_name))
+
+
+def iter_testdata(path: str, sheet_name: str = 'login'):
+    """Генератор строк листа для любого поддерживаемого формата"""
+    fmt, location = resolve(path, sheet_name)
+    if fmt == "xlsx":
+        return excel_reader.iter_testdata(location, sheet_name)
+    if fmt == "sqlite":
+        return _iter_sqlite(location, sheet_name)
+    if not os.path.exists(location):
+        raise KeyError(f"Worksheet {sheet_name} does not exist: {location}")
+    return _iter_csv(location) if fmt == "csv" else _iter_jsonl(location)
+
+
+def read_workbook(path: str, sheet_names=None) -> dict:
+    """{sheet: rows} для sheet_names (все листы, если None); отсутствующие листы пропускаются"""
+    if _is_excel(path):
+        return excel_reader.read_workbook(path, sheet_names)
+    if sheet_names is None:
+        sheet_names = list_sheets(path)
+    sheets = {}
+    for sheet in sheet_names:
+        try:
+            sheets[sheet] = list(iter_testdata(path, sheet))
+        except KeyError:
+            continue
+    return sheets
+
+
+def list_sheets(path: str) -> list:
+    if _is_excel(path):
+        return list(excel_reader.read_workbook(path).keys())
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        with sqlite3.connect(path) as conn:
+            return [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+    if os.path.isdir(path):
+        return sorted(os.path.splitext(f)[0] for f in os.listdir(path)
+                      if os.path.splitext(f)[1] in FILE_FORMATS)
+    raise ValueError(f"Cannot list sheets of {path}")
+
+
+def resolve(path: str, sheet_name: str):
+    """(format, location) для листа sheet_name"""
+    if "{sheet}" in path:
+        location = path.format(sheet=sheet_name)
+        return _format_of(location), location
+    if os.path.isdir(path):
+        for ext, fmt in FILE_FORMATS.items():
+            location = os.path.join(path, f"{sheet_name}{ext}")
+            if os.path.exists(location):
+                return fmt, location
+        raise KeyError(f"Worksheet {sheet_name} does not exist in {path} (expected {sheet_name}.csv or .jsonl)")
+    return _format_of(path), path
+
+
+def _format_of(path: str) -> str:
+    lower = path.lower()
+    if lower.endswith(EXCEL_EXTENSIONS):
+        return "xlsx"
+    if lower.endswith(SQLITE_EXTENSIONS):
+        return "sqlite"
+    ext = os.path.splitext(lower)[1]
+    if ext in FILE_FORMATS:
+        return FILE_FORMATS[ext]
+    raise ValueError(f"Unsupported test data format: {path}")
+
+
+def _is_excel(path: str) -> bool:
+    return "{sheet}" not in path and path.lower().endswith(EXCEL_EXTENSIONS)
+
+
+def _normalize(record: dict) -> dict:
+    return {str(k).strip(): BLANK if v is None or v == "" else v for k, v in record.items()}
+
+
+def _iter_csv(location):
+    with open(location, newline="", encoding="utf-8-sig") as f:
+        for record in csv.DictReader(f):
+            if all(v in (None, "") for v in record.values()):
+                continue
+            yield _normalize(record)
+
+
+def _iter_jsonl(location):
+    with open(location, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _normalize(json.loads(line))
+
+
+def _iter_sqlite(location, sheet_name):
+    conn = sqlite3.connect(location)
+    try:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (sheet_name,)).fetchone()
+        if not exists:
+            raise KeyError(f"Worksheet {sheet_name} does not exist in {location}")
+        cursor = conn.execute(f'SELECT * FROM "{sheet_name}" ORDER BY rowid')
+        columns = [d[0] for d in cursor.description]
+        for values in cursor:
+            yield _normalize(dict(zip(columns, values)))
+    finally:
+        conn.close()
+
+
+# ============================================================================
+# WRITERS (конвертер и генератор данных)
+# ============================================================================
+def write_testdata(dest: str, sheet_name: str, rows, fmt: str = None, columns=None) -> int:
+    """
+    Потоково записывает строки листа в dest (каталог, шаблон с {sheet}, .db или .xlsx).
+    Столбцы — columns или ключи первой строки. Возвращает число записанных строк.
+    """
+    if fmt is None:
+        fmt = "jsonl" if os.path.isdir(dest) else _format_of(dest)
+    if fmt == "xlsx":
+        return _write_xlsx(dest, [(sheet_name, rows, columns)])[sheet_name]
+    rows, columns = _with_columns(rows, columns)
+    if columns is None:
+        return 0
+
+    if fmt == "sqlite":
+        return _write_sqlite(dest, sheet_name, rows, columns)
+    location = _sheet_location(dest, sheet_name, fmt)
+    os.makedirs(os.path.dirname(os.path.abspath(location)), exist_ok=True)
+    count = 0
+    with open(location, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(["" if _is_blank(row.get(c)) else row.get(c) for c in columns])
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps({c: None if _is_blank(row.get(c)) else row.get(c) for c in columns},
+                                   ensure_ascii=False, default=str))
+                f.write("\n")
+                count += 1
+    return count
+
+
+def write_sheets(dest: str, sheets, fmt: str = None) -> dict:
+    """
+    Записывает несколько листов: sheets — iterable (sheet_name, rows, columns).
+    Для .xlsx — одна write-only книга за один проход (а не перезапись книги на
+    каждый лист). Возвращает {sheet: rows_written}.
+    """
+    if fmt is None:
+        fmt = "jsonl" if os.path.isdir(dest) else _format_of(dest)
+    if fmt == "xlsx":
+        return _write_xlsx(dest, sheets)
+    return {name: write_testdata(dest, name, rows, fmt=fmt, columns=columns) for name, rows, columns in sheets}
+
+
+def _with_columns(rows, columns):
+    """(rows, columns): без columns — ключи первой строки (None для пустого листа)"""
+    rows = iter(rows)
+    if columns is None:
+        first = next(rows, None)
+        if first is None:
+            return rows, None
+        columns = list(first.keys())
+        rows = _chain(first, rows)
+    return rows, columns
+
+
+def _sheet_location(dest, sheet_name, fmt):
+    if "{sheet}" in dest:
+        return dest.format(sheet=sheet_name)
+    return os.path.join(dest, f"{sheet_name}.{fmt}")
+
+
+def _write_sqlite(dest, sheet_name, rows, columns):
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    conn = sqlite3.connect(dest)
+    try:
+        cols = ", ".join(f'"{c}"' for c in columns)
+        conn.execute(f'DROP TABLE IF EXISTS "{sheet_name}"')
+        conn.execute(f'CREATE TABLE "{sheet_name}" ({cols})')
+        insert = f'INSERT INTO "{sheet_name}" ({cols}) VALUES ({", ".join("?" for _ in columns)})'
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append([None if _is_blank(row.get(c)) else _sqlite_value(row.get(c)) for c in columns])
+            if len(batch) >= 10000:
+                conn.executemany(insert, batch)
+                count += len(batch)
+                batch = []
+        conn.executemany(insert, batch)
+        count += len(batch)
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+def _write_xlsx(dest, sheets):
+    """
+    Добавляет/заменяет листы в .xlsx за один проход в write-only режиме openpyxl.
+    Остальные листы существующей книги переносятся потоково (read-only: значения
+    и формулы, без оформления), книга целиком в память не загружается; результат
+    пишется во временный файл и заменяет dest.
+    """
+    from openpyxl import Workbook, load_workbook
+    sheets = list(sheets)
+    replaced = {name for name, _, _ in sheets}
+    wb = Workbook(write_only=True)
+    if os.path.exists(dest):
+        old = load_workbook(dest, read_only=True)
+        try:
+            for name in old.sheetnames:
+                if name in replaced:
+                    continue
+                ws = wb.create_sheet(name)
+                for values in old[name].iter_rows(values_only=True):
+                    ws.append(values)
+        finally:
+            old.close()
+    written = {}
+    for name, rows, columns in sheets:
+        rows, columns = _with_columns(rows, columns)
+        ws = wb.create_sheet(name)
+        count = 0
+        if columns is not None:
+            ws.append(columns)
+            for row in rows:
+                ws.append([None if _is_blank(row.get(c)) else row.get(c) for c in columns])
+                count += 1
+        written[name] = count
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    tmp = f"{dest}.tmp"
+    wb.save(tmp)
+    os.replace(tmp, dest)
+    return written
+
+
+def _sqlite_value(value):
+    return value if isinstance(value, (int, float, str, bytes)) else str(value)
+
+
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def convert(src: str, dest: str, fmt: str, sheets=None) -> dict:
+    """Конвертирует листы src (любой формат) в dest/fmt; возвращает {sheet: rows_written}"""
+    sheets = sheets or list_sheets(src)
+    return write_sheets(dest, ((sheet, iter_testdata(src, sheet), None) for sheet in sheets), fmt=fmt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test data tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    conv = sub.add_parser("convert", help="Convert test data between formats (e.g. xlsx -> jsonl/csv/sqlite)")
+    conv.add_argument("src", help="Source: .xlsx, .db/.sqlite, directory or path with {sheet}")
+    conv.add_argument("dest", help="Destination: directory (csv/jsonl), path with {sheet}, .db or .xlsx")
+    conv.add_argument("--format", choices=FORMATS, required=True)
+    conv.add_argument("--sheets", nargs="*", default=None, help="Sheets to convert (default: all)")
+    gen = sub.add_parser("generate", help="Generate synthetic rows for every flow (scale and soak runs)")
+    gen.add_argument("dest", help="Destination: directory (jsonl by default), path with {sheet}, .db or .xlsx")
+    gen.add_argument("--format", choices=FORMATS, default=None, help="Output format (default: from dest)")
+    gen.add_argument("--rows", type=int, required=True, help="Rows per sheet")
+    gen.add_argument("--sheets", nargs="*", default=None, help="Sheets to generate (default: all five flows)")
+    gen.add_argument("--seed", type=int, default=0, help="RNG seed; the same seed gives the same rows")
+    gen.add_argument("--negative-ratio", type=float, default=None,
+                     help="Fraction of FAIL rows in login/signup/purchase (default 0.25)")
+    gen.add_argument("--user", action="append", default=[], metavar="USER:PASSWORD",
+                     help="Existing account on the target for positive login rows; repeatable (default test:test)")
+    gen.add_argument("--max-products", type=int, default=None, help="Max products per add_to_cart row (default 3)")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        from utils import testdata_gen
+        users = dict(u.split(":", 1) for u in args.user if ":" in u) or None
+        started = time.perf_counter()
+        written = testdata_gen.generate(
+            args.dest, args.rows, args.format, args.sheets, args.seed,
+            testdata_gen.DEFAULT_NEGATIVE_RATIO if args.negative_ratio is None else args.negative_ratio,
+            users, args.max_products or testdata_gen.DEFAULT_MAX_PRODUCTS)
+        print(f"Generated {sum(written.values())} rows in {time.perf_counter() - started:.1f}s (seed {args.seed})")
+    else:
+        written = convert(args.src, args.dest, args.format, args.sheets)
+    for sheet, count in written.items():
+        print(f"{sheet}: {count} rows -> {args.dest} ({args.format or 'auto'})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+from utils.demo_site.server import DemoBackend, DemoSite, DemoSiteConfig, start_demo_site
+
+__all__ = ["DemoBackend", "DemoSite", "DemoSiteConfig", "start_demo_site"]
@@ -0,0 +1,3 @@
+from utils.demo_site.server import main
+
+main()
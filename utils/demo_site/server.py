@@ -0,0 +1,287 @@
+"""
+Локальный стенд demoblaze для офлайн-запусков и воспроизводимых бенчмарков.
+
+Воспроизводит DOM-контракт, на который опираются flow: #login2/#logInModal,
+#signin2/#signInModal, #exampleModal, #cartur/#tbodyid, #orderModal, нативные
+alert'ы с текстами demoblaze и подтверждение покупки .sweet-alert.
+Пользователи хранятся в памяти сервера, корзина — в localStorage браузера.
+
+Запуск отдельно:
+    python -m utils.demo_site --port 8000 --latency /api/login=0.3 --error-rate /api/order=0.1 --modal-ms 400
+    python tests/runner.py --base-url http://127.0.0.1:8000 --sheet login
+или из harness: python tests/runner.py --local-site (pytest: --local-site).
+
+Переменные окружения для --local-site:
+    DDT_DEMO_LATENCY    — "путь=секунды,..." (префикс пути, "*" — по умолчанию), например "*=0.02,/api/login=0.3"
+    DDT_DEMO_ERROR_RATE — "путь=доля,..." — доля ответов HTTP 500
+    DDT_DEMO_MODAL_MS   — длительность анимации модалок, мс (по умолчанию 150)
+    DDT_DEMO_USERS      — "user:password,..." — заранее зарегистрированные пользователи
+    DDT_DEMO_SEED       — seed генератора ошибок
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+PAGES = {
+    "/": ("index", '<div id="tbodyid"></div>'),
+    "/index.html": ("index", '<div id="tbodyid"></div>'),
+    "/prod.html": ("prod", '<div id="tbodyid"></div>'),
+    "/cart.html": ("cart", """<h2>Products</h2>
+<table class="table">
+    <thead><tr><th>Pic</th><th>Title</th><th>Price</th><th>x</th></tr></thead>
+    <tbody id="tbodyid"></tbody>
+</table>
+<h2>Total</h2>
+<h3 id="totalp"></h3>
+<button type="button" class="btn btn-success" onclick="$('totalm').textContent = renderCart(); showModal('orderModal')">Place Order</button>"""),
+}
+CONTENT_TYPES = {".css": "text/css; charset=utf-8", ".js": "application/javascript; charset=utf-8"}
+DEFAULT_USERS = {"test": "test"}
+PRODUCTS = (
+    {"id": 1, "title": "Samsung galaxy s6", "price": 360},
+    {"id": 2, "title": "Nokia lumia 1520", "price": 820},
+    {"id": 3, "title": "Nexus 6", "price": 650},
+    {"id": 4, "title": "Samsung galaxy s7", "price": 800},
+    {"id": 5, "title": "Iphone 6 32gb", "price": 790},
+    {"id": 6, "title": "Sony xperia z5", "price": 320},
+    {"id": 7, "title": "HTC One M9", "price": 700},
+    {"id": 8, "title": "Sony vaio i5", "price": 790},
+    {"id": 9, "title": "Sony vaio i7", "price": 790},
+    {"id": 10, "title": "Apple monitor 24", "price": 400},
+    {"id": 11, "title": "MacBook air", "price": 700},
+    {"id": 12, "title": "Dell i7 8gb", "price": 700},
+    {"id": 13, "title": "2017 Dell 15.6 Inch", "price": 700},
+    {"id": 14, "title": "ASUS Full HD", "price": 230},
+    {"id": 15, "title": "MacBook Pro", "price": 1100},
+)
+
+
+@dataclass
+class DemoSiteConfig:
+    latency: dict = field(default_factory=dict)      # префикс пути -> секунды ("*" — для всех)
+    error_rate: dict = field(default_factory=dict)   # префикс пути -> доля ответов 500
+    modal_ms: int = 150
+    users: dict = field(default_factory=lambda: dict(DEFAULT_USERS))
+    seed: int = None
+
+    @classmethod
+    def from_env(cls):
+        users = dict(DEFAULT_USERS)
+        users.update(_parse_pairs(os.getenv("DDT_DEMO_USERS", ""), str, sep=":"))
+        seed = os.getenv("DDT_DEMO_SEED")
+        return cls(latency=_parse_pairs(os.getenv("DDT_DEMO_LATENCY", ""), float),
+                   error_rate=_parse_pairs(os.getenv("DDT_DEMO_ERROR_RATE", ""), float),
+                   modal_ms=int(os.getenv("DDT_DEMO_MODAL_MS", "150")),
+                   users=users,
+                   seed=int(seed) if seed else None)
+
+    def for_path(self, table: dict, path: str) -> float:
+        """Значение для самого длинного совпавшего префикса пути (или "*")"""
+        matches = [p for p in table if p != "*" and path.startswith(p)]
+        if matches:
+            return table[max(matches, key=len)]
+        return table.get("*", 0.0)
+
+
+class DemoBackend:
+    """
+    Серверная часть стенда без HTTP: пользователи, заказы, задержки и fault injection.
+    Общая для DemoSite и utils.fake_driver, чтобы оба давали одинаковые ответы.
+    """
+
+    def __init__(self, config: DemoSiteConfig = None):
+        self.config = config or DemoSiteConfig()
+        self.users = dict(self.config.users)
+        self.orders = 0
+        self.requests = 0
+        self.faults = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+
+    def latency(self, path) -> float:
+        return self.config.for_path(self.config.latency, path)
+
+    def fault(self, path) -> bool:
+        """Учитывает запрос; True — ответить ошибкой (доля из error_rate)"""
+        rate = self.config.for_path(self.config.error_rate, path)
+        with self._lock:
+            self.requests += 1
+            fault = rate > 0 and self._random.random() < rate
+            self.faults += fault
+        return fault
+
+    def api(self, path, payload):
+        username = str(payload.get("username") or "")
+        password = str(payload.get("password") or "")
+        with self._lock:
+            if path == "/api/login":
+                if username not in self.users:
+                    return {"errorMessage": "User does not exist."}
+                if self.users[username] != password:
+                    return {"errorMessage": "Wrong password."}
+                return {"token": f"demo-{username}"}
+            if path == "/api/signup":
+                if username in self.users:
+                    return {"errorMessage": "This user already exist."}
+                self.users[username] = password
+                return {}
+            if path == "/api/order":
+                self.orders += 1
+                return {"id": 1000000 + self.orders}
+            if path in ("/api/contact", "/api/addtocart"):
+                return {}
+        return None
+
+
+class DemoSite:
+    """HTTP-сервер стенда в фоновом потоке; url — базовый URL для config.site_config"""
+
+    def __init__(self, config: DemoSiteConfig = None, host="127.0.0.1", port=0):
+        self.config = config or DemoSiteConfig()
+        self.backend = DemoBackend(self.config)
+        self._layout = _read_static("layout.html").decode("utf-8")
+        self.httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="demo-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def inject(self, path):
+        """Задержка и (возможно) ошибка для пути; True — ответить 500"""
+        delay = self.backend.latency(path)
+        if delay > 0:
+            time.sleep(delay)
+        return self.backend.fault(path)
+
+    def render(self, path):
+        page, content = PAGES[path]
+        return self._layout.replace("{{page}}", page).replace("{{content}}", content).encode("utf-8")
+
+    def api(self, path, payload):
+        return self.backend.api(path, payload)
+
+
+def _handler_for(site: DemoSite):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="text/html; charset=utf-8"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if site.inject(path):
+                return self._send(500, b"Injected server error")
+            if path in PAGES:
+                return self._send(200, site.render(path))
+            if path == "/config.js":
+                config = {"modalMs": site.config.modal_ms, "products": PRODUCTS}
+                body = f"window.DEMO_CONFIG = {json.dumps(config)};".encode("utf-8")
+                return self._send(200, body, CONTENT_TYPES[".js"])
+            name = path.lstrip("/")
+            ext = os.path.splitext(name)[1]
+            if ext in CONTENT_TYPES and "/" not in name:
+                return self._send(200, _read_static(name), CONTENT_TYPES[ext])
+            self._send(404, b"Not found")
+
+        def do_POST(self):
+            path = urlsplit(self.path).path
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send(400, b"Bad JSON")
+            if site.inject(path):
+                return self._send(500, b"Injected server error")
+            result = site.api(path, payload)
+            if result is None:
+                return self._send(404, b"Not found")
+            self._send(200, json.dumps(result).encode("utf-8"), "application/json")
+
+    return Handler
+
+
+_static_cache = {}
+
+
+def _read_static(name) -> bytes:
+    if name not in _static_cache:
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            _static_cache[name] = f.read()
+    return _static_cache[name]
+
+
+def _parse_pairs(spec, cast, sep="="):
+    pairs = {}
+    for item in (spec or "").split(","):
+        if sep in item:
+            key, value = item.split(sep, 1)
+            pairs[key.strip()] = cast(value.strip())
+    return pairs
+
+
+def start_demo_site(config: DemoSiteConfig = None, host="127.0.0.1", port=0) -> DemoSite:
+    """Запускает стенд в фоновом потоке (port=0 — свободный порт)"""
+    return DemoSite(config or DemoSiteConfig.from_env(), host, port).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local demoblaze stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", action="append", default=[], metavar="PATH=SECONDS",
+                        help="Delay for requests whose path starts with PATH ('*' = all); repeatable")
+    parser.add_argument("--error-rate", action="append", default=[], metavar="PATH=FRACTION",
+                        help="Fraction of requests answered with HTTP 500; repeatable")
+    parser.add_argument("--modal-ms", type=int, default=None, help="Modal show/hide animation duration, ms")
+    parser.add_argument("--user", action="append", default=[], metavar="USER:PASSWORD",
+                        help="Pre-registered user; repeatable")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for fault injection")
+    args = parser.parse_args(argv)
+
+    config = DemoSiteConfig.from_env()
+    config.latency.update(_parse_pairs(",".join(args.latency), float))
+    config.error_rate.update(_parse_pairs(",".join(args.error_rate), float))
+    config.users.update(_parse_pairs(",".join(args.user), str, sep=":"))
+    if args.modal_ms is not None:
+        config.modal_ms = args.modal_ms
+    if args.seed is not None:
+        config.seed = args.seed
+
+    site = DemoSite(config, args.host, args.port)
+    print(f"Demo site on {site.url} (latency={config.latency}, error_rate={config.error_rate}, "
+          f"modal_ms={config.modal_ms})")
+    try:
+        site.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.httpd.server_close()
@@ -0,0 +1,175 @@
+// Клиентская логика стенда: модалки, нативные alert'ы и .sweet-alert с текстами demoblaze.
+// Параметры стенда (длительность анимации модалок, каталог) приходят из /config.js (window.DEMO_CONFIG).
+var DEMO = window.DEMO_CONFIG || {modalMs: 150, products: []};
+document.documentElement.style.setProperty('--modal-ms', DEMO.modalMs + 'ms');
+
+var PRODUCTS = DEMO.products || [];
+
+function $(id) { return document.getElementById(id); }
+
+function api(path, payload, onOk) {
+    // ошибка/таймаут стенда (fault injection) не показывает ничего — как потерянный запрос
+    fetch(path, {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(payload || {})})
+        .then(function (r) { if (!r.ok) throw new Error('HTTP ' + r.status); return r.json(); })
+        .then(onOk)
+        .catch(function (e) { console.error('demo api ' + path + ': ' + e); });
+}
+
+function showModal(id) {
+    var m = $(id);
+    m.style.display = 'block';
+    m.removeAttribute('aria-hidden');
+    document.body.classList.add('modal-open');
+    if (!document.querySelector('.modal-backdrop')) {
+        var b = document.createElement('div');
+        b.className = 'modal-backdrop';
+        document.body.appendChild(b);
+    }
+    void m.offsetWidth;  // reflow, чтобы transition opacity запустился
+    m.classList.add('show');
+}
+
+function hideModal(id) {
+    var m = $(id);
+    m.classList.remove('show');
+    setTimeout(function () {
+        if (m.classList.contains('show')) return;
+        m.style.display = 'none';
+        m.setAttribute('aria-hidden', 'true');
+        document.body.classList.remove('modal-open');
+        document.querySelectorAll('.modal-backdrop').forEach(function (b) { b.remove(); });
+    }, DEMO.modalMs);
+}
+
+function getCookie(name) {
+    var m = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+    return m ? decodeURIComponent(m[1]) : null;
+}
+
+function renderUser() {
+    var user = getCookie('user');
+    $('login2').style.display = user ? 'none' : '';
+    $('signin2').style.display = user ? 'none' : '';
+    $('logout2').style.display = user ? '' : 'none';
+    $('nameofuser').style.display = user ? '' : 'none';
+    $('nameofuser').textContent = user ? 'Welcome ' + user : '';
+}
+
+function logIn() {
+    var username = $('loginusername').value, password = $('loginpassword').value;
+    if (!username || !password) { alert('Please fill out Username and Password.'); return; }
+    api('/api/login', {username: username, password: password}, function (res) {
+        if (res.errorMessage) { alert(res.errorMessage); return; }
+        document.cookie = 'user=' + encodeURIComponent(username) + '; path=/';
+        hideModal('logInModal');
+        renderUser();
+    });
+}
+
+function logOut() {
+    document.cookie = 'user=; path=/; expires=Thu, 01 Jan 1970 00:00:00 GMT';
+    renderUser();
+}
+
+function register() {
+    var username = $('sign-username').value, password = $('sign-password').value;
+    if (!username || !password) { alert('Please fill out Username and Password.'); return; }
+    api('/api/signup', {username: username, password: password}, function (res) {
+        if (res.errorMessage) { alert(res.errorMessage); return; }
+        alert('Sign up successful.');
+        hideModal('signInModal');
+    });
+}
+
+function send() {
+    api('/api/contact', {
+        email: $('recipient-email').value, name: $('recipient-name').value, message: $('message-text').value
+    }, function () {
+        alert('Thanks for the message!!');
+        hideModal('exampleModal');
+    });
+}
+
+function cart() {
+    try { return JSON.parse(localStorage.getItem('cart') || '[]'); } catch (e) { return []; }
+}
+
+function addToCart(id) {
+    api('/api/addtocart', {id: id}, function () {
+        var items = cart();
+        items.push(id);
+        localStorage.setItem('cart', JSON.stringify(items));
+        alert('Product added.');
+    });
+}
+
+function renderProducts() {
+    $('tbodyid').innerHTML = PRODUCTS.map(function (p) {
+        return '<div class="card"><h4 class="card-title"><a href="prod.html?idp_=' + p.id + '" class="hrefch">' +
+            p.title + '</a></h4><h5>$' + p.price + '</h5></div>';
+    }).join('');
+}
+
+function renderProduct() {
+    var id = parseInt(new URLSearchParams(location.search).get('idp_'), 10);
+    var p = PRODUCTS.filter(function (x) { return x.id === id; })[0];
+    if (!p) { $('tbodyid').innerHTML = '<h2 class="name">Product not found</h2>'; return; }
+    $('tbodyid').innerHTML = '<h2 class="name">' + p.title + '</h2><h3 class="price-container">$' + p.price +
+        ' *includes tax</h3><div class="row"><a href="#" onclick="addToCart(' + p.id +
+        '); return false;" class="btn btn-success btn-lg">Add to cart</a></div>';
+}
+
+function renderCart() {
+    var total = 0;
+    $('tbodyid').innerHTML = cart().map(function (id, i) {
+        var p = PRODUCTS.filter(function (x) { return x.id === id; })[0];
+        if (!p) return '';
+        total += p.price;
+        return '<tr class="success"><td></td><td>' + p.title + '</td><td>' + p.price +
+            '</td><td><a href="#" onclick="deleteItem(' + i + '); return false;">Delete</a></td></tr>';
+    }).join('');
+    $('totalp').textContent = total || '';
+    return total;
+}
+
+function deleteItem(index) {
+    var items = cart();
+    items.splice(index, 1);
+    localStorage.setItem('cart', JSON.stringify(items));
+    renderCart();
+}
+
+function purchaseOrder() {
+    var name = $('name').value, card = $('card').value;
+    if (!name || !card) { alert('Please fill out Name and Creditcard.'); return; }
+    var amount = renderCart();
+    api('/api/order', {name: name, country: $('country').value, city: $('city').value, card: card,
+                       month: $('month').value, year: $('year').value, amount: amount}, function (res) {
+        localStorage.setItem('cart', '[]');
+        hideModal('orderModal');
+        var overlay = document.createElement('div');
+        overlay.className = 'sweet-overlay';
+        var box = document.createElement('div');
+        box.className = 'sweet-alert showSweetAlert visible';
+        box.innerHTML = '<h2>Thank you for your purchase!</h2><p class="lead text-muted">Id: ' + res.id +
+            '<br>Amount: ' + amount + ' USD<br>Card Number: ' + card + '<br>Name: ' + name + '</p>' +
+            '<button class="confirm btn btn-lg btn-primary">OK</button>';
+        box.querySelector('.confirm').onclick = function () { location.href = 'index.html'; };
+        document.body.appendChild(overlay);
+        document.body.appendChild(box);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    renderUser();
+    document.querySelectorAll('[data-modal]').forEach(function (a) {
+        a.addEventListener('click', function (e) { e.preventDefault(); showModal(a.getAttribute('data-modal')); });
+    });
+    document.querySelectorAll('[data-dismiss]').forEach(function (b) {
+        b.addEventListener('click', function () { hideModal(b.closest('.modal').id); });
+    });
+    var page = document.body.getAttribute('data-page');
+    if (page === 'index') renderProducts();
+    if (page === 'prod') renderProduct();
+    if (page === 'cart') renderCart();
+});
@@ -1,30 +1,56 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 from selenium import webdriver
 from selenium.webdriver.remote.webdriver import WebDriver
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
 
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.firefox.service import Service as FFService
 
 from config import browserstack_config
+from config.site_config import home_url as site_home_url
+from utils.actions import apply_animation_policy, prepare_clean_session, reset_session
+from utils.profiler import profile_driver
+
+
+# Кэш путей к chromedriver/geckodriver: в памяти процесса + manifest на диске,
+# ключ — браузер и его версия. Переменные окружения:
+#   CHROMEDRIVER_PATH / GECKODRIVER_PATH — зафиксированный путь, webdriver-manager не вызывается
+#   DDT_DRIVER_OFFLINE=1 — брать путь только из manifest, без сети
+DRIVER_MANIFEST = os.getenv("DDT_DRIVER_MANIFEST") or os.path.join(os.getcwd(), ".cache", "drivers.json")
+PINNED_DRIVER_ENV = {"chrome": "CHROMEDRIVER_PATH", "firefox": "GECKODRIVER_PATH"}
+
+_driver_paths = {}
+_driver_paths_lock = threading.Lock()
+
+
+def create_local_driver(browser: str = 'chrome', profiler=None) -> WebDriver:
+    """
+    Создаёт локальный WebDriver. С profiler (utils.profiler.CommandProfiler)
+    запуск браузера и все команды driver'а записываются в профиль.
+    """
+    started = time.perf_counter()
+    driver = _launch_local_driver(browser.lower())
+    return _attach_profiler(driver, profiler, time.perf_counter() - started)
 
 
-def create_local_driver(browser: str = 'chrome') -> WebDriver:
-    """Создаёт локальный WebDriver"""
-    browser = browser.lower()
+def _launch_local_driver(browser: str) -> WebDriver:
     if browser == 'chrome':
         options = webdriver.ChromeOptions()
         options.add_argument("--start-maximized")
         options.add_argument("--disable-blink-features=AutomationControlled")  # Скрываем автоматизацию
         driver = webdriver.Chrome(
-            service=ChromeService(ChromeDriverManager().install()),
+            service=ChromeService(resolve_driver_path('chrome')),
             options=options
         )
         return driver
     elif browser == 'firefox':
         options = webdriver.FirefoxOptions()
         driver = webdriver.Firefox(
-            service=FFService(GeckoDriverManager().install()),
+            service=FFService(resolve_driver_path('firefox')),
             options=options
         )
         driver.maximize_window()
@@ -33,17 +59,96 @@ def create_local_driver(browser: str = 'chrome') -> WebDriver:
         driver = webdriver.Safari()
         driver.maximize_window()
         return driver
+    elif browser == 'fake':
+        # in-memory driver без браузера (utils.fake_driver) — для CI
+        from utils.fake_driver import FakeDriver
+        return FakeDriver()
     else:
         raise ValueError(f"Unsupported local browser: {browser}")
 
 
-def create_browserstack_driver(preset_key: str = 'chrome_latest_win', test_name: str = None) -> WebDriver:
+def resolve_driver_path(browser: str) -> str:
+    """Путь к бинарнику драйвера; webdriver-manager вызывается максимум раз за процесс"""
+    with _driver_paths_lock:
+        path = _driver_paths.get(browser)
+        if path is None:
+            path = _resolve_driver_path(browser)
+            _driver_paths[browser] = path
+        return path
+
+
+def _resolve_driver_path(browser: str) -> str:
+    pinned = os.getenv(PINNED_DRIVER_ENV[browser])
+    if pinned:
+        return pinned
+
+    offline = os.getenv("DDT_DRIVER_OFFLINE", "").lower() in ("1", "true", "yes")
+    manifest = _load_driver_manifest()
+    version = None if offline else _browser_version(browser)
+    key = f"{browser}:{version or 'unknown'}"
+
+    cached = manifest.get(key)
+    if cached and os.path.exists(cached):
+        return cached
+    if offline:
+        # версию браузера без webdriver-manager не узнать — берём последний сохранённый путь
+        for k in reversed(list(manifest)):
+            if k.startswith(f"{browser}:") and os.path.exists(manifest[k]):
+                return manifest[k]
+        raise RuntimeError(
+            f"No cached {browser} driver in {DRIVER_MANIFEST}; "
+            f"run once online or set {PINNED_DRIVER_ENV[browser]}"
+        )
+
+    if browser == 'chrome':
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    else:
+        from webdriver_manager.firefox import GeckoDriverManager
+        path = GeckoDriverManager().install()
+
+    manifest.pop(key, None)
+    manifest[key] = path
+    _save_driver_manifest(manifest)
+    return path
+
+
+def _browser_version(browser: str):
+    try:
+        from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+        browser_type = ChromeType.GOOGLE if browser == 'chrome' else 'firefox'
+        return OperationSystemManager().get_browser_version_from_os(browser_type)
+    except Exception:
+        return None
+
+
+def _load_driver_manifest() -> dict:
+    try:
+        with open(DRIVER_MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_driver_manifest(manifest: dict):
+    try:
+        os.makedirs(os.path.dirname(DRIVER_MANIFEST), exist_ok=True)
+        tmp = f"{DRIVER_MANIFEST}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, DRIVER_MANIFEST)
+    except OSError:
+        pass
+
+
+def create_browserstack_driver(preset_key: str = 'chrome_latest_win', test_name: str = None, profiler=None) -> WebDriver:
     """
     Создаёт WebDriver для BrowserStack
 
     Args:
         preset_key: ключ preset из browserstack_config.BROWSERSTACK_PRESETS
         test_name: кастомное имя теста (опционально)
+        profiler: CommandProfiler для записи команд (опционально)
 
     Returns:
         WebDriver instance подключенный к BrowserStack
@@ -69,12 +174,32 @@ def create_browserstack_driver(preset_key: str = 'chrome_latest_win', test_name:
     print(f"Platform: {caps['bstack:options']['os']} {caps['bstack:options']['osVersion']}")
 
     # Создаём driver
+    started = time.perf_counter()
     driver = webdriver.Remote(
         command_executor=hub_url,
         options=_dict_to_options(caps)
     )
 
-    return driver
+    return _attach_profiler(driver, profiler, time.perf_counter() - started)
+
+
+def set_browserstack_session_name(driver: WebDriver, name: str, logger=None):
+    """
+    Переименовывает сессию на дашборде BrowserStack (через browserstack_executor):
+    сессия из DriverPool обслуживает много строк, имя должно быть у текущей.
+    """
+    payload = json.dumps({"action": "setSessionName", "arguments": {"name": name}})
+    try:
+        driver.execute_script(f"browserstack_executor: {payload}")
+    except Exception as e:
+        if logger: logger.warning(f"Could not set BrowserStack session name '{name}': {e}")
+
+
+def _attach_profiler(driver: WebDriver, profiler, launch_time: float) -> WebDriver:
+    if profiler is None:
+        return driver
+    profiler.record("newSession", launch_time, step="driver_launch")
+    return profile_driver(driver, profiler)
 
 
 def _dict_to_options(caps: dict):
@@ -99,4 +224,95 @@ def _dict_to_options(caps: dict):
     for key, value in caps.items():
         options.set_capability(key, value)
 
-    return options
\ No newline at end of file
+    return options
+
+
+class DriverPool:
+    """
+    Пул живых WebDriver-сессий для переиспользования между строками.
+
+    acquire() отдаёт свободную сессию (или создаёт новую через factory) после
+    быстрого reset_session; release() возвращает её в пул. Сессия пересоздаётся
+    только после max_uses использований или если не прошла health check.
+    """
+
+    def __init__(self, factory, max_uses: int = 50, home_url: str = None, logger=None):
+        self.factory = factory
+        self.max_uses = max(1, max_uses)
+        self.home_url = home_url or site_home_url()
+        self.logger = logger
+        self._idle = []
+        self._uses = {}
+        self._lock = threading.Lock()
+
+    def acquire(self) -> WebDriver:
+        while True:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                break
+            if self._is_healthy(driver):
+                try:
+                    reset_session(driver, self.home_url, self.logger)
+                    return driver
+                except Exception as e:
+                    if self.logger: self.logger.warning(f"DriverPool: reset failed, recycling session: {e}")
+            self._discard(driver)
+
+        driver = self.factory()
+        apply_animation_policy(driver, self.logger)
+        prepare_clean_session(driver, self.logger)
+        with self._lock:
+            self._uses[driver] = 0
+        if self.logger: self.logger.debug("DriverPool: created new session")
+        return driver
+
+    def release(self, driver: WebDriver, healthy: bool = True):
+        with self._lock:
+            uses = self._uses.get(driver, 0) + 1
+            self._uses[driver] = uses
+            keep = healthy and uses < self.max_uses
+            if keep:
+                self._idle.append(driver)
+        if not keep:
+            if self.logger: self.logger.debug(f"DriverPool: recycling session after {uses} uses (healthy={healthy})")
+            self._discard(driver)
+
+    @contextmanager
+    def session(self):
+        driver = self.acquire()
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.release(driver, healthy=healthy)
+
+    def close(self):
+        with self._lock:
+            drivers = list(self._uses)
+            self._idle.clear()
+        for driver in drivers:
+            self._discard(driver)
+
+    def _is_healthy(self, driver) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            # открытый alert блокирует скрипты, но сессия жива
+            try:
+                driver.switch_to.alert.dismiss()
+                return True
+            except Exception:
+                return False
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -1,6 +1,126 @@
-import pandas as pd
+import hashlib
+import os
+import pickle
+
+from openpyxl import load_workbook
+
+# Пустая ячейка — NaN, как раньше возвращал pandas.read_excel
+BLANK = float("nan")
+
+# Кэш разобранных листов: в памяти процесса и pickle-файлы на диске, ключ —
+# абсолютный путь + mtime + размер файла. DDT_DATA_CACHE=0 отключает дисковый кэш.
+DATA_CACHE_DIR = os.getenv("DDT_DATA_CACHE_DIR") or os.path.join(os.getcwd(), ".cache", "testdata")
+DATA_CACHE_ENABLED = os.getenv("DDT_DATA_CACHE", "1").lower() not in ("0", "false", "no")
+
+_memory_cache = {}
+
 
 def read_testdata(path: str, sheet_name: str = 'login'):
-    df = pd.read_excel(path, sheet_name=sheet_name, engine='openpyxl')
-    df = df.rename(columns=lambda c: c.strip())
-    return df.to_dict(orient='records')
+    """
+    Строки листа как список dict (ключи — заголовки первой строки без пробелов по краям).
+    Читает через read-only (потоковый) режим openpyxl, без pandas; полностью пустые строки
+    пропускаются, пустые ячейки — NaN. Повторные чтения неизменённого файла берутся из кэша.
+    """
+    sheets = read_workbook(path, [sheet_name])
+    if sheet_name not in sheets:
+        raise KeyError(f"Worksheet {sheet_name} does not exist.")
+    return sheets[sheet_name]
+
+
+def read_workbook(path: str, sheet_names=None) -> dict:
+    """
+    Открывает книгу один раз и возвращает {sheet: rows} для sheet_names (все листы,
+    если None). Отсутствующие листы в результат не попадают. Результат кэшируется
+    по path + mtime + size: тёплый запуск (в том числе каждый xdist worker) не
+    разбирает .xlsx вообще.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    cached = _memory_cache.get(key)
+    if cached is None and DATA_CACHE_ENABLED:
+        cached = _load_cache(key)
+    cached = cached or {"key": key, "sheets": {}, "all_sheets": None}
+
+    if _needs_parse(cached, sheet_names):
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            cached["all_sheets"] = list(wb.sheetnames)
+            for sheet in sheet_names or wb.sheetnames:
+                if sheet in wb.sheetnames and sheet not in cached["sheets"]:
+                    cached["sheets"][sheet] = _read_sheet(wb[sheet])
+        finally:
+            wb.close()
+        if DATA_CACHE_ENABLED:
+            _save_cache(key, cached)
+
+    _memory_cache[key] = cached
+    wanted = cached["all_sheets"] if sheet_names is None else sheet_names
+    return {s: cached["sheets"][s] for s in wanted if s in cached["sheets"]}
+
+
+def _needs_parse(cached, sheet_names) -> bool:
+    known = cached["all_sheets"]
+    if known is None:
+        return True
+    wanted = known if sheet_names is None else [s for s in sheet_names if s in known]
+    return any(s not in cached["sheets"] for s in wanted)
+
+
+def iter_testdata(path: str, sheet_name: str = 'login'):
+    """
+    Генератор строк листа — тот же контракт, что у read_testdata, но строки отдаются
+    по одной из потокового reader'а openpyxl, без кэша и без материализации листа.
+    Для очень больших (soak) листов.
+    """
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        yield from _iter_sheet(wb[sheet_name])
+    finally:
+        wb.close()
+
+
+def _read_sheet(ws) -> list:
+    return list(_iter_sheet(ws))
+
+
+def _iter_sheet(ws):
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+    for values in rows:
+        if all(v is None for v in values):
+            continue
+        values = tuple(values) + (None,) * (len(columns) - len(values))
+        yield {col: BLANK if v is None else v for col, v in zip(columns, values)}
+
+
+def _cache_file(key) -> str:
+    # один файл на путь: при изменении книги он перезаписывается, а не копится
+    digest = hashlib.sha1(key[0].encode("utf-8")).hexdigest()
+    return os.path.join(DATA_CACHE_DIR, f"{digest}.pkl")
+
+
+def _load_cache(key):
+    try:
+        with open(_cache_file(key), "rb") as f:
+            data = pickle.load(f)
+    except Exception:
+        return None
+    return data if data.get("key") == key else None
+
+
+def _save_cache(key, data):
+    try:
+        os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+        target = _cache_file(key)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except OSError:
+        pass
@@ -0,0 +1,926 @@
+"""
+In-memory WebDriver для CI: настоящий selenium API (WebDriver, WebElement, Alert,
+WebDriverWait, expected_conditions), но вместо браузера — скриптованная модель
+страниц demoblaze с тем же DOM-контрактом, что у utils.demo_site: #login2/#logInModal,
+#signin2/#signInModal, #exampleModal, #cartur/#tbodyid, #orderModal, нативные alert'ы
+с текстами сайта и .sweet-alert после покупки. Ни браузера, ни сети — flow проходят
+тысячи строк в секунду.
+
+FakeBrowser подключается к RemoteWebDriver вместо HTTP RemoteConnection, поэтому
+profile_driver (utils.profiler) видит все команды как обычно. execute_script понимает
+только скрипты проекта (utils.actions, utils.popups) и атомы selenium isDisplayed /
+getAttribute; любой другой скрипт — JavascriptException (flow уходят в fallback).
+Поиск: CSS (составные селекторы, потомок/'>' и ',') и подмножество XPath
+(//tag[@attr='v'][text()='v'], contains(), normalize-space(), объединение '|').
+
+Ответы "сервера" — utils.demo_site.DemoBackend (один на процесс): пользователи из
+DDT_DEMO_USERS, доля потерянных запросов DDT_DEMO_ERROR_RATE и задержка ответа
+DDT_DEMO_LATENCY (alert/модалка появляются через N секунд, как у стенда).
+
+Запуск: python tests/runner.py --mode fake --sheet login; pytest: --browser fake.
+"""
+import re
+import threading
+import time
+import uuid
+from html import escape
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+from selenium.common.exceptions import (
+    ElementNotInteractableException,
+    InvalidSelectorException,
+    InvalidSessionIdException,
+    JavascriptException,
+    NoAlertPresentException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    UnexpectedAlertPresentException,
+    UnknownMethodException,
+)
+from selenium.webdriver import ChromeOptions
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from utils.actions import CLEAR_STORAGE_JS, FORM_JS, MODAL_SETTLED_JS, NO_ANIMATIONS_JS, RESET_STATE_JS
+from utils.demo_site.server import PRODUCTS, DemoBackend, DemoSiteConfig
+from utils.popups import DOM_PROBE_JS, DOM_WATCH_JS
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+# 1x1 PNG: скриншоты одинаковые, ScreenshotWriter связывает их hard link'ами
+BLANK_PNG_B64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+# Команды, которые открытый alert не блокирует; остальные — "dismiss and notify", как у Chrome
+ALERT_SAFE_COMMANDS = {
+    Command.NEW_SESSION, Command.QUIT, Command.SET_TIMEOUTS,
+    Command.W3C_GET_ALERT_TEXT, Command.W3C_ACCEPT_ALERT, Command.W3C_DISMISS_ALERT,
+}
+BLOCK_TAGS = {"body", "nav", "div", "h2", "h3", "h4", "h5", "p", "table", "tbody", "tr", "label"}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def shared_backend() -> DemoBackend:
+    """Один DemoBackend на процесс — как один сервер для всех сессий"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = DemoBackend(DemoSiteConfig.from_env())
+        return _backend
+
+
+class _Node:
+    """Элемент модели страницы; attrs/text/shown могут быть функциями от состояния"""
+    __slots__ = ("tag", "attrs", "text", "children", "parent", "shown", "on_click", "value", "handle")
+
+    def __init__(self, tag, text="", children=(), shown=None, on_click=None, **attrs):
+        self.tag = tag
+        self.text = text
+        self.children = []
+        self.parent = None
+        self.shown = shown
+        self.on_click = on_click
+        self.value = ""
+        self.handle = None
+        # class_ -> class, data_modal -> data-modal
+        self.attrs = {k.rstrip("_").replace("_", "-"): v for k, v in attrs.items()}
+        for child in children:
+            self.append(child)
+
+    def append(self, child):
+        child.parent = self
+        self.children.append(child)
+        return child
+
+    def attr(self, name):
+        value = self.attrs.get(name)
+        return value() if callable(value) else value
+
+    def classes(self):
+        return (self.attr("class") or "").split()
+
+    def own_text(self) -> str:
+        return self.text() if callable(self.text) else self.text
+
+    def displayed(self) -> bool:
+        node = self
+        while node is not None:
+            if node.shown is not None and not node.shown():
+                return False
+            node = node.parent
+        return True
+
+    def visible_text(self) -> str:
+        return self._text(visible=True) if self.displayed() else ""
+
+    def content(self) -> str:
+        """textContent: весь текст без учёта видимости"""
+        return self._text(visible=False)
+
+    def _text(self, visible):
+        if visible and self.shown is not None and not self.shown():
+            return ""
+        parts = [self.own_text().strip()] + [c._text(visible) for c in self.children]
+        sep = "\n" if self.tag in BLOCK_TAGS else " "
+        return sep.join(p for p in parts if p)
+
+    def walk(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def html(self) -> str:
+        attrs = "".join(f' {k}="{escape(str(v))}"' for k, v in ((k, self.attr(k)) for k in self.attrs) if v is not None)
+        inner = escape(self.own_text()) + "".join(c.html() for c in self.children)
+        return f"<{self.tag}{attrs}>{inner}</{self.tag}>"
+
+
+# --- CSS ---------------------------------------------------------------------
+
+_CSS_PART = re.compile(r"""([#.])([\w-]+)|\[\s*([\w-]+)\s*(?:([~*^$|]?=)\s*(?:"([^"]*)"|'([^']*)'|([^\]\s]+)))?\s*\]""")
+_CSS_TAG = re.compile(r"[\w-]+|\*")
+_CSS_ID = re.compile(r'\[id="([^"]+)"\]|#([\w-]+)')
+
+
+def _split_top(text, seps):
+    """Делит по символам seps вне кавычек и скобок"""
+    parts, buf, quote, depth = [], "", None, 0
+    for ch in text:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth -= 1
+        elif ch in seps and depth == 0:
+            parts.append(buf)
+            buf = ""
+            continue
+        buf += ch
+    parts.append(buf)
+    return parts
+
+
+def _parse_compound(text, selector):
+    tag = _CSS_TAG.match(text)
+    pos = tag.end() if tag else 0
+    tests = []
+    while pos < len(text):
+        m = _CSS_PART.match(text, pos)
+        if not m:
+            raise InvalidSelectorException(f"fake driver: unsupported CSS selector: {selector}")
+        tests.append(m.groups())
+        pos = m.end()
+    return (tag.group(0) if tag else "*"), tests
+
+
+def _parse_css(selector):
+    """[[(combinator, tag, tests), ...], ...] — по одному списку на группу через ','"""
+    groups = []
+    for group in _split_top(selector, ","):
+        tokens = [t for t in _split_top(group.replace(">", " > "), " \t\n") if t]
+        if not tokens:
+            raise InvalidSelectorException(f"fake driver: empty CSS selector: {selector!r}")
+        chain, combinator = [], " "
+        for token in tokens:
+            if token == ">":
+                combinator = ">"
+                continue
+            chain.append((combinator, *_parse_compound(token, selector)))
+            combinator = " "
+        groups.append(chain)
+    return groups
+
+
+def _compound_matches(node, tag, tests) -> bool:
+    if tag != "*" and node.tag != tag:
+        return False
+    for kind, name, attr, op, v1, v2, v3 in tests:
+        if kind == "#":
+            if node.attr("id") != name:
+                return False
+        elif kind == ".":
+            if name not in node.classes():
+                return False
+        else:
+            actual = node.attr(attr)
+            if actual is None:
+                return False
+            expected = next((v for v in (v1, v2, v3) if v is not None), None)
+            actual = str(actual)
+            if op == "=" and actual != expected:
+                return False
+            if op == "~=" and expected not in actual.split():
+                return False
+            if op == "*=" and expected not in actual:
+                return False
+            if op == "^=" and not actual.startswith(expected):
+                return False
+            if op == "$=" and not actual.endswith(expected):
+                return False
+            if op == "|=" and actual != expected and not actual.startswith(expected + "-"):
+                return False
+    return True
+
+
+def _chain_matches(node, chain, i) -> bool:
+    combinator, tag, tests = chain[i]
+    if node is None or not _compound_matches(node, tag, tests):
+        return False
+    if i == 0:
+        return True
+    if combinator == ">":
+        return _chain_matches(node.parent, chain, i - 1)
+    ancestor = node.parent
+    while ancestor is not None:
+        if _chain_matches(ancestor, chain, i - 1):
+            return True
+        ancestor = ancestor.parent
+    return False
+
+
+def select_css(nodes, selector):
+    """Узлы из nodes (в порядке документа), подходящие под selector"""
+    groups = _parse_css(selector)
+    return [n for n in nodes if any(_chain_matches(n, chain, len(chain) - 1) for chain in groups)]
+
+
+# --- XPath (подмножество) ----------------------------------------------------
+
+_XPATH_STEP = re.compile(r"(//|/)([\w-]+|\*)((?:\[(?:[^\]'\"]|'[^']*'|\"[^\"]*\")*\])*)")
+_XPATH_PRED = re.compile(r"\[((?:[^\]'\"]|'[^']*'|\"[^\"]*\")*)\]")
+_XPATH_OPERAND = r"(@[\w-]+|text\(\)|\.|normalize-space\((?:\.|text\(\))?\))"
+_XPATH_LITERAL = r"""(?:'([^']*)'|"([^"]*)")"""
+_XPATH_EQ = re.compile(rf"\s*{_XPATH_OPERAND}\s*=\s*{_XPATH_LITERAL}\s*")
+_XPATH_CONTAINS = re.compile(rf"\s*(contains|starts-with)\(\s*{_XPATH_OPERAND}\s*,\s*{_XPATH_LITERAL}\s*\)\s*")
+_XPATH_HAS_ATTR = re.compile(r"\s*@([\w-]+)\s*")
+
+
+def _xpath_value(node, operand):
+    if operand.startswith("@"):
+        return node.attr(operand[1:])
+    if operand == "text()":
+        return node.own_text()
+    value = node.content()
+    return " ".join(value.split()) if operand.startswith("normalize-space") else value
+
+
+def _predicate_matches(node, predicate, xpath) -> bool:
+    m = _XPATH_EQ.fullmatch(predicate)
+    if m:
+        operand, v1, v2 = m.groups()
+        value = _xpath_value(node, operand)
+        return value is not None and str(value) == (v1 if v1 is not None else v2)
+    m = _XPATH_CONTAINS.fullmatch(predicate)
+    if m:
+        func, operand, v1, v2 = m.groups()
+        value, expected = _xpath_value(node, operand), (v1 if v1 is not None else v2)
+        if value is None:
+            return False
+        return expected in str(value) if func == "contains" else str(value).startswith(expected)
+    m = _XPATH_HAS_ATTR.fullmatch(predicate)
+    if m:
+        return node.attr(m.group(1)) is not None
+    raise InvalidSelectorException(f"fake driver: unsupported XPath predicate [{predicate}] in {xpath}")
+
+
+def select_xpath(document, xpath, context=None, nodes=None):
+    """Узлы для XPath в порядке документа; './/...' — относительно context"""
+    nodes = list(document.walk())[1:] if nodes is None else nodes
+    found = set()
+    for path in _split_top(xpath, "|"):
+        path = path.strip()
+        step_nodes = [document]
+        if path.startswith("."):
+            step_nodes, path = [context or document], path[1:]
+        pos = 0
+        while pos < len(path):
+            m = _XPATH_STEP.match(path, pos)
+            if not m:
+                raise InvalidSelectorException(f"fake driver: unsupported XPath: {xpath}")
+            axis, tag, predicates = m.groups()
+            tests = _XPATH_PRED.findall(predicates)
+            step = {}
+            for ctx in step_nodes:
+                if axis == "/":
+                    candidates = ctx.children
+                else:
+                    candidates = nodes if ctx is document else list(ctx.walk())[1:]
+                for n in candidates:
+                    if (tag == "*" or n.tag == tag) and all(_predicate_matches(n, p, xpath) for p in tests):
+                        step[id(n)] = n
+            step_nodes = list(step.values())
+            pos = m.end()
+        found.update(id(n) for n in step_nodes)
+    return [n for n in nodes if id(n) in found]
+
+
+# --- Браузер -----------------------------------------------------------------
+
+class FakeBrowser:
+    """
+    Command executor для FakeDriver: одна вкладка demoblaze в памяти.
+    Состояние сессии — cookie пользователя (user), корзина из localStorage (cart)
+    и открытый нативный alert; состояние страницы пересобирается при каждой навигации.
+    """
+
+    def __init__(self, backend: DemoBackend = None):
+        self.backend = backend or shared_backend()
+        self.url = "about:blank"
+        self.user = None
+        self.cart = []
+        self.alert = None
+        self.closed = False
+        self.commands = 0
+        self._pending = []  # (monotonic time, callback) — ответы "сервера" с задержкой
+        self._generation = 0
+        self._nodes = {}    # element id -> узел текущей страницы
+        self._flat = None   # все узлы в порядке документа (до изменения структуры)
+        self._ids = {}
+        self._pages = {}    # (page, idp_) -> дерево документа
+        self._handlers = {
+            Command.NEW_SESSION: self._new_session,
+            Command.QUIT: self._quit,
+            Command.GET: lambda p: self._navigate(p["url"]),
+            Command.GET_CURRENT_URL: lambda p: self.url,
+            Command.GET_TITLE: lambda p: "STORE",
+            Command.GET_PAGE_SOURCE: lambda p: self.document.html(),
+            Command.SET_TIMEOUTS: lambda p: None,
+            Command.SET_WINDOW_RECT: self._window_rect,
+            Command.W3C_MAXIMIZE_WINDOW: self._window_rect,
+            Command.FIND_ELEMENT: lambda p: self._find(p, single=True),
+            Command.FIND_ELEMENTS: lambda p: self._find(p, single=False),
+            Command.FIND_CHILD_ELEMENT: lambda p: self._find(p, single=True, context=self._node(p)),
+            Command.FIND_CHILD_ELEMENTS: lambda p: self._find(p, single=False, context=self._node(p)),
+            Command.CLICK_ELEMENT: lambda p: self._click(self._node(p)),
+            Command.CLEAR_ELEMENT: lambda p: self._type(self._node(p), None),
+            Command.SEND_KEYS_TO_ELEMENT: lambda p: self._type(self._node(p), p.get("text", "")),
+            Command.GET_ELEMENT_TEXT: lambda p: self._node(p).visible_text(),
+            Command.GET_ELEMENT_TAG_NAME: lambda p: self._node(p).tag,
+            Command.IS_ELEMENT_ENABLED: lambda p: self._node(p).attr("disabled") is None,
+            Command.IS_ELEMENT_SELECTED: lambda p: False,
+            Command.GET_ELEMENT_ATTRIBUTE: lambda p: self._node(p).attr(p["name"]),
+            Command.GET_ELEMENT_PROPERTY: lambda p: self._property(self._node(p), p["name"]),
+            Command.GET_ELEMENT_RECT: self._element_rect,
+            Command.SCREENSHOT: lambda p: BLANK_PNG_B64,
+            Command.ELEMENT_SCREENSHOT: lambda p: BLANK_PNG_B64,
+            Command.DELETE_ALL_COOKIES: self._delete_cookies,
+            Command.GET_ALL_COOKIES: lambda p: [{"name": "user", "value": self.user}] if self.user else [],
+            Command.W3C_EXECUTE_SCRIPT: self._execute_script,
+            Command.W3C_EXECUTE_SCRIPT_ASYNC: self._execute_async_script,
+            Command.W3C_ACTIONS: self._actions,
+            Command.W3C_CLEAR_ACTIONS: lambda p: None,
+            Command.W3C_GET_ALERT_TEXT: lambda p: self._current_alert(),
+            Command.W3C_ACCEPT_ALERT: self._close_alert,
+            Command.W3C_DISMISS_ALERT: self._close_alert,
+        }
+        self._navigate("about:blank")
+
+    # RemoteConnection-интерфейс
+    def execute(self, command, params):
+        self.commands += 1
+        if self.closed and command != Command.QUIT:
+            raise InvalidSessionIdException("invalid session id: session deleted (fake driver quit)")
+        self._run_pending()
+        handler = self._handlers.get(command)
+        if handler is None:
+            raise UnknownMethodException(f"fake driver does not implement '{command}'")
+        if self.alert is not None and command not in ALERT_SAFE_COMMANDS:
+            text, self.alert = self.alert, None
+            raise UnexpectedAlertPresentException(f"unexpected alert open: {{Alert text : {text}}}", alert_text=text)
+        return {"value": handler(params or {})}
+
+    def close(self):
+        pass
+
+    # --- сессия и навигация
+
+    def _new_session(self, params):
+        return {"sessionId": f"fake-{uuid.uuid4().hex[:12]}",
+                "capabilities": {"browserName": "fake", "browserVersion": "1.0", "platformName": "any",
+                                 "unhandledPromptBehavior": "dismiss and notify"}}
+
+    def _quit(self, params):
+        self.closed = True
+
+    def _window_rect(self, params):
+        return {"x": 0, "y": 0, "width": 1920, "height": 1080}
+
+    def _delete_cookies(self, params):
+        self.user = None
+
+    def _navigate(self, url):
+        self.url = urljoin(self.url, url) if self.url.startswith("http") else url
+        parts = urlsplit(self.url)
+        self._generation += 1
+        self._nodes = {}
+        self._pending = []  # незавершённые запросы умирают вместе со страницей
+        self.open_modals = set()
+        self.shown_user = self.user
+        self.order_total = ""
+        page = {"": "index", "index.html": "index", "prod.html": "prod", "cart.html": "cart"}.get(
+            parts.path.rsplit("/", 1)[-1]) if parts.scheme in ("http", "https") else None
+        query = parse_qs(parts.query)
+        key = (page, (query.get("idp_") or [""])[0] if page == "prod" else "")
+        # дерево страницы строится один раз на сессию; при повторном заходе — как после загрузки
+        self.document = self._pages.get(key)
+        self._flat = None
+        if self.document is None:
+            self.document = self._pages[key] = _Node("#document", children=[
+                _Node("html", children=[self._render(page, query)])])
+        else:
+            for node in self.document.walk():
+                node.handle = None
+                node.value = ""
+            self._remove_sweet_alert()
+            tbody = self._by_id("tbodyid") if page == "cart" else None
+            if tbody is not None:
+                self._render_cart(tbody)
+
+    def _all(self):
+        if self._flat is None:
+            self._flat = list(self.document.walk())[1:]
+            self._ids = {}
+            for node in reversed(self._flat):
+                if node.attrs.get("id"):
+                    self._ids[node.attrs["id"]] = node
+        return self._flat
+
+    def _body(self):
+        return self.document.children[0].children[0]
+
+    def _render(self, page, query):
+        N = _Node
+        body = N("body", data_page=page or "")
+        if page is None:
+            return body
+        user = lambda: self.shown_user
+        body.append(N("nav", class_="navbar", children=[
+            N("a", "PRODUCT STORE", id="nava", class_="navbar-brand", href="index.html"),
+            N("a", "Home ", [N("span", "(current)", class_="sr-only")], class_="nav-link", href="index.html"),
+            N("a", "Contact", class_="nav-link", href="#", data_modal="exampleModal"),
+            N("a", "About us", class_="nav-link", href="#", data_modal="videoModal"),
+            N("a", "Cart", id="cartur", class_="nav-link", href="cart.html"),
+            N("a", "Log in", id="login2", class_="nav-link", href="#", data_modal="logInModal",
+              shown=lambda: not user()),
+            N("a", "Log out", id="logout2", class_="nav-link", href="#", shown=lambda: bool(user()),
+              on_click=self._log_out),
+            N("a", lambda: f"Welcome {user()}" if user() else "", id="nameofuser", class_="nav-link", href="#",
+              shown=lambda: bool(user())),
+            N("a", "Sign up", id="signin2", class_="nav-link", href="#", data_modal="signInModal",
+              shown=lambda: not user()),
+        ]))
+        body.append(N("div", class_="container", children=self._content(page, query)))
+        body.append(self._modal("exampleModal", "New message", [
+            *self._field("Contact Email:", "recipient-email"),
+            *self._field("Contact Name:", "recipient-name"),
+            *self._field("Message:", "message-text", tag="textarea"),
+        ], "Send message", self._send))
+        body.append(self._modal("signInModal", "Sign up", [
+            *self._field("Username:", "sign-username"),
+            *self._field("Password:", "sign-password", type="password"),
+        ], "Sign up", self._register))
+        body.append(self._modal("logInModal", "Log in", [
+            *self._field("Username:", "loginusername"),
+            *self._field("Password:", "loginpassword", type="password"),
+        ], "Log in", self._log_in))
+        body.append(self._modal("orderModal", "Place order", [
+            N("label", "Total: ", [N("span", lambda: str(self.order_total), id="totalm")]),
+            *self._field("Name:", "name"),
+            *self._field("Country:", "country"),
+            *self._field("City:", "city"),
+            *self._field("Credit card:", "card"),
+            *self._field("Month:", "month"),
+            *self._field("Year:", "year"),
+        ], "Purchase", self._purchase))
+        body.append(self._modal("videoModal", "About us", [N("p", "Local demoblaze stand-in for offline runs.")]))
+        return body
+
+    def _content(self, page, query):
+        N = _Node
+        if page == "index":
+            return [N("div", id="tbodyid", children=[
+                N("div", class_="card", children=[
+                    N("h4", class_="card-title", children=[
+                        N("a", p["title"], href=f"prod.html?idp_={p['id']}", class_="hrefch")]),
+                    N("h5", f"${p['price']}"),
+                ]) for p in PRODUCTS])]
+        if page == "prod":
+            pid = (query.get("idp_") or [""])[0]
+            product = next((p for p in PRODUCTS if str(p["id"]) == pid), None)
+            if product is None:
+                return [N("div", id="tbodyid", children=[N("h2", "Product not found", class_="name")])]
+            return [N("div", id="tbodyid", children=[
+                N("h2", product["title"], class_="name"),
+                N("h3", f"${product['price']} *includes tax", class_="price-container"),
+                N("div", class_="row", children=[
+                    N("a", "Add to cart", href="#", class_="btn btn-success btn-lg",
+                      on_click=lambda: self._add_to_cart(product["id"]))]),
+            ])]
+        # cart: пустой tbody не виден (нулевой размер), как в браузере
+        tbody = N("tbody", id="tbodyid")
+        tbody.shown = lambda: bool(tbody.children)
+        self._render_cart(tbody)
+        return [
+            N("h2", "Products"),
+            N("table", class_="table", children=[tbody]),
+            N("h2", "Total"),
+            N("h3", lambda: str(self._cart_total() or ""), id="totalp"),
+            N("button", "Place Order", class_="btn btn-success", type="button", on_click=self._place_order),
+        ]
+
+    def _render_cart(self, tbody):
+        for node in tbody.children:
+            self._forget(node)
+        tbody.children = []
+        self._flat = None
+        for i, pid in enumerate(self.cart):
+            product = next((p for p in PRODUCTS if p["id"] == pid), None)
+            if product:
+                tbody.append(_Node("tr", class_="success", children=[
+                    _Node("td"), _Node("td", product["title"]), _Node("td", str(product["price"])),
+                    _Node("td", children=[_Node("a", "Delete", href="#", on_click=lambda i=i: self._delete_item(i))]),
+                ]))
+
+    def _modal(self, modal_id, title, fields, action_text=None, action=None):
+        N = _Node
+        footer = [N("button", "Close", class_="btn btn-secondary", type="button", data_dismiss="modal")]
+        if action:
+            footer.append(N("button", action_text, class_="btn btn-primary", type="button", on_click=action))
+        return N("div", children=[N("div", class_="modal-dialog", children=[N("div", class_="modal-content", children=[
+            N("h5", title, class_="modal-title"), *fields, N("div", class_="modal-footer", children=footer),
+        ])])], id=modal_id, role="dialog", shown=lambda: modal_id in self.open_modals,
+            class_=lambda: "modal fade show" if modal_id in self.open_modals else "modal fade")
+
+    @staticmethod
+    def _field(label, field_id, tag="input", type="text"):
+        return [_Node("label", label, for_=field_id),
+                _Node(tag, id=field_id) if tag == "textarea" else _Node(tag, id=field_id, type=type)]
+
+    # --- логика сайта (как utils/demo_site/static/site.js)
+
+    def _api(self, path, payload, on_ok):
+        """Запрос к DemoBackend: потерянный (fault) не даёт ничего, задержка откладывает ответ"""
+        if self.backend.fault(path):
+            return
+        respond = lambda: on_ok(self.backend.api(path, payload))
+        delay = self.backend.latency(path)
+        if delay > 0:
+            self._pending.append((time.monotonic() + delay, respond))
+        else:
+            respond()
+
+    def _run_pending(self):
+        if not self._pending:
+            return
+        now = time.monotonic()
+        due = [cb for when, cb in self._pending if when <= now]
+        self._pending = [(when, cb) for when, cb in self._pending if when > now]
+        for callback in due:
+            callback()
+
+    def _show_alert(self, text):
+        if self.alert is None:
+            self.alert = text
+
+    def _value(self, field_id):
+        node = self._by_id(field_id)
+        return node.value if node else ""
+
+    def _log_in(self):
+        username, password = self._value("loginusername"), self._value("loginpassword")
+        if not username or not password:
+            return self._show_alert("Please fill out Username and Password.")
+
+        def done(res):
+            if res.get("errorMessage"):
+                return self._show_alert(res["errorMessage"])
+            self.user = self.shown_user = username
+            self.open_modals.discard("logInModal")
+        self._api("/api/login", {"username": username, "password": password}, done)
+
+    def _log_out(self):
+        self.user = self.shown_user = None
+
+    def _register(self):
+        username, password = self._value("sign-username"), self._value("sign-password")
+        if not username or not password:
+            return self._show_alert("Please fill out Username and Password.")
+
+        def done(res):
+            if res.get("errorMessage"):
+                return self._show_alert(res["errorMessage"])
+            self._show_alert("Sign up successful.")
+            self.open_modals.discard("signInModal")
+        self._api("/api/signup", {"username": username, "password": password}, done)
+
+    def _send(self):
+        def done(res):
+            self._show_alert("Thanks for the message!!")
+            self.open_modals.discard("exampleModal")
+        self._api("/api/contact", {"email": self._value("recipient-email"), "name": self._value("recipient-name"),
+                                   "message": self._value("message-text")}, done)
+
+    def _add_to_cart(self, pid):
+        def done(res):
+            self.cart.append(pid)
+            self._show_alert("Product added.")
+        self._api("/api/addtocart", {"id": pid}, done)
+
+    def _delete_item(self, index):
+        if 0 <= index < len(self.cart):
+            del self.cart[index]
+        tbody = self._by_id("tbodyid")
+        if tbody is not None and tbody.tag == "tbody":
+            self._render_cart(tbody)
+
+    def _cart_total(self):
+        return sum(p["price"] for pid in self.cart for p in PRODUCTS if p["id"] == pid)
+
+    def _place_order(self):
+        self.order_total = self._cart_total()
+        self.open_modals.add("orderModal")
+
+    def _purchase(self):
+        name, card = self._value("name"), self._value("card")
+        if not name or not card:
+            return self._show_alert("Please fill out Name and Creditcard.")
+        amount = self._cart_total()
+        payload = {"name": name, "country": self._value("country"), "city": self._value("city"), "card": card,
+                   "month": self._value("month"), "year": self._value("year"), "amount": amount}
+
+        def done(res):
+            self.cart = []
+            self.open_modals.discard("orderModal")
+            body = self._body()
+            self._flat = None
+            body.append(_Node("div", class_="sweet-overlay"))
+            body.append(_Node("div", class_="sweet-alert showSweetAlert visible", children=[
+                _Node("h2", "Thank you for your purchase!"),
+                _Node("p", f"Id: {res['id']}\nAmount: {amount} USD\nCard Number: {card}\nName: {name}",
+                      class_="lead text-muted"),
+                _Node("button", "OK", class_="confirm btn btn-lg btn-primary",
+                      on_click=lambda: self._navigate("index.html")),
+            ]))
+        self._api("/api/order", payload, done)
+
+    def _reset_page(self):
+        """RESET_STATE_JS: storage, открытые модалки, sweet-alert"""
+        self.cart = []
+        self.open_modals.clear()
+        self._remove_sweet_alert()
+
+    def _remove_sweet_alert(self):
+        body = self._body()
+        for node in [n for n in body.children if {"sweet-alert", "sweet-overlay"} & set(n.classes())]:
+            body.children.remove(node)
+            self._forget(node)
+            self._flat = None
+
+    # --- элементы
+
+    def _ref(self, node):
+        if node.handle is None:
+            node.handle = f"fake-{self._generation}-{len(self._nodes)}"
+            self._nodes[node.handle] = node
+        return {ELEMENT_KEY: node.handle}
+
+    def _forget(self, node):
+        for n in node.walk():
+            self._nodes.pop(n.handle, None)
+            n.handle = None
+
+    def _node(self, params):
+        return self._resolve(params.get("id"))
+
+    def _resolve(self, ref):
+        handle = ref.get(ELEMENT_KEY) if isinstance(ref, dict) else ref
+        node = self._nodes.get(handle)
+        if node is None:
+            raise StaleElementReferenceException("stale element reference: element is not attached to the page document")
+        return node
+
+    def _by_id(self, element_id):
+        self._all()
+        return self._ids.get(element_id)
+
+    def _select_css(self, selector, context=None):
+        m = _CSS_ID.fullmatch(selector)
+        if m and context is None:
+            # By.ID приходит как [id="..."] — индекс вместо обхода всей страницы
+            node = self._by_id(m.group(1) or m.group(2))
+            return [node] if node is not None else []
+        return select_css(self._all() if context is None else list(context.walk())[1:], selector)
+
+    def _locate(self, using, value, context=None):
+        nodes = self._all() if context is None else list(context.walk())[1:]
+        if using == "css selector":
+            return self._select_css(value, context)
+        if using == "xpath":
+            return select_xpath(self.document, value, context, self._all())
+        if using in ("link text", "partial link text"):
+            links = [n for n in nodes if n.tag == "a"]
+            if using == "link text":
+                return [n for n in links if n.visible_text().strip() == value]
+            return [n for n in links if value in n.visible_text()]
+        if using == "tag name":
+            return [n for n in nodes if n.tag == value]
+        raise InvalidSelectorException(f"fake driver: unsupported locator strategy '{using}'")
+
+    def _find(self, params, single, context=None):
+        nodes = self._locate(params["using"], params["value"], context)
+        if single:
+            if not nodes:
+                raise NoSuchElementException(
+                    f'no such element: Unable to locate element: {{"method":"{params["using"]}",'
+                    f'"selector":"{params["value"]}"}}')
+            return self._ref(nodes[0])
+        return [self._ref(n) for n in nodes]
+
+    def _click(self, node):
+        if not node.displayed():
+            raise ElementNotInteractableException("element not interactable")
+        self._activate(node)
+
+    def _activate(self, node):
+        """Обработчик клика (как JS click: видимость не проверяется)"""
+        if node.on_click:
+            node.on_click()
+        elif node.attr("data-modal"):
+            self.open_modals.add(node.attr("data-modal"))
+        elif node.attr("data-dismiss") == "modal":
+            modal = node.parent
+            while modal is not None and "modal" not in modal.classes():
+                modal = modal.parent
+            if modal is not None:
+                self.open_modals.discard(modal.attr("id"))
+        elif node.tag == "a" and node.attr("href") not in (None, "#"):
+            self._navigate(node.attr("href"))
+
+    def _type(self, node, text):
+        if not node.displayed():
+            raise ElementNotInteractableException("element not interactable")
+        node.value = "" if text is None else node.value + text
+
+    def _property(self, node, name):
+        if name == "value":
+            return node.value
+        if name == "outerHTML":
+            return node.html()
+        if name in ("textContent", "innerText"):
+            return node.content() if name == "textContent" else node.visible_text()
+        if name == "className":
+            return node.attr("class") or ""
+        if name == "tagName":
+            return node.tag.upper()
+        return node.attr(name)
+
+    def _element_rect(self, params):
+        displayed = self._node(params).displayed()
+        return {"x": 0, "y": 0, "width": 100 if displayed else 0, "height": 20 if displayed else 0}
+
+    def _actions(self, params):
+        """ActionChains: клик по origin последнего pointerMove на pointerUp"""
+        for source in params.get("actions", []):
+            if source.get("type") != "pointer":
+                continue
+            target = None
+            for action in source.get("actions", []):
+                origin = action.get("origin")
+                if action.get("type") == "pointerMove" and isinstance(origin, dict):
+                    target = self._resolve(origin)
+                elif action.get("type") == "pointerUp" and target is not None:
+                    self._click(target)
+
+    # --- alert'ы
+
+    def _current_alert(self):
+        if self.alert is None:
+            raise NoAlertPresentException("no such alert")
+        return self.alert
+
+    def _close_alert(self, params):
+        self._current_alert()
+        self.alert = None
+
+    # --- скрипты
+
+    def _execute_script(self, params):
+        script, args = params["script"], params.get("args") or []
+        if script.startswith("/* isDisplayed */"):
+            return self._resolve(args[0]).displayed()
+        if script.startswith("/* getAttribute */"):
+            node, name = self._resolve(args[0]), args[1]
+            if name == "value" or name in ("outerHTML", "innerHTML", "textContent", "innerText"):
+                return self._property(node, name)
+            return node.attr(name)
+        if script == "return 1":
+            return 1
+        if script == "return arguments[0][arguments[1]]":
+            return self._property(self._resolve(args[0]), args[1])
+        if script == "arguments[0].click();":
+            return self._activate(self._resolve(args[0]))
+        if script.startswith("arguments[0].scrollIntoView("):
+            self._resolve(args[0])
+            return None
+        if script == FORM_JS:
+            return self._form(args[0], args[1])
+        if script == MODAL_SETTLED_JS:
+            return "show" in self._resolve(args[0]).classes()
+        if script == NO_ANIMATIONS_JS:
+            return None
+        if script == CLEAR_STORAGE_JS:
+            self.cart = []
+            return None
+        if script == RESET_STATE_JS:
+            return self._reset_page()
+        if script == DOM_PROBE_JS:
+            return self._probe(args[0], args[1])
+        raise JavascriptException(f"fake driver: unsupported script {script.strip()[:80]!r}")
+
+    def _execute_async_script(self, params):
+        script, args = params["script"], params.get("args") or []
+        if script != DOM_WATCH_JS:
+            raise JavascriptException(f"fake driver: unsupported async script {script.strip()[:80]!r}")
+        # MutationObserver: DOM меняется только по отложенным ответам — ждём их до timeout
+        modal_ids, selectors, settle_ms, timeout_ms = args[:4]
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        while True:
+            hit = self._probe(modal_ids, selectors)
+            if hit:
+                return hit
+            if not self._pending:
+                return {"type": "none", "quiet": settle_ms > 0}
+            wake = min(when for when, _ in self._pending)
+            if wake > deadline:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                return {"type": "none", "quiet": False}
+            time.sleep(max(0.0, wake - time.monotonic()))
+            self._run_pending()
+            if self.alert is not None:
+                return {"type": "native_alert", "text": self.alert}
+
+    def _form(self, fields, probe_only):
+        def find(by, value):
+            selector = {"id": f'[id="{value}"]', "name": f'[name="{value}"]',
+                        "class name": f".{value}"}.get(by, value)
+            if by in ("id", "name", "class name", "css selector"):
+                nodes = self._select_css(selector)
+            elif by == "xpath":
+                nodes = select_xpath(self.document, value, nodes=self._all())
+            else:
+                nodes = []
+            return nodes[0] if nodes else None
+
+        if probe_only:
+            nodes = [find(by, value) for by, value, _ in fields]
+            if not all(n is not None and n.displayed() for n in nodes):
+                return None
+            return [self._ref(n) for n in nodes]
+        nodes = [find(by, value) for by, value, _ in fields]
+        if any(n is not None and not n.displayed() for n in nodes):
+            return None  # поле ещё скрыто (модалка не открыта) — ничего не пишем
+        missing = []
+        for i, (node, (_, _, text)) in enumerate(zip(nodes, fields)):
+            if node is None:
+                missing.append(i)
+            else:
+                node.value = text
+        return missing
+
+    def _probe(self, modal_ids, inline_selectors):
+        """DOM_PROBE_JS: sweet-alert, модалки по id, .modal.show, inline-селекторы с текстом"""
+        def hit(kind, node, selector):
+            return {"type": kind, "text": node.visible_text().strip(), "element": self._ref(node), "selector": selector}
+
+        for node in self._select_css(".sweet-alert"):
+            if node.displayed():
+                return hit("sweet_alert", node, ".sweet-alert")
+        for modal_id in modal_ids:
+            node = self._by_id(modal_id)
+            if node is not None and node.displayed():
+                return hit("modal", node, f"#{modal_id}")
+        for node in self._select_css(".modal.show"):
+            if node.displayed():
+                return hit("modal", node, ".modal.show")
+        for selector in inline_selectors:
+            try:
+                nodes = self._select_css(selector)
+            except InvalidSelectorException:
+                continue
+            for node in nodes:
+                if node.displayed() and node.visible_text().strip():
+                    return hit("inline", node, selector)
+        return None
+
+
+class FakeDriver(WebDriver):
+    """selenium WebDriver поверх FakeBrowser; self.fake — состояние страницы и сессии"""
+
+    def __init__(self, backend: DemoBackend = None):
+        self.fake = FakeBrowser(backend)
+        super().__init__(command_executor=self.fake, options=ChromeOptions())
+        self._is_remote = False  # send_keys не ищет локальные файлы для upload
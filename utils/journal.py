@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from utils.data_source import resolve
+from utils.records import TestResult
+
+# Журналы запусков: .cache/runs/<run_id>.jsonl (DDT_JOURNAL_DIR переопределяет каталог)
+JOURNAL_DIR = os.getenv("DDT_JOURNAL_DIR") or os.path.join(os.getcwd(), ".cache", "runs")
+FINISHED_STATUSES = ("PASSED", "FAILED")
+# fsync раз в столько событий (и при close); каждое событие всё равно flush'ится в ОС,
+# так что kill процесса ничего не теряет — после сбоя ОС строки хвоста просто выполнятся снова
+JOURNAL_FSYNC_EVERY = max(1, int(os.getenv("DDT_JOURNAL_FSYNC_EVERY", "50")))
+
+
+class RunJournal:
+    """
+    Журнал запуска только на дозапись: событие "start" перед строкой и "finish" с
+    результатом после неё; fsync пачками по JOURNAL_FSYNC_EVERY событий.
+    Ключ строки — (хеш файла данных, sheet, test_id).
+    При --resume строки с finish PASSED/FAILED не выполняются повторно (отдаётся
+    записанный результат); строки "в полёте" (start без finish) и ERROR выполняются заново.
+    Журнал запуска, дошедшего до конца без ERROR, удаляется в close(completed=True).
+    """
+
+    def __init__(self, run_id, data_path, sheet, resume=False, logger=None):
+        self.run_id = run_id
+        self.sheet = sheet
+        self.path = journal_path(run_id)
+        self.data_hash = data_fingerprint(data_path, sheet)
+        self._lock = threading.Lock()
+        self._finished = {}
+        self._unsynced = 0
+        self.errors = 0
+        self.in_flight = 0
+
+        if resume:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"No journal for run '{run_id}' ({self.path})")
+            self._load(logger)
+        elif os.path.exists(self.path):
+            raise FileExistsError(f"Journal for run '{run_id}' already exists; use --resume {run_id}")
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._append({"event": "resume" if resume else "run", "data_path": str(data_path),
+                      "data_hash": self.data_hash, "sheet": sheet,
+                      "at": datetime.now().isoformat(timespec="seconds")}, sync=True)
+
+    def _load(self, logger=None):
+        started = {}
+        sheets = set()
+        stale = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # оборванная последняя строка после kill
+                if event.get("event") in ("run", "resume"):
+                    sheets.add(event.get("sheet"))
+                    continue
+                if event.get("sheet") != self.sheet:
+                    continue
+                if event.get("data_hash") != self.data_hash:
+                    stale += 1
+                    continue
+                test_id = event.get("test_id")
+                if event.get("event") == "start":
+                    started[test_id] = True
+                elif event.get("event") == "finish":
+                    started.pop(test_id, None)
+                    result = event.get("result") or {}
+                    if result.get("status") in FINISHED_STATUSES:
+                        self._finished[test_id] = result
+                    else:
+                        self._finished.pop(test_id, None)
+        if sheets and self.sheet not in sheets:
+            raise ValueError(f"Run '{self.run_id}' was for sheet(s) {sorted(sheets)}, not '{self.sheet}'")
+        self.in_flight = len(started)
+        if logger and stale:
+            logger.warning(f"Run {self.run_id}: {stale} journal entries are for a different version "
+                           f"of the data file; those rows will run again")
+        if logger:
+            logger.info(f"Resuming run {self.run_id}: {len(self._finished)} rows finished, "
+                        f"{self.in_flight} were in flight")
+
+    def finished(self, test_id):
+        """Записанный TestResult строки, если она уже завершена (PASSED/FAILED), иначе None"""
+        record = self._finished.get(test_id)
+        return TestResult.from_dict(record) if record else None
+
+    def start(self, test_id):
+        self._append({"event": "start", "data_hash": self.data_hash, "sheet": self.sheet, "test_id": test_id})
+
+    def finish(self, test_id, result: TestResult):
+        if result.status not in FINISHED_STATUSES:
+            self.errors += 1
+        self._append({"event": "finish", "data_hash": self.data_hash, "sheet": self.sheet,
+                      "test_id": test_id, "result": result.to_dict()})
+
+    def _append(self, event, sync=False):
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if sync or self._unsynced >= JOURNAL_FSYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def close(self, completed=False, logger=None):
+        """
+        completed — запуск прошёл все строки. Если при этом ни одна строка не ERROR,
+        продолжать нечего и журнал удаляется; иначе остаётся для --resume.
+        """
+        with self._lock:
+            if self._unsynced:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        if completed and not self.errors:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        elif logger:
+            logger.info(f"Journal kept: {self.path} (resume with --resume {self.run_id})")
+
+
+def new_run_id(sheet) -> str:
+    return f"{sheet}_{datetime.now().strftime('%Y%m%dT%H%M%S')}_{os.getpid()}"
+
+
+def journal_path(run_id) -> str:
+    return os.path.join(JOURNAL_DIR, f"{run_id}.jsonl")
+
+
+def data_fingerprint(data_path, sheet) -> str:
+    """sha1 содержимого файла, из которого читается лист (для каталога/шаблона — файл листа)"""
+    try:
+        _, location = resolve(str(data_path), sheet)
+    except (KeyError, ValueError):
+        location = str(data_path)
+    digest = hashlib.sha1()
+    with open(location, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
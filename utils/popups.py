@@ -1,7 +1,15 @@
+import os
 import time
 from typing import Optional, Dict, Any, List
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoAlertPresentException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import (
+    NoAlertPresentException,
+    TimeoutException,
+    UnexpectedAlertPresentException,
+    WebDriverException,
+)
 
 DEFAULT_INLINE_SELECTORS = [
     "div.alert",            # bootstrap alerts
@@ -11,12 +19,99 @@ DEFAULT_INLINE_SELECTORS = [
     ".notification",
 ]
 
+# Один execute_script вместо find_elements + is_displayed + .text на каждый селектор.
+# Порядок проверок совпадает с webdriver-режимом: sweet-alert, модалки по id,
+# .modal.show, inline-селекторы (только с непустым текстом).
+DOM_PROBE_JS = """
+var modalIds = arguments[0], inlineSelectors = arguments[1];
+function visible(el) {
+    if (!el || !el.getClientRects().length) return false;
+    var st = window.getComputedStyle(el);
+    return st.display !== 'none' && st.visibility !== 'hidden' && st.opacity !== '0';
+}
+function text(el) { return (el.innerText || el.textContent || '').trim(); }
+function first(type, nodes, selector, needText) {
+    for (var i = 0; i < nodes.length; i++) {
+        var n = nodes[i];
+        if (!visible(n)) continue;
+        var t = text(n);
+        if (needText && !t) continue;
+        return {type: type, text: t, element: n, selector: selector};
+    }
+    return null;
+}
+var hit = first('sweet_alert', document.getElementsByClassName('sweet-alert'), '.sweet-alert', false);
+for (var i = 0; !hit && i < modalIds.length; i++) {
+    var m = document.getElementById(modalIds[i]);
+    hit = first('modal', m ? [m] : [], '#' + modalIds[i], false);
+}
+hit = hit || first('modal', document.querySelectorAll('.modal.show'), '.modal.show', false);
+for (var j = 0; !hit && j < inlineSelectors.length; j++) {
+    try {
+        hit = first('inline', document.querySelectorAll(inlineSelectors[j]), inlineSelectors[j], true);
+    } catch (e) {}
+}
+return hit;
+"""
+
+# Сколько секунд страница должна быть "тихой" (нет мутаций DOM и активных
+# jQuery ajax), чтобы observer-режим вернул "none" раньше timeout
+POPUP_SETTLE_SECONDS = float(os.getenv("DDT_POPUP_SETTLE", "1.0"))
+DEFAULT_SCRIPT_TIMEOUT = 30  # script timeout новой W3C-сессии, с
+
+# execute_async_script: сначала разовая проверка DOM_PROBE_JS, затем MutationObserver
+# повторяет её на каждую мутацию. window.alert оборачивается, чтобы узнать о нативном
+# alert'е до того, как он заблокирует страницу (сам alert показывается как обычно).
+DOM_WATCH_JS = """
+var modalIds = arguments[0], inlineSelectors = arguments[1];
+var settleMs = arguments[2], timeoutMs = arguments[3], done = arguments[arguments.length - 1];
+var probe = new Function('return (function () {' + arguments[4] + '}).apply(null, arguments);');
+var finished = false, observer = null, quietTimer = null, hardTimer = null;
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearTimeout(quietTimer); clearTimeout(hardTimer);
+    window.__ddtOnAlert = null;
+    done(result);
+}
+function check() {
+    var hit = probe(modalIds, inlineSelectors);
+    if (hit) finish(hit);
+    return hit;
+}
+function busy() { return !!(window.jQuery && window.jQuery.active > 0); }
+function armQuiet() {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(function () {
+        if (busy()) { armQuiet(); return; }
+        finish({type: 'none', quiet: true});
+    }, settleMs);
+}
+if (!window.__ddtAlertHooked) {
+    var nativeAlert = window.alert;
+    window.alert = function (msg) {
+        if (window.__ddtOnAlert) window.__ddtOnAlert(msg);
+        return nativeAlert.apply(window, arguments);
+    };
+    window.__ddtAlertHooked = true;
+}
+window.__ddtOnAlert = function (msg) { finish({type: 'native_alert', text: String(msg == null ? '' : msg)}); };
+if (check()) return;
+observer = new MutationObserver(function () { if (!check() && settleMs > 0) armQuiet(); });
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+hardTimer = setTimeout(function () { finish({type: 'none', quiet: false}); }, timeoutMs);
+if (settleMs > 0) armQuiet();
+"""
+
 def detect_popups(driver,
                   timeout: float = 8.0,
                   poll_interval: float = 0.25,
                   logger=None,
                   modal_ids: Optional[List[str]] = None,
-                  extra_inline_selectors: Optional[List[str]] = None) -> Dict[str, Any]:
+                  extra_inline_selectors: Optional[List[str]] = None,
+                  probe: str = "js",
+                  settle: Optional[float] = None) -> Dict[str, Any]:
     """
     Wait up to `timeout` seconds, polling for any popup. Returns a dict:
     {
@@ -28,6 +123,14 @@ def detect_popups(driver,
 
     - modal_ids: optional list of modal element ids to check (e.g. ['logInModal','signInModal','orderModal'])
     - extra_inline_selectors: additional CSS selectors for inline alerts on this site
+    - probe: "js" waits event-driven: a MutationObserver awaited via execute_async_script
+      re-runs the single-script DOM probe on every mutation and resolves as soon as a
+      popup appears (no sleep polling); if the async script fails it polls the same
+      probe every `poll_interval`. "observer" does the same but also returns "none"
+      once the page has been quiet for `settle` seconds (default POPUP_SETTLE_SECONDS)
+      instead of waiting out the whole timeout. "webdriver" polls with
+      find_elements/is_displayed per selector. The native alert is always checked
+      as a separate command.
     """
     end = time.time() + timeout
     inline_selectors = DEFAULT_INLINE_SELECTORS.copy()
@@ -36,89 +139,181 @@ def detect_popups(driver,
 
     modal_ids = modal_ids or ["logInModal", "signInModal", "orderModal", "exampleModal"]
 
-    while time.time() < end:
-        # 1) native JS alert
+    if probe in ("js", "observer"):
+        if probe == "js":
+            settle = 0
+        elif settle is None:
+            settle = POPUP_SETTLE_SECONDS
         try:
-            alert = driver.switch_to.alert
+            return _watch_popups(driver, timeout, settle, modal_ids, inline_selectors, logger)
+        except Exception as e:
+            if logger:
+                logger.debug(f"detect_popups: observer failed ({e}); falling back to polling")
+            probe = "js"
+
+    while time.time() < end:
+        found = _check_native_alert(driver, logger)
+        if found is None:
+            if probe == "js":
+                try:
+                    found = _probe_dom_js(driver, modal_ids, inline_selectors, logger)
+                except Exception as e:
+                    if logger:
+                        logger.debug(f"detect_popups: JS probe failed ({e}); falling back to webdriver probe")
+                    found = _probe_dom_webdriver(driver, modal_ids, inline_selectors, logger)
+            else:
+                found = _probe_dom_webdriver(driver, modal_ids, inline_selectors, logger)
+        if found is not None:
+            return found
+
+        time.sleep(poll_interval)
+
+    # nothing found
+    if logger:
+        logger.debug("detect_popups: no popup detected within timeout")
+    return {"type": "none", "text": "", "element": None, "selector": None}
+
+
+def _watch_popups(driver, timeout, settle, modal_ids, inline_selectors, logger=None) -> Dict[str, Any]:
+    found = _check_native_alert(driver, logger)
+    if found is not None:
+        return found
+
+    # script timeout сессии (W3C default 30s) обычно больше timeout + 5 — лишняя команда не нужна;
+    # если нет, поднимаем его только на время скрипта, чтобы не менять сессию из пула навсегда
+    raised = timeout + 5 > DEFAULT_SCRIPT_TIMEOUT
+    if raised:
+        driver.set_script_timeout(timeout + 5)
+    try:
+        hit = driver.execute_async_script(DOM_WATCH_JS, modal_ids, inline_selectors,
+                                          int(settle * 1000), int(timeout * 1000), DOM_PROBE_JS)
+    except UnexpectedAlertPresentException as e:
+        # драйвер мог уже закрыть alert (unhandledPromptBehavior) — текст есть в исключении
+        found = _check_native_alert(driver, logger)
+        if found is None:
+            found = {"type": "native_alert", "text": e.alert_text or "", "element": None, "selector": None}
+        return found
+    finally:
+        if raised:
             try:
-                text = alert.text
+                driver.set_script_timeout(DEFAULT_SCRIPT_TIMEOUT)
             except Exception:
-                text = ""
-            # IMPORTANT: Accept alert to clear it and prevent blocking further checks
-            try:
-                alert.accept()
-                if logger:
-                    logger.debug(f"detect_popups: native alert detected and accepted: {text}")
-            except Exception as e:
-                if logger:
-                    logger.warning(f"detect_popups: failed to accept alert: {e}")
-            return {"type": "native_alert", "text": text or "", "element": None, "selector": None}
-        except NoAlertPresentException:
-            pass
-        except WebDriverException:
-            # sometimes switch_to.alert throws other errors in remote sessions; ignore and continue
-            pass
-        except Exception:
-            pass
+                pass
 
-        # 2) sweet-alert (commonly .sweet-alert)
+    if hit and hit.get("type") == "native_alert":
+        # alert открывается сразу после резолва скрипта — принимаем его
         try:
-            sweets = driver.find_elements(By.CLASS_NAME, "sweet-alert")
-            for s in sweets:
-                if s.is_displayed():
-                    txt = (s.text or "").strip()
-                    if logger:
-                        logger.debug(f"detect_popups: sweet-alert found: {txt[:200]}")
-                    return {"type": "sweet_alert", "text": txt, "element": s, "selector": ".sweet-alert"}
-        except Exception:
+            WebDriverWait(driver, 2, poll_frequency=0.05).until(EC.alert_is_present())
+        except TimeoutException:
             pass
+        found = _check_native_alert(driver, logger)
+        if found is not None:
+            return {**found, "text": found["text"] or hit.get("text") or ""}
+        return {"type": "native_alert", "text": hit.get("text") or "", "element": None, "selector": None}
+
+    if hit and hit.get("type") != "none":
+        return _probe_result(hit, logger)
+
+    if logger:
+        reason = f"page quiet for {settle}s" if hit and hit.get("quiet") else "timeout"
+        logger.debug(f"detect_popups: no popup detected ({reason})")
+    return {"type": "none", "text": "", "element": None, "selector": None}
 
-        # 3) bootstrap/modal (check provided modal ids or any .modal.show)
-        try:
-            # check given modal ids first
-            for mid in modal_ids:
-                try:
-                    nodes = driver.find_elements(By.ID, mid)
-                    for n in nodes:
-                        if n.is_displayed():
-                            txt = (n.text or "").strip()
-                            if logger:
-                                logger.debug(f"detect_popups: modal id={mid} visible, text={txt[:200]}")
-                            return {"type": "modal", "text": txt, "element": n, "selector": f"#{mid}"}
-                except Exception:
-                    pass
-
-            # fallback: any modal with .modal.show
-            modal_shows = driver.find_elements(By.CSS_SELECTOR, ".modal.show")
-            for m in modal_shows:
-                if m.is_displayed():
-                    txt = (m.text or "").strip()
-                    if logger:
-                        logger.debug(f"detect_popups: modal .modal.show visible, text={txt[:200]}")
-                    return {"type": "modal", "text": txt, "element": m, "selector": ".modal.show"}
-        except Exception:
-            pass
 
-        # 4) inline alerts / toasts
+def _check_native_alert(driver, logger=None) -> Optional[Dict[str, Any]]:
+    try:
+        alert = driver.switch_to.alert
         try:
-            for sel in inline_selectors:
-                try:
-                    nodes = driver.find_elements(By.CSS_SELECTOR, sel)
-                    for n in nodes:
-                        if n.is_displayed():
-                            txt = (n.text or "").strip()
-                            if txt:  # prefer nodes with text
-                                if logger:
-                                    logger.debug(f"detect_popups: inline selector={sel} => {txt[:200]}")
-                                return {"type": "inline", "text": txt, "element": n, "selector": sel}
-                except Exception:
-                    pass
+            text = alert.text
         except Exception:
-            pass
+            text = ""
+        # IMPORTANT: Accept alert to clear it and prevent blocking further checks
+        try:
+            alert.accept()
+            if logger:
+                logger.debug(f"detect_popups: native alert detected and accepted: {text}")
+        except Exception as e:
+            if logger:
+                logger.warning(f"detect_popups: failed to accept alert: {e}")
+        return {"type": "native_alert", "text": text or "", "element": None, "selector": None}
+    except NoAlertPresentException:
+        pass
+    except WebDriverException:
+        # sometimes switch_to.alert throws other errors in remote sessions; ignore and continue
+        pass
+    except Exception:
+        pass
+    return None
 
-        time.sleep(poll_interval)
 
-    # nothing found
+def _probe_dom_js(driver, modal_ids, inline_selectors, logger=None) -> Optional[Dict[str, Any]]:
+    hit = driver.execute_script(DOM_PROBE_JS, modal_ids, inline_selectors)
+    if not hit:
+        return None
+    return _probe_result(hit, logger)
+
+
+def _probe_result(hit, logger=None) -> Dict[str, Any]:
+    txt = hit.get("text") or ""
     if logger:
-        logger.debug("detect_popups: no popup detected within timeout")
-    return {"type": "none", "text": "", "element": None, "selector": None}
+        logger.debug(f"detect_popups: {hit.get('type')} selector={hit.get('selector')} => {txt[:200]}")
+    return {"type": hit.get("type"), "text": txt, "element": hit.get("element"), "selector": hit.get("selector")}
+
+
+def _probe_dom_webdriver(driver, modal_ids, inline_selectors, logger=None) -> Optional[Dict[str, Any]]:
+    # 2) sweet-alert (commonly .sweet-alert)
+    try:
+        sweets = driver.find_elements(By.CLASS_NAME, "sweet-alert")
+        for s in sweets:
+            if s.is_displayed():
+                txt = (s.text or "").strip()
+                if logger:
+                    logger.debug(f"detect_popups: sweet-alert found: {txt[:200]}")
+                return {"type": "sweet_alert", "text": txt, "element": s, "selector": ".sweet-alert"}
+    except Exception:
+        pass
+
+    # 3) bootstrap/modal (check provided modal ids or any .modal.show)
+    try:
+        # check given modal ids first
+        for mid in modal_ids:
+            try:
+                nodes = driver.find_elements(By.ID, mid)
+                for n in nodes:
+                    if n.is_displayed():
+                        txt = (n.text or "").strip()
+                        if logger:
+                            logger.debug(f"detect_popups: modal id={mid} visible, text={txt[:200]}")
+                        return {"type": "modal", "text": txt, "element": n, "selector": f"#{mid}"}
+            except Exception:
+                pass
+
+        # fallback: any modal with .modal.show
+        modal_shows = driver.find_elements(By.CSS_SELECTOR, ".modal.show")
+        for m in modal_shows:
+            if m.is_displayed():
+                txt = (m.text or "").strip()
+                if logger:
+                    logger.debug(f"detect_popups: modal .modal.show visible, text={txt[:200]}")
+                return {"type": "modal", "text": txt, "element": m, "selector": ".modal.show"}
+    except Exception:
+        pass
+
+    # 4) inline alerts / toasts
+    try:
+        for sel in inline_selectors:
+            try:
+                nodes = driver.find_elements(By.CSS_SELECTOR, sel)
+                for n in nodes:
+                    if n.is_displayed():
+                        txt = (n.text or "").strip()
+                        if txt:  # prefer nodes with text
+                            if logger:
+                                logger.debug(f"detect_popups: inline selector={sel} => {txt[:200]}")
+                            return {"type": "inline", "text": txt, "element": n, "selector": sel}
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    return None
@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+LOG_DIR = os.path.join(os.getcwd(), "logs")
+
+_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+_FLOWS_DIR = os.path.join(os.path.dirname(_UTILS_DIR), "tests", "flows")
+
+
+class CommandProfiler:
+    """
+    Записывает каждую WebDriver-команду (имя, локатор, длительность, исход),
+    помеченную test_id, flow и шагом flow. Шаг определяется по стеку вызова:
+    строка flow-модуля + helper из utils (например "login_flow:63 click_with_fallback").
+    Включается через profile_driver() / create_*_driver(profiler=...).
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+        self._context = threading.local()
+
+    def begin_test(self, test_id, flow=None):
+        self._context.test_id = test_id
+        self._context.flow = flow
+
+    def record(self, command, duration, ok=True, locator=None, step=None):
+        ctx = self._context
+        rec = {
+            "test_id": getattr(ctx, "test_id", None),
+            "flow": getattr(ctx, "flow", None),
+            "step": step or _current_step(),
+            "command": command,
+            "locator": locator,
+            "duration": duration,
+            "ok": ok,
+        }
+        with self._lock:
+            self.records.append(rec)
+
+    def summary(self, top: int = 10) -> dict:
+        with self._lock:
+            records = list(self.records)
+
+        by_command = defaultdict(list)
+        by_test = defaultdict(int)
+        by_step = defaultdict(lambda: defaultdict(list))
+        failed = 0
+        for r in records:
+            by_command[r["command"]].append(r["duration"])
+            by_test[r["test_id"]] += 1
+            by_step[r["flow"] or "unknown"][r["step"]].append(r["duration"])
+            failed += 0 if r["ok"] else 1
+
+        commands = {
+            name: {
+                "count": len(d),
+                "total": round(sum(d), 3),
+                "p50": round(percentile(d, 0.5), 4),
+                "p95": round(percentile(d, 0.95), 4),
+            }
+            for name, d in sorted(by_command.items(), key=lambda kv: -sum(kv[1]))
+        }
+        slowest_steps = {}
+        for flow, steps in by_step.items():
+            ranked = sorted(steps.items(), key=lambda kv: -sum(kv[1]))[:top]
+            slowest_steps[flow] = [
+                {"step": step, "commands": len(d), "total": round(sum(d), 3), "p95": round(percentile(d, 0.95), 4)}
+                for step, d in ranked
+            ]
+        tests = len(by_test)
+        return {
+            "total_commands": len(records),
+            "failed_commands": failed,
+            "total_time": round(sum(r["duration"] for r in records), 3),
+            "round_trips_per_test": round(len(records) / tests, 1) if tests else 0,
+            "round_trips_by_test": dict(by_test),
+            "commands": commands,
+            "slowest_steps": slowest_steps,
+        }
+
+    def write_report(self, path: str = None, logger=None) -> str:
+        """Пишет JSON-отчёт в logs/ и краткую сводку в лог; возвращает путь"""
+        if path is None:
+            ts = datetime.now().strftime("%Y%m%dT%H%M%SZ")
+            path = os.path.join(LOG_DIR, f"webdriver_profile_{ts}.json")
+        report = self.summary()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        if logger:
+            logger.info(f"WebDriver profile: {report['total_commands']} commands "
+                        f"({report['round_trips_per_test']} per test), {report['total_time']}s -> {path}")
+            for name, c in list(report["commands"].items())[:10]:
+                logger.info(f"  {name}: n={c['count']} total={c['total']}s p50={c['p50']}s p95={c['p95']}s")
+            for flow, steps in report["slowest_steps"].items():
+                for s in steps[:3]:
+                    logger.info(f"  [{flow}] {s['step']}: {s['commands']} commands, {s['total']}s")
+        return path
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+
+def profile_driver(driver, profiler: CommandProfiler):
+    """
+    Оборачивает driver.execute — единую точку, через которую идут все команды
+    WebDriver (в том числе WebElement и alert), локально и на BrowserStack.
+    """
+    if profiler is None or getattr(driver, "_ddt_profiler", None) is profiler:
+        return driver
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        started = time.perf_counter()
+        ok = True
+        try:
+            return execute(driver_command, params)
+        except Exception:
+            ok = False
+            raise
+        finally:
+            locator = None
+            if params and "using" in params:
+                locator = f"{params.get('using')}={params.get('value')}"
+            profiler.record(driver_command, time.perf_counter() - started, ok, locator)
+
+    driver.execute = timed_execute
+    driver._ddt_profiler = profiler
+    return driver
+
+
+def _current_step() -> str:
+    """"flow_module:lineno helper" по стеку: ближайшая строка flow и внешний helper из utils"""
+    frame = sys._getframe(2)
+    helper = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_FLOWS_DIR):
+            module = os.path.splitext(os.path.basename(filename))[0]
+            return f"{module}:{frame.f_lineno} {helper}" if helper else f"{module}:{frame.f_lineno}"
+        if filename.startswith(_UTILS_DIR) and not filename.endswith("profiler.py"):
+            helper = frame.f_code.co_name
+        frame = frame.f_back
+    return helper or "outside_flow"
@@ -0,0 +1,167 @@
+"""
+Типизированные строки тестовых данных и результат теста.
+
+Строка листа превращается в slotted dataclass один раз при загрузке (parse_rows):
+пустые ячейки (NaN/None) становятся "", числа из Excel — строками без ".0",
+expected_result — PASS/FAIL в верхнем регистре. Flow'ы работают с атрибутами
+(data.username) и не нормализуют значения сами.
+"""
+import math
+from dataclasses import dataclass, fields
+from datetime import date, datetime, time
+from typing import Optional
+
+
+def cell_text(value) -> str:
+    """Значение ячейки как строка: NaN/None -> "", 2025.0 -> "2025" """
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    if isinstance(value, datetime) and value.time() == time.min:
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+@dataclass(slots=True, frozen=True)
+class Row:
+    test_id: str
+    expected_result: str
+
+    @classmethod
+    def from_record(cls, record: dict):
+        """Строит строку из dict источника данных; ValueError, если нет test_id/expected_result"""
+        values = {}
+        for f in fields(cls):
+            values[f.name] = cell_text(record.get(f.name))
+        if not values["test_id"].strip():
+            raise ValueError("test_id is empty")
+        values["test_id"] = values["test_id"].strip()
+        values["expected_result"] = values["expected_result"].strip().upper()
+        if not values["expected_result"]:
+            raise ValueError(f"{values['test_id']}: expected_result is empty")
+        return cls(**values)
+
+    def to_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass(slots=True, frozen=True)
+class LoginRow(Row):
+    username: str = ""
+    password: str = ""
+
+
+@dataclass(slots=True, frozen=True)
+class SignupRow(Row):
+    username: str = ""
+    password: str = ""
+
+
+@dataclass(slots=True, frozen=True)
+class ContactRow(Row):
+    email: str = ""
+    name: str = ""
+    message: str = ""
+
+
+@dataclass(slots=True, frozen=True)
+class AddToCartRow(Row):
+    product: str = ""
+
+    @property
+    def products(self) -> list:
+        """Столбец product — список товаров через ';'"""
+        return [p.strip() for p in self.product.split(";") if p.strip()]
+
+
+@dataclass(slots=True, frozen=True)
+class PurchaseRow(Row):
+    product: str = ""
+    name: str = ""
+    country: str = ""
+    city: str = ""
+    card: str = ""
+    month: str = ""
+    year: str = ""
+
+
+ROW_TYPES = {
+    "login": LoginRow,
+    "signup": SignupRow,
+    "contact": ContactRow,
+    "add_to_cart": AddToCartRow,
+    "purchase": PurchaseRow,
+}
+
+
+def parse_rows(sheet: str, records, on_error=None):
+    """
+    Генератор типизированных строк листа. Невалидная строка — ValueError с
+    номером строки (1 — первая строка данных), до запуска её flow.
+    С on_error ошибка передаётся в on_error(ValueError), а строка пропускается.
+    """
+    row_type = ROW_TYPES.get(sheet, Row)
+    for n, record in enumerate(records, start=1):
+        if isinstance(record, Row):
+            yield record
+            continue
+        try:
+            row = row_type.from_record(record)
+        except ValueError as e:
+            error = ValueError(f"Invalid row {n} in sheet '{sheet}': {e}")
+            if on_error is None:
+                raise error from None
+            on_error(error)
+            continue
+        yield row
+
+
+@dataclass(slots=True)
+class TestResult:
+    """Результат одного теста (flow -> runner / conftest)"""
+    __test__ = False  # не собирать как тест-класс pytest
+
+    id: Optional[str]
+    expected: Optional[str] = None
+    actual: Optional[str] = None
+    status: str = "NOT_RUN"
+    details: Optional[str] = None
+    error: Optional[str] = None
+    duration: Optional[float] = None
+
+    @classmethod
+    def for_row(cls, row: Row):
+        return cls(row.test_id, row.expected_result)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+    def verdict(self, actual: str, details: Optional[str] = None):
+        """Фиксирует actual и выставляет PASSED/FAILED по сравнению с expected"""
+        self.actual = actual
+        self.status = "PASSED" if actual == self.expected else "FAILED"
+        if details:
+            self.details = details
+        return self
+
+    def fail_error(self, error: str):
+        self.actual = "ERROR"
+        self.status = "ERROR"
+        self.error = error
+        return self
+
+    def get(self, key, default=None):
+        """dict-совместимый доступ для кода, ожидающего старый формат результата"""
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def to_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
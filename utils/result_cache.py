@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from config.site_config import home_url
+from utils.records import TestResult
+
+# Кэш результатов (opt-in): DDT_RESULT_CACHE=1 или --cache; --no-cache отключает.
+#   DDT_RESULT_CACHE_PATH — файл SQLite, по умолчанию .cache/results.sqlite
+#   DDT_RESULT_CACHE_TTL  — сколько секунд PASSED-результат годен, по умолчанию сутки (0 — бессрочно)
+#   DDT_APP_VERSION       — версия/сборка приложения; её смена инвалидирует все записи
+RESULT_CACHE_PATH = os.getenv("DDT_RESULT_CACHE_PATH") or os.path.join(os.getcwd(), ".cache", "results.sqlite")
+RESULT_CACHE_ENABLED = os.getenv("DDT_RESULT_CACHE", "0").lower() in ("1", "true", "yes")
+RESULT_CACHE_TTL = float(os.getenv("DDT_RESULT_CACHE_TTL", "86400"))
+APP_VERSION = os.getenv("DDT_APP_VERSION", "")
+
+
+class ResultCache:
+    """
+    Мемоизация PASSED-результатов по отпечатку строки: все значения ячеек +
+    sha1 исходника flow-модуля + base URL сайта (config.site_config) + токен версии приложения.
+    Если ничего из этого не изменилось и запись моложе ttl, flow не выполняется —
+    возвращается сохранённый результат. FAILED/ERROR не кэшируются никогда.
+    SQLite: запись безопасна из нескольких потоков и xdist-процессов.
+    """
+
+    def __init__(self, path=None, ttl=None, app_version=None, logger=None):
+        self.path = path or RESULT_CACHE_PATH
+        self.ttl = RESULT_CACHE_TTL if ttl is None else ttl
+        self.app_version = APP_VERSION if app_version is None else app_version
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+        self._sources = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                           "fingerprint TEXT PRIMARY KEY, test_id TEXT, result TEXT, stored_at REAL)")
+        self._conn.commit()
+
+    def fingerprint(self, flow, row) -> str:
+        module = sys.modules.get(getattr(flow, "__module__", ""))
+        payload = {
+            "flow": getattr(flow, "__module__", str(flow)),
+            "flow_source": self._source_hash(module),
+            "base_url": home_url(),
+            "app_version": self.app_version,
+            "row": row.to_dict(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _source_hash(self, module) -> str:
+        path = getattr(module, "__file__", None)
+        if not path:
+            return ""
+        if path not in self._sources:
+            with open(path, "rb") as f:
+                self._sources[path] = hashlib.sha1(f.read()).hexdigest()
+        return self._sources[path]
+
+    def lookup(self, flow, row):
+        """Сохранённый PASSED TestResult для неизменённой строки или None"""
+        key = self.fingerprint(flow, row)
+        with self._lock:
+            found = self._conn.execute("SELECT result, stored_at FROM results WHERE fingerprint = ?",
+                                       (key,)).fetchone()
+        age = time.time() - found[1] if found else None
+        if found is None or (self.ttl > 0 and age > self.ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = TestResult.from_dict(json.loads(found[0]))
+        result.details = f"cached result ({int(age)}s old)" + (f": {result.details}" if result.details else "")
+        if self.logger:
+            self.logger.info(f"[{row.test_id}] unchanged since last PASSED run — reusing cached result")
+        return result
+
+    def store(self, flow, row, result: TestResult):
+        if result.status != "PASSED":
+            return
+        key = self.fingerprint(flow, row)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                               (key, row.test_id, json.dumps(result.to_dict(), ensure_ascii=False), time.time()))
+            self._conn.commit()
+
+    def report(self, logger=None):
+        logger = logger or self.logger
+        if logger and (self.hits or self.misses):
+            logger.info(f"Result cache: {self.hits} rows reused, {self.misses} executed ({self.path})")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def result_cache_enabled(cache_flag=False, no_cache_flag=False) -> bool:
+    """--no-cache побеждает всё; иначе --cache или DDT_RESULT_CACHE=1"""
+    if no_cache_flag:
+        return False
+    return cache_flag or RESULT_CACHE_ENABLED
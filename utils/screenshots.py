@@ -0,0 +1,208 @@
+import atexit
+import base64
+import collections
+import hashlib
+import io
+import os
+import queue
+import threading
+
+# Настройки через переменные окружения:
+#   DDT_SCREENSHOT_FORMAT  — png (по умолчанию) | jpeg | webp (jpeg/webp требуют Pillow)
+#   DDT_SCREENSHOT_SCALE   — коэффициент уменьшения, например 0.5 (требует Pillow)
+#   DDT_SCREENSHOT_QUALITY — качество jpeg/webp, по умолчанию 70
+#   DDT_SCREENSHOTS        — политика: always (по умолчанию) | on-failure | off
+#   DDT_SCREENSHOT_BUFFER  — сколько последних кадров на тест держать в памяти, по умолчанию 5
+#   DDT_SCREENSHOT_QUEUE   — кадров в очереди на запись, по умолчанию 64 (дальше submit ждёт)
+#   DDT_SCREENSHOT_DEDUP   — сколько последних hash'ей помнить для hard link'ов, по умолчанию 1000
+SCREENSHOT_FORMAT = os.getenv("DDT_SCREENSHOT_FORMAT", "png").lower()
+SCREENSHOT_SCALE = float(os.getenv("DDT_SCREENSHOT_SCALE", "1.0"))
+SCREENSHOT_QUALITY = int(os.getenv("DDT_SCREENSHOT_QUALITY", "70"))
+SCREENSHOT_POLICIES = ("always", "on-failure", "off")
+SCREENSHOT_POLICY = os.getenv("DDT_SCREENSHOTS", "always")
+SCREENSHOT_BUFFER_SIZE = int(os.getenv("DDT_SCREENSHOT_BUFFER", "5"))
+SCREENSHOT_QUEUE_SIZE = int(os.getenv("DDT_SCREENSHOT_QUEUE", "64"))
+SCREENSHOT_DEDUP_ENTRIES = max(1, int(os.getenv("DDT_SCREENSHOT_DEDUP", "1000")))
+FAILED_STATUSES = ("FAILED", "ERROR")
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+def screenshot_extension() -> str:
+    if SCREENSHOT_FORMAT in ("jpeg", "jpg", "webp") and PIL_AVAILABLE:
+        return "jpg" if SCREENSHOT_FORMAT in ("jpeg", "jpg") else "webp"
+    return "png"
+
+
+class ScreenshotWriter:
+    """
+    Фоновая запись скриншотов: flow только снимает base64 и кладёт в очередь,
+    декодирование, сжатие и запись на диск выполняет отдельный поток.
+    Одинаковые кадры (по sha1 содержимого) не перекодируются, а связываются
+    hard link'ом с уже записанным файлом. Память не растёт с длиной прогона:
+    очередь ограничена (submit ждёт, если запись отстаёт), hash'и помнятся только
+    для последних SCREENSHOT_DEDUP_ENTRIES файлов.
+    """
+
+    def __init__(self, queue_size: int = SCREENSHOT_QUEUE_SIZE, dedup_entries: int = SCREENSHOT_DEDUP_ENTRIES):
+        self._queue = queue.Queue(maxsize=max(0, queue_size))
+        self._thread = None
+        self._lock = threading.Lock()
+        self._written = collections.OrderedDict()  # sha1 -> path, от давних к свежим
+        self._digests = {}  # path -> sha1
+        self.dedup_entries = dedup_entries
+        self.duplicates = 0
+
+    def submit(self, b64_png: str, path: str, logger=None):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((b64_png, path, logger))
+
+    def flush(self):
+        """Дождаться записи всех скриншотов из очереди"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def _run(self):
+        while True:
+            b64_png, path, logger = self._queue.get()
+            try:
+                self._write(b64_png, path, logger)
+            except Exception:
+                if logger: logger.exception(f"Failed to write screenshot {path}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, b64_png, path, logger):
+        png = base64.b64decode(b64_png)
+        digest = hashlib.sha1(png).hexdigest()
+        original = self._written.get(digest)
+        if original and os.path.exists(original):
+            self._written.move_to_end(digest)
+            self.duplicates += 1
+            if os.path.abspath(original) == os.path.abspath(path):
+                return
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+                os.link(original, path)
+                if logger: logger.debug(f"Screenshot {path} identical to {original}; linked")
+                return
+            except OSError:
+                pass  # файловая система без hard link'ов — пишем как обычно
+
+        data = _encode(png)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        # файл по этому пути перезаписан — старый hash на него больше не указывает
+        stale = self._digests.pop(path, None)
+        if stale and self._written.get(stale) == path:
+            del self._written[stale]
+        self._written[digest] = path
+        self._written.move_to_end(digest)
+        self._digests[path] = digest
+        while len(self._written) > self.dedup_entries:
+            old_digest, old_path = self._written.popitem(last=False)
+            if self._digests.get(old_path) == old_digest:
+                del self._digests[old_path]
+
+
+def _encode(png: bytes) -> bytes:
+    ext = screenshot_extension()
+    if not PIL_AVAILABLE or (ext == "png" and SCREENSHOT_SCALE >= 1.0):
+        return png
+    img = Image.open(io.BytesIO(png))
+    if SCREENSHOT_SCALE < 1.0:
+        size = (max(1, int(img.width * SCREENSHOT_SCALE)), max(1, int(img.height * SCREENSHOT_SCALE)))
+        img = img.resize(size)
+    out = io.BytesIO()
+    if ext == "jpg":
+        img.convert("RGB").save(out, format="JPEG", quality=SCREENSHOT_QUALITY, optimize=True)
+    elif ext == "webp":
+        img.save(out, format="WEBP", quality=SCREENSHOT_QUALITY)
+    else:
+        img.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+class ScreenshotBuffer:
+    """
+    Последние K кадров каждого теста в памяти (ring buffer на deque).
+    Ключ — текущий тест потока (begin_test), поэтому работает и с --workers.
+    """
+
+    def __init__(self, size: int = SCREENSHOT_BUFFER_SIZE):
+        self.size = size
+        self._frames = {}
+        self._lock = threading.Lock()
+        self._current = threading.local()
+
+    def begin(self, test_id):
+        self._current.test_id = test_id
+        with self._lock:
+            self._frames[test_id] = collections.deque(maxlen=self.size)
+
+    def current(self):
+        return getattr(self._current, "test_id", None)
+
+    def add(self, path: str, b64_png: str):
+        test_id = self.current()
+        if test_id is None:
+            return
+        with self._lock:
+            frames = self._frames.setdefault(test_id, collections.deque(maxlen=self.size))
+            frames.append((path, b64_png))
+
+    def pop(self, test_id) -> list:
+        with self._lock:
+            return list(self._frames.pop(test_id, ()))
+
+
+writer = ScreenshotWriter()
+buffer = ScreenshotBuffer()
+
+
+def set_screenshot_policy(policy: str, buffer_size: int = None):
+    global SCREENSHOT_POLICY
+    if policy not in SCREENSHOT_POLICIES:
+        raise ValueError(f"Unknown screenshot policy: {policy} (expected one of {SCREENSHOT_POLICIES})")
+    SCREENSHOT_POLICY = policy
+    if buffer_size:
+        buffer.size = buffer_size
+
+
+def screenshot_policy() -> str:
+    return SCREENSHOT_POLICY
+
+
+def begin_test(test_id):
+    """Отметить начало теста в текущем потоке: новые кадры попадут в его буфер"""
+    buffer.begin(test_id)
+
+
+def finish_test(test_id, status, logger=None) -> list:
+    """
+    Закрыть буфер теста. В режиме on-failure кадры пишутся на диск только при
+    status FAILED/ERROR. Возвращает кадры [(path, base64_png)] для отчёта.
+    """
+    frames = buffer.pop(test_id)
+    if SCREENSHOT_POLICY == "on-failure" and status in FAILED_STATUSES:
+        for path, b64_png in frames:
+            writer.submit(b64_png, path, logger)
+        if logger and frames: logger.info(f"[{test_id}] {status}: writing {len(frames)} buffered screenshots")
+    return frames
+
+
+def flush_screenshots():
+    writer.flush()
+
+
+atexit.register(flush_screenshots)
@@ -0,0 +1,199 @@
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from utils.profiler import percentile
+
+LOG_DIR = os.path.join(os.getcwd(), "logs")
+PROGRESS_EVERY = 10  # без TTY строка прогресса печатается раз в N строк
+DURATION_SAMPLE_SIZE = 10000  # размер reservoir для p50/p95: память не растёт с числом строк
+
+
+class ResultSummary:
+    """
+    Итоги запуска, считаются инкрементально по мере поступления TestResult.
+    Длительности — счётчик и сумма плюс reservoir sample фиксированного размера
+    для p50/p95 (точные, пока строк не больше DURATION_SAMPLE_SIZE).
+    """
+
+    def __init__(self, total=None, sample_size: int = DURATION_SAMPLE_SIZE):
+        self.total = total  # ожидаемое число строк (None — неизвестно, например при --stream)
+        self.counts = {"PASSED": 0, "FAILED": 0, "ERROR": 0}
+        self.done = 0
+        self.timed = 0
+        self.total_duration = 0.0
+        self.sample_size = sample_size
+        self._sample = []
+        self._random = random.Random(0)
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        self.done += 1
+        if result.status in self.counts:
+            self.counts[result.status] += 1
+        if result.duration is not None:
+            self.timed += 1
+            self.total_duration += result.duration
+            if len(self._sample) < self.sample_size:
+                self._sample.append(result.duration)
+            else:
+                # Algorithm R: каждая длительность остаётся в выборке с вероятностью sample_size / timed
+                j = self._random.randrange(self.timed)
+                if j < self.sample_size:
+                    self._sample[j] = result.duration
+
+    def duration_percentile(self, p) -> float:
+        return percentile(self._sample, p)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def rows_per_minute(self) -> float:
+        elapsed = self.elapsed
+        return self.done * 60 / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Оставшееся время в секундах (None, если total неизвестен или ещё нет строк)"""
+        if not self.total or not self.done:
+            return None
+        return max(self.total - self.done, 0) * self.elapsed / self.done
+
+    def timing(self, sheet, animations_disabled) -> str:
+        """Время на строку по flow — для сравнения запусков (например, с --no-animations и без)"""
+        if not self.timed:
+            return f"Timing [{sheet}]: no rows"
+        total = self.total_duration
+        return (f"Timing [{sheet}, animations {'off' if animations_disabled else 'on'}]: "
+                f"{self.timed} rows, total {total:.1f}s, avg {total / self.timed:.2f}s/row, "
+                f"p50 {self.duration_percentile(0.5):.2f}s, p95 {self.duration_percentile(0.95):.2f}s")
+
+
+class ResultSink:
+    """Получатель результатов: write() на каждую строку по мере готовности, close() в конце (и при падении)"""
+
+    def write(self, result, summary: ResultSummary):
+        pass
+
+    def close(self, summary: ResultSummary):
+        pass
+
+
+class ConsoleSink(ResultSink):
+    """
+    Строка результата на каждый тест и строка прогресса (rows/min, ETA).
+    В TTY прогресс перерисовывается на месте, иначе печатается раз в PROGRESS_EVERY строк.
+    """
+
+    def __init__(self, stream=None, progress=True):
+        self.stream = stream or sys.stdout
+        self.progress = progress
+        self.tty = self.stream.isatty()
+
+    def write(self, result, summary):
+        status_symbol = "✅" if result.status == "PASSED" else "❌"
+        lines = [f"{status_symbol} {result.id}: {result.status} (expected: {result.expected}, actual: {result.actual})"]
+        if result.details:
+            lines.append(f"   Details: {result.details[:100]}...")
+        prefix = "\r\033[K" if self.progress and self.tty else ""
+        self.stream.write(prefix + "\n".join(lines) + "\n")
+        if self.progress and (self.tty or summary.done % PROGRESS_EVERY == 0):
+            self.stream.write(progress_line(summary) + ("" if self.tty else "\n"))
+        self.stream.flush()
+
+    def close(self, summary):
+        if self.progress and self.tty:
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+
+
+class JsonlSink(ResultSink):
+    """Одна JSON-строка на результат; flush после каждой — при падении запуска готовые строки остаются"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, result, summary):
+        self._file.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self, summary):
+        self._file.close()
+
+
+class JUnitSink(ResultSink):
+    """
+    JUnit XML, записываемый потоково: <testcase> дописывается по мере готовности,
+    открывающий <testsuite> резервируется пробелами и перезаписывается счётчиками
+    в close(). Закрывающие теги дописываются в close() — и при падении runner'а (finally).
+    """
+
+    HEADER_WIDTH = 256
+
+    def __init__(self, path, suite="ddt"):
+        self.path = path
+        self.suite = suite
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write('<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n')
+        self._header_at = self._file.tell()
+        # запас под счётчики: итоговый заголовок должен поместиться на место начального
+        self._width = max(self.HEADER_WIDTH, len(self._header(ResultSummary(), 0)) + 64)
+        self._file.write(self._header(ResultSummary(), self._width) + "\n")
+        self._file.flush()
+
+    def _header(self, summary, width):
+        tag = (f'<testsuite name={quoteattr(self.suite)} tests="{summary.done}" '
+               f'failures="{summary.counts["FAILED"]}" errors="{summary.counts["ERROR"]}" '
+               f'time="{summary.total_duration:.3f}" timestamp="{datetime.now().isoformat(timespec="seconds")}"')
+        return tag.ljust(width - 1) + ">"
+
+    def write(self, result, summary):
+        attrs = f'classname={quoteattr(self.suite)} name={quoteattr(str(result.id))}'
+        if result.duration is not None:
+            attrs += f' time="{result.duration:.3f}"'
+        body = ""
+        message = result.details or result.error or ""
+        if result.status == "FAILED":
+            body = (f'<failure message={quoteattr(f"expected {result.expected}, actual {result.actual}")}>'
+                    f'{escape(message)}</failure>')
+        elif result.status == "ERROR":
+            body = f'<error message={quoteattr(result.error or "ERROR")}>{escape(message)}</error>'
+        elif result.details:
+            body = f"<system-out>{escape(result.details)}</system-out>"
+        self._file.write(f"  <testcase {attrs}>{body}</testcase>\n")
+        self._file.flush()
+
+    def close(self, summary):
+        self._file.write("</testsuite>\n</testsuites>\n")
+        self._file.seek(self._header_at)
+        self._file.write(self._header(summary, self._width))
+        self._file.close()
+
+
+def progress_line(summary: ResultSummary) -> str:
+    eta = summary.eta()
+    done = f"{summary.done}/{summary.total}" if summary.total else f"{summary.done}"
+    return (f"[progress] {done} rows, {summary.counts['PASSED']} passed, {summary.counts['FAILED']} failed, "
+            f"{summary.counts['ERROR']} errors, {summary.rows_per_minute():.1f} rows/min"
+            + (f", ETA {_format_seconds(eta)}" if eta is not None else ""))
+
+
+def default_path(kind, sheet, ext) -> str:
+    ts = datetime.now().strftime("%Y%m%dT%H%M%SZ")
+    return os.path.join(LOG_DIR, f"{kind}_{sheet}_{ts}.{ext}")
+
+
+def _format_seconds(seconds) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
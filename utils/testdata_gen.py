@@ -0,0 +1,168 @@
+"""
+Генератор синтетических тестовых данных для масштабных и soak-прогонов runner'а.
+
+Строки следуют контракту столбцов flow (utils.records.ROW_TYPES), значения
+воспроизводимы по seed (у каждого листа свой поток random.Random), доля
+негативных строк задаётся точно: ровно round(n * negative_ratio) строк,
+равномерно по листу. Запись — потоковая через utils.data_source.write_sheets,
+поэтому миллионы строк не держатся в памяти.
+
+    python -m utils.data_source generate testdata/ --rows 1000000 --seed 42 --negative-ratio 0.25
+    python -m utils.data_source generate soak.xlsx --rows 100000 --sheets login purchase
+    python tests/runner.py --data testdata/ --sheet login --stream --mode fake
+
+Негативные строки — только с быстрым исходом через alert сайта:
+    login    — неверный пароль, неизвестный пользователь, пустое имя или пароль
+    signup   — уже существующий пользователь, пустой пароль
+    purchase — пустое имя и/или номер карты
+У contact и add_to_cart на demoblaze нет негативного исхода (сообщение
+принимается всегда, несуществующий товар — это ERROR по таймауту, а не FAIL),
+поэтому их строки всегда PASS и negative_ratio к ним не применяется.
+Позитивные login/signup-строки рассчитаны на пользователей цели: по умолчанию
+test/test, который есть и на demoblaze, и на utils/demo_site.
+"""
+import os
+import random
+from dataclasses import fields
+
+from utils.data_source import write_sheets
+from utils.demo_site.server import DEFAULT_USERS, PRODUCTS
+from utils.records import ROW_TYPES
+
+GENERATED_SHEETS = ("login", "signup", "contact", "add_to_cart", "purchase")
+NEGATIVE_SHEETS = ("login", "signup", "purchase")
+DEFAULT_NEGATIVE_RATIO = 0.25
+DEFAULT_MAX_PRODUCTS = 3
+XLSX_MAX_ROWS = 1048575  # лимит строк листа Excel без строки заголовка
+
+FIRST_NAMES = ("Aigerim", "Arman", "Dana", "Daniyar", "Elena", "Ivan", "Madina", "Nurlan", "Olga", "Timur",
+               "Alice", "Bob", "Carlos", "Fatima", "Hiro", "Lena", "Marco", "Priya", "Sven", "Zoe")
+LAST_NAMES = ("Abenov", "Petrova", "Smagulov", "Ivanov", "Kim", "Seitkali", "Smith", "Garcia", "Tanaka", "Muller")
+LOCATIONS = (("Kazakhstan", "Almaty"), ("Kazakhstan", "Astana"), ("Kazakhstan", "Shymkent"),
+             ("Russia", "Moscow"), ("Germany", "Berlin"), ("USA", "New York"), ("Japan", "Tokyo"),
+             ("Brazil", "Sao Paulo"), ("India", "Mumbai"), ("France", "Paris"))
+MESSAGES = ("Hello, is this product still available?", "Please contact me about a bulk order.",
+            "Delivery was late.", "Great store!", "Do you ship internationally?", "Need an invoice for order.")
+
+
+def sheet_columns(sheet: str) -> list:
+    """Столбцы листа по контракту flow: test_id, поля Row листа, expected_result"""
+    names = [f.name for f in fields(ROW_TYPES[sheet])]
+    return ["test_id"] + [n for n in names if n not in ("test_id", "expected_result")] + ["expected_result"]
+
+
+def is_negative(index: int, ratio: float) -> bool:
+    """Строка index негативная: ровно round(n * ratio) негативных на n строк, равномерно"""
+    return int(round((index + 1) * ratio)) > int(round(index * ratio))
+
+
+def generate_rows(sheet: str, n: int, seed: int = 0, negative_ratio: float = DEFAULT_NEGATIVE_RATIO,
+                  users: dict = None, max_products: int = DEFAULT_MAX_PRODUCTS, id_prefix: str = "SYN"):
+    """
+    Генератор n строк листа (dict с ключами sheet_columns(sheet)).
+    users — {username: password} для позитивных login и негативных signup (по умолчанию test/test).
+    """
+    if sheet not in GENERATED_SHEETS:
+        raise ValueError(f"Unknown sheet: {sheet} (expected one of {GENERATED_SHEETS})")
+    if not 0 <= negative_ratio <= 1:
+        raise ValueError(f"negative_ratio must be within [0, 1], got {negative_ratio}")
+    rng = random.Random(f"{seed}:{sheet}")
+    credentials = sorted((users or DEFAULT_USERS).items())
+    titles = [p["title"] for p in PRODUCTS]
+    make = _ROW_MAKERS[sheet]
+    ratio = negative_ratio if sheet in NEGATIVE_SHEETS else 0.0
+    for i in range(n):
+        negative = is_negative(i, ratio)
+        row = {"test_id": f"{id_prefix}-{sheet}-{i + 1}"}
+        row.update(make(rng, i, negative, seed=seed, credentials=credentials, titles=titles,
+                        max_products=max_products))
+        row["expected_result"] = "FAIL" if negative else "PASS"
+        yield row
+
+
+def generate(dest: str, rows: int, fmt: str = None, sheets=None, seed: int = 0,
+             negative_ratio: float = DEFAULT_NEGATIVE_RATIO, users: dict = None,
+             max_products: int = DEFAULT_MAX_PRODUCTS) -> dict:
+    """
+    Пишет листы sheets (по умолчанию все пять) по rows строк в dest: каталог или
+    шаблон с {sheet} (csv/jsonl), .db/.sqlite или .xlsx. Возвращает {sheet: rows_written}.
+    """
+    sheets = sheets or list(GENERATED_SHEETS)
+    if fmt is None and not os.path.splitext(dest)[1] and "{sheet}" not in dest:
+        os.makedirs(dest, exist_ok=True)
+        fmt = "jsonl"
+    if (fmt == "xlsx" or dest.lower().endswith(".xlsx")) and rows > XLSX_MAX_ROWS:
+        raise ValueError(f"An Excel sheet holds at most {XLSX_MAX_ROWS} rows; use jsonl, csv or sqlite "
+                         f"for {rows} rows")
+    # все листы одним вызовом: .xlsx пишется одной write-only книгой за один проход
+    return write_sheets(dest, ((sheet, generate_rows(sheet, rows, seed, negative_ratio, users, max_products),
+                                sheet_columns(sheet)) for sheet in sheets), fmt=fmt)
+
+
+# --- строки по листам ---------------------------------------------------------
+
+def _person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _login_row(rng, i, negative, credentials, **_):
+    username, password = rng.choice(credentials)
+    if not negative:
+        return {"username": username, "password": password}
+    kind = rng.randrange(4)
+    if kind == 0:
+        return {"username": username, "password": f"{password}_wrong{rng.randrange(10 ** 6)}"}
+    if kind == 1:
+        return {"username": f"nouser_{rng.getrandbits(48):012x}", "password": "secret"}
+    if kind == 2:
+        return {"username": "", "password": password}
+    return {"username": username, "password": ""}
+
+
+def _signup_row(rng, i, negative, seed, credentials, **_):
+    if not negative:
+        # GENERATE_ — signup_flow дописывает время и номер попытки; база уникальна для строки
+        return {"username": f"GENERATE_syn{seed}_{i + 1}", "password": f"pw{rng.getrandbits(32):08x}"}
+    if rng.randrange(2):
+        return {"username": rng.choice(credentials)[0], "password": f"pw{rng.getrandbits(32):08x}"}
+    return {"username": f"GENERATE_syn{seed}_{i + 1}", "password": ""}
+
+
+def _contact_row(rng, i, negative, **_):
+    name = _person(rng)
+    email = f"{name.split()[0].lower()}.{i + 1}@example.com"
+    return {"email": email, "name": name, "message": rng.choice(MESSAGES)}
+
+
+def _add_to_cart_row(rng, i, negative, titles, max_products, **_):
+    count = rng.randint(1, max(1, min(max_products, len(titles))))
+    return {"product": ";".join(rng.sample(titles, count))}
+
+
+def _purchase_row(rng, i, negative, titles, **_):
+    country, city = rng.choice(LOCATIONS)
+    row = {
+        "product": rng.choice(titles),
+        "name": _person(rng),
+        "country": country,
+        "city": city,
+        "card": f"4{rng.randrange(10 ** 15):015d}",
+        "month": str(rng.randint(1, 12)),
+        "year": str(rng.randint(2026, 2035)),
+    }
+    if negative:
+        kind = rng.randrange(3)
+        if kind in (0, 2):
+            row["name"] = ""
+        if kind in (1, 2):
+            row["card"] = ""
+    return row
+
+
+_ROW_MAKERS = {
+    "login": _login_row,
+    "signup": _signup_row,
+    "contact": _contact_row,
+    "add_to_cart": _add_to_cart_row,
+    "purchase": _purchase_row,
+}